@@ -0,0 +1,244 @@
+"""
+Benchmark the flow diagram scripts on synthetic requirement workbooks
+Times every pipeline stage per workbook size and reader engine and writes the results as JSON
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from flow_diagram.sheets import iter_sheet_rows
+from flow_diagram.synthetic import REQUIREMENT_SHEET, write_workbook
+from flow_diagram.workbook import ENGINES
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+STAGES = [
+    "read_excel_file",
+    "load_rows",
+    "extract_screens_from_requirements",
+    "build_flow_graph",
+    "build_user_flow_graph",
+    "emit_mermaid_v1",
+    "emit_mermaid_v2",
+    "emit_html_v1",
+    "emit_html_v2",
+]
+
+# Ignore differences below this when comparing against a baseline; they are timer noise
+MIN_REGRESSION_SECONDS = 0.005
+
+def load_script(name, file_name):
+    """Import one of the hyphenated generator scripts as a module"""
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run_pipeline(v1, v2, workbook, engine, output_dir, tables, diagram):
+    """Run every stage once and return ({stage: seconds}, sizes)"""
+    timings = {}
+
+    @contextlib.contextmanager
+    def stage(name):
+        started = time.perf_counter()
+        yield
+        timings[name] = time.perf_counter() - started
+
+    with stage("read_excel_file"):
+        sheets_data = v2.read_excel_file(workbook, engine=engine)
+    if not sheets_data:
+        raise RuntimeError(f"Failed to read {workbook}")
+
+    # The stream engine defers parsing until rows are iterated; one full pass
+    # makes read_excel_file + load_rows comparable across engines
+    with stage("load_rows"):
+        for sheet in sheets_data.values():
+            for _ in iter_sheet_rows(sheet):
+                pass
+
+    with stage("extract_screens_from_requirements"):
+        screens = v2.extract_screens_from_requirements(sheets_data[REQUIREMENT_SHEET])
+
+    with stage("build_flow_graph"):
+        graph_v1 = v1.build_flow_graph(sheets_data)
+
+    with stage("build_user_flow_graph"):
+        graph_v2 = v2.build_user_flow_graph(screens)
+
+    mermaid_v1 = output_dir / "flow-diagram.mmd"
+    mermaid_v2 = output_dir / "user-flow-diagram.mmd"
+    html_v1 = output_dir / "flow-diagram.html"
+    html_v2 = output_dir / "user-flow-diagram.html"
+
+    with stage("emit_mermaid_v1"):
+        v1.create_mermaid_flow_diagram(graph_v1, mermaid_v1)
+
+    with stage("emit_mermaid_v2"):
+        v2.create_user_flow_diagram(graph_v2, mermaid_v2)
+
+    with stage("emit_html_v1"):
+        v1.create_detailed_flow_diagram(graph_v1, sheets_data, html_v1, tables, diagram=diagram)
+
+    with stage("emit_html_v2"):
+        v2.create_detailed_flow_diagram(graph_v2, screens, sheets_data, html_v2, tables, diagram=diagram)
+
+    sizes = {
+        "screens": len(screens),
+        "v1_nodes": graph_v1.node_count,
+        "v1_edges": graph_v1.edge_count,
+        "v2_nodes": graph_v2.node_count,
+        "v2_edges": graph_v2.edge_count,
+        "mermaid_v1_bytes": mermaid_v1.stat().st_size,
+        "mermaid_v2_bytes": mermaid_v2.stat().st_size,
+        "html_v1_bytes": html_v1.stat().st_size,
+        "html_v2_bytes": html_v2.stat().st_size,
+    }
+    return timings, sizes
+
+def summarize(runs):
+    """Reduce per-run timings to min/median/max per stage, plus the whole pipeline"""
+    stages = {}
+    for name in STAGES + ["total"]:
+        if name == "total":
+            values = [sum(run.values()) for run in runs]
+        else:
+            values = [run[name] for run in runs]
+        stages[name] = {
+            "min": min(values),
+            "median": statistics.median(values),
+            "max": max(values),
+            "runs": values,
+        }
+    return stages
+
+def compare_to_baseline(results, baseline, threshold):
+    """Return (rows, engine, stage, old, new) for median timings that regressed past threshold"""
+    previous = {(r["rows"], r["engine"]): r["stages"] for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old_stages = previous.get((result["rows"], result["engine"]))
+        if not old_stages:
+            continue
+        for name, timing in result["stages"].items():
+            if name not in old_stages:
+                continue
+            old = old_stages[name]["median"]
+            new = timing["median"]
+            if new > old * threshold and new - old > MIN_REGRESSION_SECONDS:
+                regressions.append((result["rows"], result["engine"], name, old, new))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the flow diagram scripts on synthetic workbooks")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Requirement rows per synthetic workbook (default: 1000 10000 100000)")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES),
+                        help="Reader engines to compare (default: all)")
+    parser.add_argument("--sparsity", type=float, default=0.3,
+                        help="Share of text cells left empty, 0..1 (default: 0.3)")
+    parser.add_argument("--formatted-rows", type=int, default=1000,
+                        help="Style-only rows below the data (default: 1000)")
+    parser.add_argument("--formatted-columns", type=int, default=26,
+                        help="Pad rows with style-only cells up to this many columns (default: 26)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per size and engine (default: 3)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed for the synthetic content")
+    parser.add_argument("--tables", choices=["inline", "paged"], default="inline",
+                        help="Source data table mode for the HTML stages")
+    parser.add_argument("--diagram", choices=["svg", "mermaid"], default="svg",
+                        help="Diagram embedding for the HTML stages; svg includes the layout (default: svg)")
+    parser.add_argument("--workdir", default=None,
+                        help="Keep synthetic workbooks and outputs here instead of a temporary directory")
+    parser.add_argument("--output", default="flow-diagram-benchmark.json",
+                        help="Results file (default: flow-diagram-benchmark.json)")
+    parser.add_argument("--baseline", default=None,
+                        help="Earlier results file; exit non-zero if a stage got slower than --threshold")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Slowdown ratio counted as a regression (default: 1.25)")
+    args = parser.parse_args()
+
+    v1 = load_script("create_flow_diagram", "create-flow-diagram.py")
+    v2 = load_script("create_flow_diagram_v2", "create-flow-diagram-v2.py")
+
+    with contextlib.ExitStack() as stack:
+        if args.workdir:
+            workdir = Path(args.workdir)
+            workdir.mkdir(parents=True, exist_ok=True)
+        else:
+            workdir = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="flow-bench-")))
+
+        results = []
+        for rows in args.rows:
+            workbook = workdir / f"synthetic-{rows}-{args.sparsity}-{args.formatted_rows}x{args.formatted_columns}.xlsx"
+            if not workbook.exists():
+                print(f"Generating {workbook.name} ...")
+                write_workbook(workbook, rows, args.sparsity, args.formatted_rows,
+                               args.formatted_columns, seed=args.seed)
+
+            for engine in args.engines:
+                output_dir = workdir / f"out-{rows}-{engine}"
+                output_dir.mkdir(exist_ok=True)
+                runs = []
+                for _ in range(args.repeat):
+                    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+                        timings, sizes = run_pipeline(v1, v2, str(workbook), engine, output_dir, args.tables, args.diagram)
+                    runs.append(timings)
+
+                result = {
+                    "rows": rows,
+                    "engine": engine,
+                    "workbook_bytes": workbook.stat().st_size,
+                    "sizes": sizes,
+                    "stages": summarize(runs),
+                }
+                results.append(result)
+
+                print(f"\n{rows} rows, {engine} engine (median of {args.repeat}):")
+                for name in STAGES + ["total"]:
+                    print(f"  {name:<36} {result['stages'][name]['median'] * 1000:10.1f} ms")
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "sparsity": args.sparsity,
+            "formatted_rows": args.formatted_rows,
+            "formatted_columns": args.formatted_columns,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "tables": args.tables,
+            "diagram": args.diagram,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+        handle.write("\n")
+    print(f"\n✅ Benchmark results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} stage(s) slower than {args.threshold}x the baseline:")
+            for rows, engine, name, old, new in regressions:
+                print(f"  {rows} rows, {engine}: {name} {old * 1000:.1f} ms -> {new * 1000:.1f} ms")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -5,117 +5,229 @@ Creates user flow diagrams based on screen names and logical connections
 
 import sys
 import os
-import pandas as pd
+import argparse
+import html
+import json
 from pathlib import Path
 import re
+import time
+from functools import partial
 
-def read_excel_file(file_path):
-    """Read Excel file and return all sheets as a dictionary"""
+from flow_diagram.batch import expand_workbooks, print_batch_summary, run_batch, slugify
+from flow_diagram.bundle import DEFAULT_BUNDLE_DIR, build_bundle, find_renderer
+from flow_diagram.cache import DEFAULT_CACHE_DIR, SheetCache, file_digest
+from flow_diagram.diff import change_list, changed_row_labels, diff_graph, diff_graphs, diff_sheets, write_diff
+from flow_diagram.exporters import DEFAULT_FORMATS, EXPORTERS, FORMATS, export_graph, format_label, output_paths, run_exports
+from flow_diagram.graph import FlowGraph
+from flow_diagram.html import html_table
+from flow_diagram.instrument import Profiler
+from flow_diagram.layout import layout_graph
+from flow_diagram.manifest import BuildManifest, generator_version, sheet_digest
+from flow_diagram.mermaid import mermaid_chunks, mermaid_file_chunks
+from flow_diagram.roles import (ROLE_COLUMN, ROLE_SCREENS_COLUMN, ROLE_SHEET, TRANSITION_SHEET, ReachabilityIndex,
+                                read_role_screens, read_transitions)
+from flow_diagram.paged_tables import DEFAULT_PAGE_SIZE, TABLE_MODES, paged_tables_chunks, write_sheet_chunks
+from flow_diagram.search import SearchIndex, search_box_html, search_index_chunks
+from flow_diagram.sheets import (MemorySheet, detach_sheet, is_missing, iter_column, iter_sheet_rows,
+                                 sheet_float_columns)
+from flow_diagram.svg import svg_chunks
+from flow_diagram.workbook import ENGINE_CHOICES, load_workbook
+from flow_diagram.watch import watch_file
+from flow_diagram.writers import write_chunks, write_if_changed
+from flow_diagram.xlsx_reader import sheet_fingerprints
+
+# Bump when the generated output changes shape
+GENERATOR_VERSION = "2.6"
+
+# Columns each diagram builder reads per sheet (None: every column). The HTML
+# source tables read everything, so the projection only applies without them
+# or with --low-memory, where the tables are streamed from the workbook instead.
+SHEET_COLUMNS = {
+    'Requirment Document': ['Screen Name'],
+    ROLE_SHEET: [ROLE_COLUMN, ROLE_SCREENS_COLUMN],
+    TRANSITION_SHEET: None,
+}
+
+def read_excel_file(file_path, sheet_names=None, engine="auto", cache=None, columns=None, low_memory=False,
+                    workers=None):
+    """Read Excel file and return all sheets (or only sheet_names) as a dictionary"""
     try:
-        excel_file = pd.ExcelFile(file_path)
-        sheets_data = {}
-        
-        for sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-            sheets_data[sheet_name] = df
-        
-        return sheets_data
+        return load_workbook(file_path, sheet_names, engine=engine, cache=cache, columns=columns,
+                             low_memory=low_memory, workers=workers)
     except Exception as e:
         print(f"Error reading Excel file: {e}")
         return None
 
 def extract_screens_from_requirements(df):
     """Extract unique screen names from requirements document"""
-    screens = []
-    
-    # Look for screen names in the 'Screen Name' column
-    if 'Screen Name' in df.columns:
-        for idx, row in df.iterrows():
-            screen_name = row.get('Screen Name', '')
-            if pd.notna(screen_name) and str(screen_name).strip():
-                screen_name_clean = str(screen_name).strip()
-                if screen_name_clean and screen_name_clean.lower() != 'nan':
-                    screens.append(screen_name_clean)
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_screens = []
-    for screen in screens:
-        if screen not in seen:
-            seen.add(screen)
-            unique_screens.append(screen)
-    
-    return unique_screens
+    if 'Screen Name' not in df.columns:
+        return []
+    
+    # Clean each name once and keep first occurrences (dict preserves order)
+    names = {}
+    for value in iter_column(df, 'Screen Name'):
+        if is_missing(value):
+            continue
+        name = str(value).strip()
+        if name and name.lower() != 'nan':
+            names.setdefault(name, None)
+    
+    return list(names)
 
-def create_user_flow_diagram(screens, output_file):
-    """Create a user flow diagram based on screen names"""
-    
-    # Define logical flow connections
-    flow_map = {
-        'User Authentication System': ['Dashboard Overview'],
-        'Dashboard Overview': ['Inventory Management', 'Purchase Management', 'Sales Management', 'Expense Management', 'Reports', 'User Management'],
-        'Inventory Management': ['Purchase Management', 'Sales Management'],
-        'Purchase Management': ['Inventory Management', 'Expense Management'],
-        'Sales Management': ['Inventory Management', 'Reports'],
-        'Expense Management': ['Reports'],
-        'Reports': ['Dashboard Overview'],
-        'User Management': ['Dashboard Overview'],
-    }
-    
-    mermaid_code = "```mermaid\nflowchart TD\n"
-    
-    # Add start node
-    mermaid_code += "    Start([Start]) --> Login[User Authentication System]\n"
-    mermaid_code += "    Login --> Dashboard{Dashboard Overview}\n\n"
-    
-    # Add main screens
-    main_screens = ['Inventory Management', 'Purchase Management', 'Sales Management', 
-                    'Expense Management', 'Reports', 'User Management']
-    
-    for screen in main_screens:
-        if screen in screens:
-            screen_id = screen.replace(' ', '_').replace('-', '_')
-            mermaid_code += f"    Dashboard --> {screen_id}[\"{screen}\"]\n"
-    
-    # Add connections between screens
-    connections = [
-        ('Inventory_Management', 'Purchase_Management'),
-        ('Inventory_Management', 'Sales_Management'),
-        ('Purchase_Management', 'Expense_Management'),
-        ('Sales_Management', 'Reports'),
-        ('Expense_Management', 'Reports'),
-        ('Reports', 'Dashboard'),
-    ]
-    
-    for source, target in connections:
-        if source.replace('_', ' ') in screens or target.replace('_', ' ') in screens:
-            mermaid_code += f"    {source} --> {target}\n"
-    
-    # Add return to dashboard
-    mermaid_code += "\n    Reports --> Dashboard\n"
-    mermaid_code += "    User_Management --> Dashboard\n"
-    
-    mermaid_code += "\n    style Start fill:#228B22,stroke:#166534,stroke-width:2px,color:#fff\n"
-    mermaid_code += "    style Login fill:#3b82f6,stroke:#1e40af,stroke-width:2px,color:#fff\n"
-    mermaid_code += "    style Dashboard fill:#10b981,stroke:#059669,stroke-width:2px,color:#fff\n"
-    mermaid_code += "```"
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(mermaid_code)
-    
-    print(f"Mermaid flow diagram created: {output_file}")
-    return mermaid_code
+# Logical flow connections between screens, used when the workbook has no Screen Flow sheet
+FLOW_MAP = {
+    'User Authentication System': ['Dashboard Overview'],
+    'Dashboard Overview': ['Inventory Management', 'Purchase Management', 'Sales Management', 'Expense Management', 'Reports', 'User Management'],
+    'Inventory Management': ['Purchase Management', 'Sales Management'],
+    'Purchase Management': ['Inventory Management', 'Expense Management'],
+    'Sales Management': ['Inventory Management', 'Reports'],
+    'Expense Management': ['Reports'],
+    'Reports': ['Dashboard Overview'],
+    'User Management': ['Dashboard Overview'],
+}
 
-def create_detailed_flow_diagram(screens, sheets_data, output_file):
-    """Create a detailed HTML flow diagram with all screens"""
+# Main modules and the screens that belong to them
+MODULES = {
+    'Inventory Management': ['View Inventory', 'Add Item', 'Update Stock', 'Low Stock Alerts'],
+    'Purchase Management': ['View Orders', 'Create Order', 'Track Delivery', 'Supplier Management'],
+    'Sales Management': ['Record Sale', 'View Sales', 'Customer Management', 'Payment Tracking'],
+    'Expense Management': ['Record Expense', 'View Expenses', 'Category Analysis'],
+    'Reports': ['Financial Reports', 'Sales Reports', 'Expense Reports', 'Profit Analysis'],
+    'User Management': ['View Users', 'Add User', 'Manage Roles', 'Permissions'],
+}
+
+# Screens every role may use, whatever the User Mapping sheet lists
+ENTRY_SCREENS = ('Start', 'User Authentication System', 'Dashboard Overview')
+
+NODE_STYLES = {
+    'Start': "fill:#228B22,stroke:#166534,stroke-width:3px,color:#fff",
+    'User Authentication System': "fill:#3b82f6,stroke:#1e40af,stroke-width:2px,color:#fff",
+    'Dashboard Overview': "fill:#10b981,stroke:#059669,stroke-width:3px,color:#fff",
+    'Inventory Management': "fill:#fef3c7,stroke:#f59e0b,stroke-width:2px",
+    'Purchase Management': "fill:#dbeafe,stroke:#3b82f6,stroke-width:2px",
+    'Sales Management': "fill:#dcfce7,stroke:#10b981,stroke-width:2px",
+    'Expense Management': "fill:#fee2e2,stroke:#ef4444,stroke-width:2px",
+    'Reports': "fill:#e9d5ff,stroke:#a855f7,stroke-width:2px",
+    'User Management': "fill:#f3e8ff,stroke:#9333ea,stroke-width:2px",
+}
+
+def build_user_flow_graph(screens, transitions=None):
+    """Build the user flow graph for the identified screens
+
+    transitions ({screen: [next screens]} from the workbook's Screen Flow
+    sheet) replace the built-in FLOW_MAP and MODULES when given.
+    """
+    graph = FlowGraph()
     
-    html_content = """<!DOCTYPE html>
+    # Start and Login
+    start = graph.add_node('Start', node_id='Start', shape='stadium')
+    login = graph.add_node('User Authentication System', node_id='Login')
+    graph.add_node('Dashboard Overview', node_id='Dashboard', shape='diamond')
+    graph.add_edge(start, login)
+    
+    if transitions:
+        # Every identified screen is drawn, plus any screen the workbook's flows mention
+        for screen in screens:
+            graph.add_node(screen)
+        for source, targets in transitions.items():
+            for target in targets:
+                graph.add_edge(graph.add_node(source), graph.add_node(target))
+    else:
+        # A module is shown when it or one of its screens was identified
+        for module, sub_features in MODULES.items():
+            if any(s in screens for s in [module] + sub_features):
+                graph.add_node(module)
+        
+        # Connections between the screens that are on the diagram
+        for source, targets in FLOW_MAP.items():
+            for target in targets:
+                if graph.find(source) is not None and graph.find(target) is not None:
+                    graph.add_edge(graph.find(source), graph.find(target))
+    
+    for label, style in NODE_STYLES.items():
+        if graph.find(label) is not None:
+            graph.set_style(graph.find(label), style)
+    
+    return graph
+
+def build_reachability_index(graph, sheets_data):
+    """Index which screens each role in the User Mapping sheet can reach from Start"""
+    roles = read_role_screens(sheets_data.get(ROLE_SHEET))
+    return ReachabilityIndex(graph, graph.find('Start'), roles, ENTRY_SCREENS)
+
+def create_user_flow_diagram(graph, output_file):
+    """Create a Mermaid user flow diagram from the flow graph"""
+    if write_chunks(output_file, mermaid_file_chunks(graph)):
+        print(f"Mermaid flow diagram created: {output_file}")
+    else:
+        print(f"Mermaid flow diagram unchanged: {output_file}")
+    return output_file
+
+def role_output_paths(output_dir):
+    """Return the per-role diagram folder and the role summary file"""
+    return output_dir / "user-flow-roles", output_dir / "user-flow-roles.json"
+
+def manifest_sidecars(html_file, roles_dir, tables):
+    """Files written beside the outputs, by manifest entry: the paged-table chunks and the role diagrams"""
+    data_dir = html_file.parent / f"{html_file.stem}-data"
+    return {"html": sorted(data_dir.glob("sheet-*.js")) if tables == "paged" else [],
+            "roles": sorted(roles_dir.glob("*.mmd"))}
+
+def remove_role_flow_diagrams(roles_dir, summary_file):
+    """Remove the role diagrams of an earlier run whose workbook had roles"""
+    if roles_dir.is_dir():
+        for stale in roles_dir.glob("*.mmd"):
+            stale.unlink()
+        roles_dir.rmdir()
+    summary_file.unlink(missing_ok=True)
+
+def create_role_flow_diagrams(graph, index, roles_dir, summary_file):
+    """Create one Mermaid diagram per role, plus a JSON summary of the screens each role can reach"""
+    roles_dir.mkdir(parents=True, exist_ok=True)
+    written = set()
+    summary = {}
+    for role in index.roles:
+        role_file = roles_dir / f"{slugify(role, 'role')}.mmd"
+        if role_file.name in written:
+            role_file = roles_dir / f"{role_file.stem}-{len(written) + 1}.mmd"
+        written.add(role_file.name)
+        write_chunks(role_file, mermaid_file_chunks(graph.induced(index.role_nodes(role))))
+        summary[role] = {
+            "diagram": f"{roles_dir.name}/{role_file.name}",
+            "screens": [label for label in index.role_screens(role) if label != 'Start'],
+            "unmatched": index.unmatched.get(role, []),
+        }
+        print(f"  {role}: {len(summary[role]['screens'])} reachable screens")
+    
+    for stale in roles_dir.glob("*.mmd"):
+        if stale.name not in written:
+            stale.unlink()
+    if write_if_changed(summary_file, json.dumps(summary, indent=2, ensure_ascii=False) + "\n"):
+        print(f"Role flow diagrams created: {roles_dir}")
+    else:
+        print(f"Role flow diagrams unchanged: {roles_dir}")
+    return summary
+
+def detailed_html_chunks(graph, screens, sheets_data, table_meta=None, layout=None, index=None, search=None):
+    """Yield the detailed HTML page in fragments, one table row at a time
+
+    With table_meta (from write_sheet_chunks) the source data is shown in
+    paginated viewers that load the JSON chunks on demand instead of inline tables.
+    With a layout (from layout_graph) the diagram is embedded as static SVG
+    and the page needs no JavaScript to show it; otherwise Mermaid renders it.
+    With a ReachabilityIndex the page lists the screens each role can reach.
+    With a SearchIndex the page gets a search box; roles and inline table rows
+    are indexed as they are written and the index is embedded after them.
+    """
+    mermaid_script = "" if layout is not None else """
+    <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>"""
+    
+    yield """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>User Flow Diagram - Aziz Poultry</title>
-    <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>
+    <title>User Flow Diagram - Aziz Poultry</title>""" + mermaid_script + """
     <style>
         body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
@@ -142,7 +254,7 @@ def create_detailed_flow_diagram(screens, sheets_data, output_file):
             margin-top: 40px;
             margin-bottom: 20px;
         }
-        .mermaid {
+        .mermaid, .diagram {
             text-align: center;
             margin: 30px 0;
             padding: 20px;
@@ -168,6 +280,9 @@ def create_detailed_flow_diagram(screens, sheets_data, output_file):
             color: #228B22;
             font-size: 16px;
         }
+        .diagram {
+            overflow-x: auto;
+        }
         .data-table {
             margin-top: 30px;
             overflow-x: auto;
@@ -203,60 +318,23 @@ def create_detailed_flow_diagram(screens, sheets_data, output_file):
 <body>
     <div class="container">
         <h1>🐔 Aziz Poultry Farm Management System - User Flow Diagram</h1>
-        
+""" + (search_box_html() if search is not None else "") + """        
         <div class="info-box">
             <strong>Total Screens Identified:</strong> """ + str(len(screens)) + """
         </div>
         
         <h2>User Flow Diagram</h2>
-        <div class="mermaid">
 """
     
-    # Create comprehensive flow diagram
-    mermaid_code = "flowchart TD\n"
+    # Static SVG when laid out here, otherwise Mermaid source for the browser to render
+    if layout is not None:
+        yield '        <div class="diagram">\n'
+        yield from svg_chunks(graph, layout, "User Flow Diagram")
+    else:
+        yield '        <div class="mermaid">\n'
+        yield from mermaid_chunks(graph)
     
-    # Start and Login
-    mermaid_code += "    Start([User Starts]) --> Login[User Authentication System]\n"
-    mermaid_code += "    Login --> Dashboard{Dashboard Overview}\n\n"
-    
-    # Main modules
-    modules = {
-        'Inventory Management': ['View Inventory', 'Add Item', 'Update Stock', 'Low Stock Alerts'],
-        'Purchase Management': ['View Orders', 'Create Order', 'Track Delivery', 'Supplier Management'],
-        'Sales Management': ['Record Sale', 'View Sales', 'Customer Management', 'Payment Tracking'],
-        'Expense Management': ['Record Expense', 'View Expenses', 'Category Analysis'],
-        'Reports': ['Financial Reports', 'Sales Reports', 'Expense Reports', 'Profit Analysis'],
-        'User Management': ['View Users', 'Add User', 'Manage Roles', 'Permissions'],
-    }
-    
-    # Add modules
-    for module, sub_features in modules.items():
-        if any(s in screens for s in [module] + sub_features):
-            module_id = module.replace(' ', '_').replace('-', '_')
-            mermaid_code += f"    Dashboard --> {module_id}[\"{module}\"]\n"
-    
-    # Add connections
-    mermaid_code += "\n    Inventory_Management --> Purchase_Management\n"
-    mermaid_code += "    Inventory_Management --> Sales_Management\n"
-    mermaid_code += "    Purchase_Management --> Expense_Management\n"
-    mermaid_code += "    Sales_Management --> Reports\n"
-    mermaid_code += "    Expense_Management --> Reports\n"
-    mermaid_code += "    Reports --> Dashboard\n"
-    mermaid_code += "    User_Management --> Dashboard\n"
-    
-    # Styling
-    mermaid_code += "\n    style Start fill:#228B22,stroke:#166534,stroke-width:3px,color:#fff\n"
-    mermaid_code += "    style Login fill:#3b82f6,stroke:#1e40af,stroke-width:2px,color:#fff\n"
-    mermaid_code += "    style Dashboard fill:#10b981,stroke:#059669,stroke-width:3px,color:#fff\n"
-    mermaid_code += "    style Inventory_Management fill:#fef3c7,stroke:#f59e0b,stroke-width:2px\n"
-    mermaid_code += "    style Purchase_Management fill:#dbeafe,stroke:#3b82f6,stroke-width:2px\n"
-    mermaid_code += "    style Sales_Management fill:#dcfce7,stroke:#10b981,stroke-width:2px\n"
-    mermaid_code += "    style Expense_Management fill:#fee2e2,stroke:#ef4444,stroke-width:2px\n"
-    mermaid_code += "    style Reports fill:#e9d5ff,stroke:#a855f7,stroke-width:2px\n"
-    mermaid_code += "    style User_Management fill:#f3e8ff,stroke:#9333ea,stroke-width:2px\n"
-    
-    html_content += mermaid_code
-    html_content += """        </div>
+    yield """        </div>
         
         <h2>Identified Screens</h2>
         <div class="screens-list">
@@ -264,24 +342,57 @@ def create_detailed_flow_diagram(screens, sheets_data, output_file):
     
     # Add screen cards
     for screen in screens:
-        html_content += f"""            <div class="screen-card">
+        node = graph.find(screen)
+        card_id = f' id="screen-{graph.node_ids[node]}"' if search is not None and node is not None else ""
+        yield f"""            <div class="screen-card"{card_id}>
                 <h3>{screen}</h3>
             </div>
 """
     
-    html_content += """        </div>
-        
+    yield """        </div>
+"""
+    
+    # Screens each role can reach, straight from the precomputed index
+    if index is not None and index.roles:
+        yield """        
+        <h2>Role Access</h2>
+        <table class="role-access">
+            <tr><th>Role</th><th>Reachable Screens</th></tr>
+"""
+        for role_number, role in enumerate(index.roles):
+            reachable = [label for label in index.role_screens(role) if label != 'Start']
+            row_id = ""
+            if search is not None:
+                row_id = f' id="role-{role_number}"'
+                search.add_anchor(role, f"role-{role_number}")
+            yield (f"            <tr{row_id}><td>{html.escape(role)}</td>"
+                   f"<td>{html.escape(', '.join(str(label) for label in reachable))}</td></tr>\n")
+        yield "        </table>\n"
+    
+    yield """        
         <h2>Source Data</h2>
 """
     
     # Add data tables
-    for sheet_name, df in sheets_data.items():
-        html_content += f"<h3>{sheet_name}</h3>\n"
-        html_content += df.to_html(classes='data-table', table_id=f'table-{sheet_name.replace(" ", "-")}', escape=False, index=False)
-        html_content += "<br><br>\n"
-    
-    html_content += """    </div>
-    
+    if table_meta is not None:
+        yield from paged_tables_chunks(table_meta)
+    else:
+        for sheet_idx, (sheet_name, df) in enumerate(sheets_data.items()):
+            rows = iter_sheet_rows(df)
+            if search is not None:
+                rows = search.indexed_rows(sheet_idx, rows)
+            yield f"<h3>{sheet_name}</h3>\n"
+            yield from html_table(df.columns, rows, table_id=f'table-{sheet_name.replace(" ", "-")}', index=False,
+                                  row_id=f"row-{sheet_idx}-" if search is not None else None,
+                                  float_columns=sheet_float_columns(df))
+            yield "<br><br>\n"
+    
+    yield """    </div>
+"""
+    if search is not None:
+        yield from search_index_chunks(search)
+    if layout is None:
+        yield """    
     <script>
         mermaid.initialize({ 
             startOnLoad: true, 
@@ -293,62 +404,443 @@ def create_detailed_flow_diagram(screens, sheets_data, output_file):
             }
         });
     </script>
-</body>
+"""
+    yield """</body>
 </html>"""
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    print(f"HTML flow diagram created: {output_file}")
-    return html_content
 
-def main():
-    excel_files = [
-        "docs/Requirment Document .xlsx",
-        "Documentss/Requirment Document .xlsx",
-    ]
-    
-    excel_path = None
-    for path in excel_files:
-        if os.path.exists(path):
-            excel_path = path
-            break
-    
-    if not excel_path:
-        print("Excel file not found.")
-        return
+def create_detailed_flow_diagram(graph, screens, sheets_data, output_file, tables="inline", page_size=DEFAULT_PAGE_SIZE,
+                                 diagram="svg", layout_cache=None, index=None, search=True):
+    """Create a detailed HTML flow diagram with all screens"""
+    layout = layout_graph(graph, layout_cache) if diagram == "svg" else None
+    search_index = None
+    if search:
+        search_index = SearchIndex(sheets_data)
+        search_index.add_graph(graph)
+    table_meta = None
+    if tables == "paged":
+        data_dir = Path(output_file).parent / f"{Path(output_file).stem}-data"
+        table_meta = write_sheet_chunks(sheets_data, data_dir, page_size, search_index)
+    
+    chunks = detailed_html_chunks(graph, screens, sheets_data, table_meta, layout, index, search_index)
+    if write_chunks(output_file, chunks):
+        print(f"HTML flow diagram created: {output_file}")
+    else:
+        print(f"HTML flow diagram unchanged: {output_file}")
+    return output_file
+
+def diff_workbooks(old_path, new_path, output_dir, args):
+    """Compare two versions of the workbook and write the highlighted diff and JSON change list"""
+    print(f"Comparing {old_path} -> {new_path}\n")
+    cache = None if args.no_cache else SheetCache(args.cache_dir)
+    layout_cache = None if args.no_cache else args.cache_dir
+    old_sheets = load_workbook(old_path, engine=args.engine, cache=cache, workers=args.jobs)
+    new_sheets = load_workbook(new_path, engine=args.engine, cache=cache, workers=args.jobs)
+    
+    # Requirement rows are keyed by screen and role rows by user type; sheets
+    # with matching digests are unchanged and skip the row comparison
+    sheet_changes = diff_sheets(old_sheets, new_sheets,
+                                {'Requirment Document': 'Screen Name', ROLE_SHEET: ROLE_COLUMN})
+    graphs = []
+    for sheets_data in (old_sheets, new_sheets):
+        screens = extract_screens_from_requirements(sheets_data.get('Requirment Document', MemorySheet([], [])))
+        graphs.append(build_user_flow_graph(screens, read_transitions(sheets_data.get(TRANSITION_SHEET))))
+    old_graph, new_graph = graphs
+    graph_changes = diff_graphs(old_graph, new_graph, changed_row_labels(sheet_changes))
+    changes = change_list(sheet_changes, graph_changes, old_path, new_path)
+    
+    write_diff(diff_graph(old_graph, new_graph, graph_changes), changes, Path(output_dir), "user-flow-diagram",
+               "User Flow Changes", args.diagram, layout_cache)
+    summary = changes["summary"]
+    print(f"\nScreens: {summary['screens_added']} added, {summary['screens_removed']} removed, "
+          f"{summary['screens_changed']} changed")
+    print(f"Transitions: {summary['transitions_added']} added, {summary['transitions_removed']} removed")
+    print(f"Sheets: {summary['sheets_changed']} changed, {len(changes['sheets']['unchanged'])} unchanged")
+    if args.bundle:
+        bundle_outputs(output_dir, args)
+    return changes
+
+def bundle_outputs(output_dir, args):
+    """Write the offline bundle of the output directory: hashed assets, minified pages, .gz/.br siblings"""
+    stats = build_bundle(output_dir, renderer=find_renderer(args.mermaid_js))
+    print(f"\nBundle written to {Path(output_dir) / DEFAULT_BUNDLE_DIR}: {stats['files']} files, "
+          f"{stats['bytes'] / 1024:.0f} KB ({stats['gzip_bytes'] / 1024:.0f} KB gzipped)")
+
+def profile_paths(output_dir, args):
+    """Return where the --profile trace and cProfile dump go; in batch mode, inside each output folder"""
+    paths = []
+    for path in (args.profile, args.profile_cprofile):
+        if path and args.batch:
+            path = Path(output_dir) / Path(path).name
+        paths.append(path)
+    return paths
+
+def generate_diagrams(excel_path, output_dir, args):
+    """Generate the user flow diagrams for one workbook; returns 'generated' or 'up to date'"""
+    profiler = Profiler(enabled=bool(args.profile), cprofile=bool(args.profile_cprofile),
+                        trace_memory=args.profile_tracemalloc)
+    try:
+        status = _generate_diagrams(excel_path, Path(output_dir), args, profiler)
+        if args.bundle:
+            with profiler.stage("bundle"):
+                bundle_outputs(output_dir, args)
+        return status
+    finally:
+        if profiler.enabled:
+            trace_file, cprofile_file = profile_paths(output_dir, args)
+            profiler.report()
+            profiler.write(trace_file, cprofile_file, script=Path(__file__).name,
+                           workbook=str(excel_path), engine=args.engine, tables=args.tables)
+            print(f"\nProfile written to {trace_file} (slowest stage: {profiler.slowest})")
+
+def _generate_diagrams(excel_path, output_dir, args, profiler):
+    mermaid_file = output_dir / "user-flow-diagram.mmd"
+    html_file = output_dir / "user-flow-diagram.html"
+    output_files = output_paths(output_dir, "user-flow-diagram", args.formats)
+    
+    # Skip the whole run when the workbook and generator are unchanged
+    with profiler.stage("manifest_check"):
+        manifest = BuildManifest(output_dir)
+        generator = generator_version(GENERATOR_VERSION, __file__)
+        workbook_digest = file_digest(excel_path)
+        html_options = {"tables": args.tables, "page_size": args.page_size, "diagram": args.diagram,
+                        "search": not args.no_search}
+        roles_dir, roles_file = role_output_paths(output_dir)
+        up_to_date = not args.force and all(
+            manifest.is_current(output_file, generator, workbook_digest, html_options if name == "html" else None)
+            for name, output_file in output_files.items()) and (
+            roles_file.name not in manifest.entries or manifest.is_current(roles_file, generator, workbook_digest))
+    if up_to_date:
+        print(f"Flow diagrams are up to date: {output_dir}")
+        return "up to date"
     
     print(f"Reading Excel file: {excel_path}\n")
     
-    sheets_data = read_excel_file(excel_path)
-    if not sheets_data:
-        print("Failed to read Excel file.")
-        return
+    cache = None if args.no_cache else SheetCache(args.cache_dir)
+    layout_cache = None if args.no_cache else args.cache_dir
+    
+    # Only materialize the columns the diagrams read unless the HTML tables need them all
+    projected = args.low_memory or "html" not in output_files
+    # Batch mode already runs one workbook per core
+    workers = 1 if args.batch else args.jobs
+    with profiler.stage("read_excel_file") as stage:
+        if projected:
+            sheets_data = read_excel_file(excel_path, list(SHEET_COLUMNS), args.engine, cache, SHEET_COLUMNS,
+                                          args.low_memory, workers)
+        else:
+            sheets_data = read_excel_file(excel_path, engine=args.engine, cache=cache, workers=workers)
+        stage.count(sheets=lambda: len(sheets_data or {}),
+                    rows=lambda: sum(len(df) for df in (sheets_data or {}).values()))
+    if sheets_data is None or not (projected or sheets_data):
+        raise RuntimeError(f"Failed to read Excel file: {excel_path}")
+    
+    # With the projection the HTML source tables need every column: low_memory keeps
+    # them as lazy XlsxSheets that stream each row from the workbook while the table
+    # is written (categorical DataFrames on the pandas engine), instead of caching them
+    table_sheets = sheets_data
+    if projected:
+        table_sheets = {}
+        if "html" in output_files:
+            # The parallel engine would hold every sheet in memory
+            table_engine = "stream" if args.engine == "parallel" else args.engine
+            table_sheets = read_excel_file(excel_path, engine=table_engine, low_memory=True)
+        if table_sheets is None:
+            raise RuntimeError(f"Failed to read Excel file: {excel_path}")
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
     
     # Extract screens from requirements
-    req_df = sheets_data.get('Requirment Document', pd.DataFrame())
-    screens = extract_screens_from_requirements(req_df)
+    with profiler.stage("extract_screens_from_requirements") as stage:
+        req_df = sheets_data.get('Requirment Document', MemorySheet([], []))
+        screens = extract_screens_from_requirements(req_df)
+        stage.count(screens=len(screens))
     
     print(f"\nFound {len(screens)} unique screens:")
     for i, screen in enumerate(screens, 1):
         print(f"  {i}. {screen}")
     
-    # Create output directory
-    output_dir = Path("docs/flow-diagrams")
-    output_dir.mkdir(exist_ok=True)
+    with profiler.stage("sheet_digest"):
+        sheet_digests = {name: sheet_digest(df) for name, df in table_sheets.items()}
+        diagram_digests = sheet_digests
+        if projected:
+            diagram_digests = {name: sheet_digest(df) for name, df in sheets_data.items()}
+        flow_digests = {name: diagram_digests[name] for name in (TRANSITION_SHEET,) if name in diagram_digests}
+        role_digests = {name: diagram_digests[name] for name in (TRANSITION_SHEET, ROLE_SHEET)
+                        if name in diagram_digests}
+    
+    # Build the flow graph and the role reachability index once and pass them to every writer
+    with profiler.stage("build_user_flow_graph") as stage:
+        graph = build_user_flow_graph(screens, read_transitions(sheets_data.get(TRANSITION_SHEET)))
+        stage.count(nodes=graph.node_count, edges=graph.edge_count)
+    with profiler.stage("build_reachability_index") as stage:
+        index = build_reachability_index(graph, sheets_data)
+        stage.count(roles=len(index.roles))
+    
+    # One diagram per role in the User Mapping sheet
+    if not index.roles:
+        remove_role_flow_diagrams(roles_dir, roles_file)
+        manifest.forget(roles_file)
+    elif args.force or not manifest.inputs_unchanged(roles_file, generator, role_digests, screens):
+        with profiler.stage("emit_role_diagrams") as stage:
+            print(f"\nReachable screens per role:")
+            create_role_flow_diagrams(graph, index, roles_dir, roles_file)
+            stage.count(roles=len(index.roles))
+        manifest.record(roles_file, generator, workbook_digest, role_digests, screens,
+                        sidecars=manifest_sidecars(html_file, roles_dir, args.tables)["roles"])
+    else:
+        print(f"Inputs unchanged, skipped: {roles_dir}")
+    
+    # Mermaid and the graph exports depend only on the screens and the Screen
+    # Flow sheet, the HTML page on every sheet
+    inputs = {name: (sheet_digests, html_options) if name == "html" else (flow_digests, None)
+              for name in output_files}
+    stale = [name for name, output_file in output_files.items()
+             if args.force or not manifest.inputs_unchanged(output_file, generator, inputs[name][0], screens,
+                                                            inputs[name][1])]
+    
+    # Every selected format is written from the same graph, concurrently
+    writers = {}
+    if "mermaid" in stale:
+        writers["mermaid"] = partial(create_user_flow_diagram, graph, mermaid_file)
+    if "html" in stale:
+        writers["html"] = partial(create_detailed_flow_diagram, graph, screens, table_sheets, html_file, args.tables,
+                                  args.page_size, args.diagram, layout_cache, index, not args.no_search)
+    for name in stale:
+        if name in EXPORTERS:
+            writers[name] = partial(export_graph, graph, name, output_files[name], "User Flow Diagram")
+    for name, output_file in output_files.items():
+        if name not in stale:
+            print(f"Inputs unchanged, skipped: {output_file}")
+    
+    with profiler.stage("emit_outputs") as stage:
+        # cProfile only sees this thread, so the writers run here while it is on
+        seconds = run_exports(writers, workers=1 if profiler.cprofile else None)
+        stage.count(**{f"{name}_ms": round(value * 1000, 1) for name, value in seconds.items()},
+                    bytes=lambda: sum(output_files[name].stat().st_size for name in writers))
+    
+    with profiler.stage("manifest_save"):
+        sidecars = manifest_sidecars(html_file, roles_dir, args.tables)
+        for name, output_file in output_files.items():
+            digests, options = inputs[name]
+            manifest.record(output_file, generator, workbook_digest, digests, screens, options,
+                            sidecars.get(name, ()))
+        manifest.save()
     
-    # Create flow diagrams
+    print(f"\n✅ Flow diagrams created successfully!")
+    for name, output_file in output_files.items():
+        print(f"   - {format_label(name)} file: {output_file}")
+    if index.roles:
+        print(f"   - Role diagrams: {roles_dir} ({len(index.roles)} roles, summary in {roles_file.name})")
+    if "html" in output_files:
+        print(f"\nOpen {html_file} in your browser to view the interactive diagram!")
+    return "generated"
+
+def watch_diagrams(excel_path, output_dir, args):
+    """Stay resident and regenerate the user flow diagrams each time the workbook is saved"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
     mermaid_file = output_dir / "user-flow-diagram.mmd"
-    create_user_flow_diagram(screens, mermaid_file)
-    
     html_file = output_dir / "user-flow-diagram.html"
-    create_detailed_flow_diagram(screens, sheets_data, html_file)
+    output_files = output_paths(output_dir, "user-flow-diagram", args.formats)
+    roles_dir, roles_file = role_output_paths(output_dir)
+    manifest = BuildManifest(output_dir)
+    generator = generator_version(GENERATOR_VERSION, __file__)
+    html_options = {"tables": args.tables, "page_size": args.page_size, "diagram": args.diagram,
+                    "search": not args.no_search}
+    layout_cache = None if args.no_cache else args.cache_dir
+    
+    # Parsed sheets, their digests, the screen list, the graph and its
+    # reachability index stay in memory between saves
+    state = {"shared": None, "fingerprints": {}, "sheets": {}, "digests": {}, "screens": None, "graph": None,
+             "index": None}
+    
+    def refresh():
+        started = time.perf_counter()
+        shared, fingerprints = sheet_fingerprints(excel_path)
+        
+        # Only re-parse sheets whose XML changed; new shared strings can change any sheet
+        if shared != state["shared"]:
+            reparse = list(fingerprints)
+        else:
+            reparse = [name for name, fingerprint in fingerprints.items()
+                       if state["fingerprints"].get(name) != fingerprint]
+        
+        sheets_data = dict(state["sheets"])
+        if reparse:
+            parsed = read_excel_file(excel_path, reparse, engine=args.engine, workers=args.jobs)
+            if parsed is None:
+                raise RuntimeError(f"Failed to read Excel file: {excel_path}")
+            sheets_data.update((name, detach_sheet(sheet)) for name, sheet in parsed.items())
+        sheets_data = {name: sheets_data[name] for name in fingerprints if name in sheets_data}
+        
+        digests = {name: state["digests"][name] if name not in reparse else sheet_digest(sheets_data[name])
+                   for name in sheets_data}
+        changed = sorted(name for name in set(digests) | set(state["digests"])
+                         if digests.get(name) != state["digests"].get(name))
+        
+        screens = state["screens"]
+        if screens is None or 'Requirment Document' in changed:
+            screens = extract_screens_from_requirements(sheets_data.get('Requirment Document', MemorySheet([], [])))
+        
+        # Mermaid and the graph exports depend on the screens and the Screen Flow sheet,
+        # the role diagrams also on the User Mapping sheet, the HTML page on every sheet
+        graph = state["graph"]
+        flow_changed = screens != state["screens"] or TRANSITION_SHEET in changed
+        writers = {}
+        if flow_changed:
+            graph = build_user_flow_graph(screens, read_transitions(sheets_data.get(TRANSITION_SHEET)))
+            for name, output_file in output_files.items():
+                if name == "mermaid":
+                    writers[name] = partial(create_user_flow_diagram, graph, mermaid_file)
+                elif name in EXPORTERS:
+                    writers[name] = partial(export_graph, graph, name, output_file, "User Flow Diagram")
+        index = state["index"]
+        if flow_changed or ROLE_SHEET in changed:
+            index = build_reachability_index(graph, sheets_data)
+            if index.roles:
+                create_role_flow_diagrams(graph, index, roles_dir, roles_file)
+            else:
+                remove_role_flow_diagrams(roles_dir, roles_file)
+                manifest.forget(roles_file)
+        if "html" in output_files and (changed or screens != state["screens"]):
+            writers["html"] = partial(create_detailed_flow_diagram, graph, screens, sheets_data, html_file, args.tables,
+                                      args.page_size, args.diagram, layout_cache, index, not args.no_search)
+        run_exports(writers)
+        
+        state.update(shared=shared, fingerprints=fingerprints, sheets=sheets_data,
+                     digests=digests, screens=screens, graph=graph, index=index)
+        
+        workbook_digest = file_digest(excel_path)
+        flow_digests = {name: digests[name] for name in (TRANSITION_SHEET,) if name in digests}
+        sidecars = manifest_sidecars(html_file, roles_dir, args.tables)
+        for name, output_file in output_files.items():
+            if name == "html":
+                manifest.record(html_file, generator, workbook_digest, digests, screens, html_options,
+                                sidecars["html"])
+            else:
+                manifest.record(output_file, generator, workbook_digest, flow_digests, screens)
+        if index.roles:
+            role_digests = {name: digests[name] for name in (TRANSITION_SHEET, ROLE_SHEET) if name in digests}
+            manifest.record(roles_file, generator, workbook_digest, role_digests, screens,
+                            sidecars=sidecars["roles"])
+        manifest.save()
+        
+        if changed:
+            print(f"\n✅ Updated in {time.perf_counter() - started:.2f}s (changed sheets: {', '.join(changed)})")
+        else:
+            print(f"\nSaved without content changes, nothing regenerated")
+        if args.bundle:
+            bundle_outputs(output_dir, args)
+    
+    print(f"Watching {excel_path} (Ctrl+C to stop)\n")
+    refresh()
+    watch_file(excel_path, refresh)
+
+def main():
+    parser = argparse.ArgumentParser(description="Create user flow diagrams from the requirements Excel file")
+    parser.add_argument("workbooks", nargs="*",
+                        help="Workbooks or glob patterns (quote them, e.g. 'sites/**/*.xlsx'); "
+                             "with more than one, each gets its own folder under --output-dir")
+    parser.add_argument("--output-dir", default="docs/flow-diagrams",
+                        help="Output directory (default: docs/flow-diagrams)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Worker processes for batch mode, or per workbook with --engine parallel "
+                             "(default: one per CPU core)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Stay running and regenerate the diagrams whenever the workbook is saved")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(DEFAULT_FORMATS),
+                        help="Outputs to write from the one parsed graph: " + ", ".join(FORMATS)
+                             + " (default: mermaid html)")
+    parser.add_argument("--engine", choices=ENGINE_CHOICES, default="auto",
+                        help="Workbook reader: stream walks the sheet XML lazily without pandas, parallel streams "
+                             "every sheet in its own worker process, pandas loads DataFrames; auto streams .xlsx "
+                             "and .xlsm files and uses pandas for other formats (.xls, .xlsb, .ods)")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Only load the columns the diagrams read, keep repeated labels as categoricals and "
+                             "stream the HTML source tables row by row from the workbook instead of holding them "
+                             "in memory (stream engine; pandas loads them as categoricals)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always re-parse the Excel file instead of using the parse cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Parse cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--force", action="store_true",
+                        help="Regenerate every output even if its inputs are unchanged")
+    parser.add_argument("--tables", choices=TABLE_MODES, default="inline",
+                        help="Source data as inline HTML tables, or paged JSON chunks loaded on demand")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f"Rows per page/chunk with --tables paged (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument("--diagram", choices=["svg", "mermaid"], default="svg",
+                        help="Embed the diagram in the HTML page as static SVG laid out here (works offline, "
+                             "no JavaScript), or as Mermaid source rendered in the browser from a CDN")
+    parser.add_argument("--diff", metavar="OLD_WORKBOOK", default=None,
+                        help="Compare OLD_WORKBOOK with the workbook and write a highlighted Mermaid/HTML diff "
+                             "and a JSON change list (user-flow-diagram-diff.mmd/.html/.json) instead of the diagrams")
+    parser.add_argument("--no-search", action="store_true",
+                        help="Leave the search box and its prebuilt index out of the HTML page")
+    parser.add_argument("--bundle", action="store_true",
+                        help="Also write an offline bundle to OUTPUT_DIR/bundle: content-hashed CSS/JS assets, "
+                             "minified HTML and .gz (plus .br with brotli installed) siblings of every file")
+    parser.add_argument("--mermaid-js", metavar="PATH", default=None,
+                        help="mermaid.min.js to vendor into the bundle for --diagram mermaid "
+                             "(default: node_modules/mermaid/dist/mermaid.min.js)")
+    parser.add_argument("--profile", metavar="TRACE_JSON", default=None,
+                        help="Time every stage and write a JSON trace (wall/CPU time, memory, counts)")
+    parser.add_argument("--profile-cprofile", metavar="PROF_FILE", default=None,
+                        help="With --profile, also dump cProfile stats of the slowest stage (slows every stage)")
+    parser.add_argument("--profile-tracemalloc", action="store_true",
+                        help="With --profile, also record tracemalloc allocation deltas (slow)")
+    args = parser.parse_args()
+    args.batch = False
+    
+    if args.workbooks:
+        workbooks = expand_workbooks(args.workbooks)
+        if not workbooks:
+            print("No workbooks matched: " + ", ".join(args.workbooks))
+            sys.exit(1)
+        if len(workbooks) > 1 and args.watch:
+            print("--watch takes a single workbook")
+            sys.exit(1)
+        if len(workbooks) > 1 and args.diff:
+            print("--diff takes a single workbook")
+            sys.exit(1)
+        if len(workbooks) > 1:
+            args.batch = True
+            print(f"Generating user flow diagrams for {len(workbooks)} workbooks into {args.output_dir}\n")
+            results = run_batch(generate_diagrams, workbooks, args.output_dir, args, workers=args.jobs)
+            if print_batch_summary(results):
+                sys.exit(1)
+            return
+        excel_path = workbooks[0]
+    else:
+        excel_files = [
+            "docs/Requirment Document .xlsx",
+            "Documentss/Requirment Document .xlsx",
+        ]
+        
+        excel_path = None
+        for path in excel_files:
+            if os.path.exists(path):
+                excel_path = path
+                break
+        
+        if not excel_path:
+            print("Excel file not found.")
+            return
+    
+    if args.watch:
+        try:
+            watch_diagrams(excel_path, args.output_dir, args)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+        return
     
-    print(f"\n✅ Flow diagrams created successfully!")
-    print(f"   - Mermaid file: {mermaid_file}")
-    print(f"   - HTML file: {html_file}")
-    print(f"\nOpen {html_file} in your browser to view the interactive diagram!")
+    if args.diff:
+        diff_workbooks(args.diff, excel_path, args.output_dir, args)
+        return
+    
+    try:
+        generate_diagrams(excel_path, args.output_dir, args)
+    except RuntimeError as e:
+        print(e)
 
 if __name__ == "__main__":
     main()
-
@@ -1,30 +1,52 @@
 """
 Script to read Excel file and create a flow diagram
-Supports multiple formats: Mermaid (markdown), Graphviz (DOT), and HTML visualization
+Supports multiple formats: Mermaid (markdown), HTML visualization, Graphviz (DOT), node-link JSON and GraphML
 """
 
 import sys
 import os
-import pandas as pd
+import argparse
+import html
+from functools import partial
 from pathlib import Path
 
-def read_excel_file(file_path):
-    """Read Excel file and return all sheets as a dictionary"""
+from flow_diagram.batch import expand_workbooks, print_batch_summary, run_batch
+from flow_diagram.bundle import DEFAULT_BUNDLE_DIR, build_bundle, find_renderer
+from flow_diagram.cache import DEFAULT_CACHE_DIR, SheetCache, file_digest
+from flow_diagram.diff import change_list, changed_row_labels, diff_graph, diff_graphs, diff_sheets, write_diff
+from flow_diagram.html import html_table
+from flow_diagram.instrument import Profiler
+from flow_diagram.layout import layout_graph
+from flow_diagram.manifest import BuildManifest, generator_version, sheet_digest
+from flow_diagram.edges import add_sheet_to_graph
+from flow_diagram.exporters import DEFAULT_FORMATS, EXPORTERS, FORMATS, export_graph, format_label, output_paths, run_exports
+from flow_diagram.graph import FlowGraph
+from flow_diagram.mermaid import mermaid_chunks, mermaid_file_chunks
+from flow_diagram.partition import DEFAULT_MAX_NODES, STRATEGIES, partition_graph, partition_graphs, partition_page_name
+from flow_diagram.paged_tables import DEFAULT_PAGE_SIZE, TABLE_MODES, paged_tables_chunks, write_sheet_chunks
+from flow_diagram.search import SearchIndex, search_box_html, search_index_chunks
+from flow_diagram.sheets import iter_sheet_rows, sheet_float_columns, sheet_preview
+from flow_diagram.svg import svg_chunks
+from flow_diagram.workbook import ENGINE_CHOICES, load_workbook
+from flow_diagram.writers import write_chunks
+
+# Bump when the generated output changes shape
+GENERATOR_VERSION = "1.6"
+
+def read_excel_file(file_path, sheet_names=None, engine="auto", cache=None, low_memory=False, workers=None):
+    """Read Excel file and return all sheets (or only sheet_names) as a dictionary"""
     try:
-        # Read all sheets
-        excel_file = pd.ExcelFile(file_path)
-        sheets_data = {}
+        sheets_data = load_workbook(file_path, sheet_names, engine=engine, cache=cache, low_memory=low_memory,
+                                    workers=workers)
         
-        print(f"Found {len(excel_file.sheet_names)} sheet(s): {excel_file.sheet_names}")
+        print(f"Found {len(sheets_data)} sheet(s): {list(sheets_data)}")
         
-        for sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-            sheets_data[sheet_name] = df
+        for sheet_name, df in sheets_data.items():
             print(f"\nSheet: {sheet_name}")
             print(f"  Rows: {len(df)}, Columns: {len(df.columns)}")
             print(f"  Columns: {list(df.columns)}")
             print(f"  First few rows:")
-            print(df.head().to_string())
+            print(sheet_preview(df))
             print("-" * 80)
         
         return sheets_data
@@ -32,53 +54,46 @@ def read_excel_file(file_path):
         print(f"Error reading Excel file: {e}")
         return None
 
-def create_mermaid_flow_diagram(sheets_data, output_file):
-    """Create a Mermaid flow diagram from Excel data"""
-    mermaid_code = "```mermaid\nflowchart TD\n"
-    
-    # Try to identify flow relationships from the data
+def build_flow_graph(sheets_data):
+    """Build one graph from all sheets: each sheet is a subgraph, the first
+    column holds node names and the other columns their connections"""
+    graph = FlowGraph()
     for sheet_name, df in sheets_data.items():
         if df.empty:
             continue
-            
-        # Add sheet as a subgraph
-        mermaid_code += f"    subgraph {sheet_name.replace(' ', '_')}[\"{sheet_name}\"]\n"
-        
-        # Process rows - assume first column is node name, others are connections
-        for idx, row in df.iterrows():
-            if pd.notna(row.iloc[0]):  # First column as node name
-                node_name = str(row.iloc[0]).replace(' ', '_').replace('-', '_')
-                node_label = str(row.iloc[0])
-                
-                # Add node
-                mermaid_code += f"        {node_name}[\"{node_label}\"]\n"
-                
-                # Check for connections in other columns
-                for col_idx in range(1, len(row)):
-                    if pd.notna(row.iloc[col_idx]):
-                        target = str(row.iloc[col_idx]).replace(' ', '_').replace('-', '_')
-                        mermaid_code += f"        {node_name} --> {target}\n"
-        
-        mermaid_code += "    end\n\n"
-    
-    mermaid_code += "```"
-    
-    # Write to file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(mermaid_code)
-    
-    print(f"\nMermaid diagram created: {output_file}")
-    return mermaid_code
+        add_sheet_to_graph(graph, df, sheet_name)
+    return graph
 
-def create_detailed_flow_diagram(sheets_data, output_file):
-    """Create a more detailed HTML flow diagram"""
-    html_content = """<!DOCTYPE html>
+def create_mermaid_flow_diagram(graph, output_file):
+    """Create a Mermaid flow diagram from the flow graph"""
+    # Stream to file, leaving it untouched when the content is the same
+    if write_chunks(output_file, mermaid_file_chunks(graph)):
+        print(f"\nMermaid diagram created: {output_file}")
+    else:
+        print(f"\nMermaid diagram unchanged: {output_file}")
+    return output_file
+
+def detailed_html_chunks(graph, sheets_data, table_meta=None, layout=None, title=None, back_href=None,
+                         partition_links=None, search=None):
+    """Yield the detailed HTML page in fragments, one table row at a time
+
+    With table_meta (from write_sheet_chunks) the source data is shown in
+    paginated viewers that load the JSON chunks on demand instead of inline tables.
+    With a layout (from layout_graph) the diagram is embedded as static SVG
+    and the page needs no JavaScript to show it; otherwise Mermaid renders it.
+    Partition pages pass their title and a back_href to the overview and no
+    sheets; the overview lists partition_links as (name, href, node count).
+    With a SearchIndex the page gets a search box; inline table rows are
+    indexed as they are written and the index is embedded after them.
+    """
+    mermaid_script = "" if layout is not None else """
+    <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>"""
+    yield """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Flow Diagram</title>
-    <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>
+    <title>Flow Diagram</title>""" + mermaid_script + """
     <style>
         body {
             font-family: Arial, sans-serif;
@@ -98,10 +113,13 @@ def create_detailed_flow_diagram(sheets_data, output_file):
             border-bottom: 2px solid #228B22;
             padding-bottom: 10px;
         }
-        .mermaid {
+        .mermaid, .diagram {
             text-align: center;
             margin: 20px 0;
         }
+        .diagram {
+            overflow-x: auto;
+        }
         .data-table {
             margin-top: 30px;
             overflow-x: auto;
@@ -123,130 +141,395 @@ def create_detailed_flow_diagram(sheets_data, output_file):
         tr:nth-child(even) {
             background-color: #f9f9f9;
         }
+        .partitions {
+            columns: 3 220px;
+        }
     </style>
 </head>
 <body>
     <div class="container">
-        <h1>Flow Diagram - Aziz Poultry Farm Management System</h1>
-        <div class="mermaid">
 """
+    if back_href:
+        yield f'        <p><a href="{html.escape(back_href)}">&larr; Overview</a></p>\n'
+    yield f"        <h1>Flow Diagram - {html.escape(title or 'Aziz Poultry Farm Management System')}</h1>\n"
+    if search is not None:
+        yield search_box_html()
     
-    # Generate Mermaid diagram
-    mermaid_code = "flowchart TD\n"
+    # Static SVG when laid out here, otherwise Mermaid source for the browser to render
+    if layout is not None:
+        yield '        <div class="diagram">\n'
+        yield from svg_chunks(graph, layout, "Flow Diagram")
+    else:
+        yield '        <div class="mermaid">\n'
+        yield from mermaid_chunks(graph)
     
-    for sheet_name, df in sheets_data.items():
-        if df.empty:
-            continue
-        
-        mermaid_code += f"    subgraph {sheet_name.replace(' ', '_').replace('-', '_')}[\"{sheet_name}\"]\n"
-        
-        nodes = set()
-        connections = []
-        
-        for idx, row in df.iterrows():
-            if pd.notna(row.iloc[0]):
-                source = str(row.iloc[0]).strip()
-                if source:
-                    node_id = source.replace(' ', '_').replace('-', '_').replace('(', '').replace(')', '')
-                    nodes.add((node_id, source))
-                    
-                    # Check for connections
-                    for col_idx in range(1, len(row)):
-                        if pd.notna(row.iloc[col_idx]):
-                            target = str(row.iloc[col_idx]).strip()
-                            if target:
-                                target_id = target.replace(' ', '_').replace('-', '_').replace('(', '').replace(')', '')
-                                connections.append((node_id, target_id))
-                                nodes.add((target_id, target))
-        
-        # Add nodes
-        for node_id, node_label in nodes:
-            mermaid_code += f"        {node_id}[\"{node_label}\"]\n"
-        
-        # Add connections
-        for source, target in connections:
-            mermaid_code += f"        {source} --> {target}\n"
-        
-        mermaid_code += "    end\n\n"
+    yield "        </div>\n"
     
-    html_content += mermaid_code
-    html_content += """        </div>
-        
+    # The graph was too large for one diagram: link the partition pages
+    if partition_links:
+        yield f"        <h2>Partitions ({len(partition_links)})</h2>\n"
+        yield '        <ul class="partitions">\n'
+        for name, href, size in partition_links:
+            yield f'            <li><a href="{html.escape(href)}">{html.escape(name)}</a> ({size} nodes)</li>\n'
+        yield "        </ul>\n"
+    
+    # Add data tables
+    if table_meta is not None or sheets_data:
+        yield """        
         <div class="data-table">
             <h2>Source Data</h2>
 """
+        if table_meta is not None:
+            yield from paged_tables_chunks(table_meta)
+        else:
+            for sheet_idx, (sheet_name, df) in enumerate(sheets_data.items()):
+                rows = iter_sheet_rows(df)
+                if search is not None:
+                    rows = search.indexed_rows(sheet_idx, rows)
+                yield f"<h3>{sheet_name}</h3>\n"
+                yield from html_table(df.columns, rows, table_id=f'table-{sheet_name.replace(" ", "-")}',
+                                      row_id=f"row-{sheet_idx}-" if search is not None else None,
+                                      float_columns=sheet_float_columns(df))
+                yield "<br><br>\n"
+        yield "        </div>\n"
     
-    # Add data tables
-    for sheet_name, df in sheets_data.items():
-        html_content += f"<h3>{sheet_name}</h3>\n"
-        html_content += df.to_html(classes='data-table', table_id=f'table-{sheet_name.replace(" ", "-")}', escape=False)
-        html_content += "<br><br>\n"
-    
-    html_content += """        </div>
-    </div>
-    
+    yield "    </div>\n"
+    if search is not None:
+        yield from search_index_chunks(search)
+    if layout is None:
+        yield """    
     <script>
         mermaid.initialize({ startOnLoad: true, theme: 'default' });
     </script>
-</body>
+"""
+    yield """</body>
 </html>"""
+
+def create_detailed_flow_diagram(graph, sheets_data, output_file, tables="inline", page_size=DEFAULT_PAGE_SIZE,
+                                 diagram="svg", layout_cache=None, partition_links=None, search=True):
+    """Create a more detailed HTML flow diagram"""
+    layout = layout_graph(graph, layout_cache) if diagram == "svg" else None
+    search_index = None
+    if search:
+        search_index = SearchIndex(sheets_data)
+        search_index.add_graph(graph)
+    table_meta = None
+    if tables == "paged":
+        data_dir = Path(output_file).parent / f"{Path(output_file).stem}-data"
+        table_meta = write_sheet_chunks(sheets_data, data_dir, page_size, search_index)
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    chunks = detailed_html_chunks(graph, sheets_data, table_meta, layout, partition_links=partition_links,
+                                  search=search_index)
+    if write_chunks(output_file, chunks):
+        print(f"\nHTML flow diagram created: {output_file}")
+    else:
+        print(f"\nHTML flow diagram unchanged: {output_file}")
+    return output_file
+
+def create_partition_pages(parts, partitions, parts_dir, overview_file, mermaid=True, detailed=True,
+                           diagram="svg", layout_cache=None):
+    """Write a Mermaid file and a small HTML page per partition, removing pages left from a larger run"""
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    written = set()
+    for index, (part, partition) in enumerate(zip(parts, partitions)):
+        mermaid_page = parts_dir / partition_page_name(index, ".mmd")
+        html_page = parts_dir / partition_page_name(index)
+        written.update((mermaid_page.name, html_page.name))
+        if mermaid:
+            write_chunks(mermaid_page, mermaid_file_chunks(part))
+        if detailed:
+            layout = layout_graph(part, layout_cache) if diagram == "svg" else None
+            write_chunks(html_page, detailed_html_chunks(part, {}, layout=layout, title=partition["name"],
+                                                         back_href=f"../{overview_file.name}"))
     
-    print(f"\nHTML flow diagram created: {output_file}")
-    return html_content
+    for stale in parts_dir.glob("part-*"):
+        if stale.name not in written:
+            stale.unlink()
+    print(f"\n{len(parts)} partition diagrams written to {parts_dir}")
 
-def main():
-    # Find Excel file
-    excel_files = [
-        "docs/Requirment Document .xlsx",
-        "Documentss/Requirment Document .xlsx",
-        "docs/Requirement Document.xlsx"
-    ]
-    
-    excel_path = None
-    for path in excel_files:
-        if os.path.exists(path):
-            excel_path = path
-            break
-    
-    if not excel_path:
-        print("Excel file not found. Please provide the path to your Excel file.")
-        print("Looking for files in:")
-        for path in excel_files:
-            print(f"  - {path}")
+def remove_partition_pages(parts_dir):
+    """Remove the partition pages of an earlier run that needed them"""
+    if not parts_dir.is_dir():
         return
+    for stale in parts_dir.glob("part-*"):
+        stale.unlink()
+    parts_dir.rmdir()
+
+def diff_workbooks(old_path, new_path, output_dir, args):
+    """Compare two versions of the workbook and write the highlighted diff and JSON change list"""
+    print(f"Comparing {old_path} -> {new_path}\n")
+    cache = None if args.no_cache else SheetCache(args.cache_dir)
+    layout_cache = None if args.no_cache else args.cache_dir
+    old_sheets = load_workbook(old_path, engine=args.engine, cache=cache, workers=args.jobs)
+    new_sheets = load_workbook(new_path, engine=args.engine, cache=cache, workers=args.jobs)
+    
+    # Sheets with matching digests are unchanged and skip the row comparison
+    sheet_changes = diff_sheets(old_sheets, new_sheets)
+    old_graph = build_flow_graph(old_sheets)
+    new_graph = build_flow_graph(new_sheets)
+    graph_changes = diff_graphs(old_graph, new_graph, changed_row_labels(sheet_changes))
+    changes = change_list(sheet_changes, graph_changes, old_path, new_path)
+    
+    write_diff(diff_graph(old_graph, new_graph, graph_changes), changes, Path(output_dir), "flow-diagram",
+               "Flow Diagram Changes", args.diagram, layout_cache)
+    summary = changes["summary"]
+    print(f"\nScreens: {summary['screens_added']} added, {summary['screens_removed']} removed, "
+          f"{summary['screens_changed']} changed")
+    print(f"Transitions: {summary['transitions_added']} added, {summary['transitions_removed']} removed")
+    print(f"Sheets: {summary['sheets_changed']} changed, {len(changes['sheets']['unchanged'])} unchanged")
+    if args.bundle:
+        bundle_outputs(output_dir, args)
+    return changes
+
+def bundle_outputs(output_dir, args):
+    """Write the offline bundle of the output directory: hashed assets, minified pages, .gz/.br siblings"""
+    stats = build_bundle(output_dir, renderer=find_renderer(args.mermaid_js))
+    print(f"\nBundle written to {Path(output_dir) / DEFAULT_BUNDLE_DIR}: {stats['files']} files, "
+          f"{stats['bytes'] / 1024:.0f} KB ({stats['gzip_bytes'] / 1024:.0f} KB gzipped)")
+
+def profile_paths(output_dir, args):
+    """Return where the --profile trace and cProfile dump go; in batch mode, inside each output folder"""
+    paths = []
+    for path in (args.profile, args.profile_cprofile):
+        if path and args.batch:
+            path = Path(output_dir) / Path(path).name
+        paths.append(path)
+    return paths
+
+def generate_diagrams(excel_path, output_dir, args):
+    """Generate the Mermaid and HTML diagrams for one workbook; returns 'generated' or 'up to date'"""
+    profiler = Profiler(enabled=bool(args.profile), cprofile=bool(args.profile_cprofile),
+                        trace_memory=args.profile_tracemalloc)
+    try:
+        status = _generate_diagrams(excel_path, Path(output_dir), args, profiler)
+        if args.bundle:
+            with profiler.stage("bundle"):
+                bundle_outputs(output_dir, args)
+        return status
+    finally:
+        if profiler.enabled:
+            trace_file, cprofile_file = profile_paths(output_dir, args)
+            profiler.report()
+            profiler.write(trace_file, cprofile_file, script=Path(__file__).name,
+                           workbook=str(excel_path), engine=args.engine, tables=args.tables)
+            print(f"\nProfile written to {trace_file} (slowest stage: {profiler.slowest})")
+
+def _generate_diagrams(excel_path, output_dir, args, profiler):
+    mermaid_file = output_dir / "flow-diagram.mmd"
+    html_file = output_dir / "flow-diagram.html"
+    output_files = output_paths(output_dir, "flow-diagram", args.formats)
+    
+    # Skip the whole run when the workbook and generator are unchanged
+    with profiler.stage("manifest_check"):
+        manifest = BuildManifest(output_dir)
+        generator = generator_version(GENERATOR_VERSION, __file__)
+        workbook_digest = file_digest(excel_path)
+        partition_options = {"partition": args.partition, "max_nodes": args.max_nodes}
+        html_options = {"tables": args.tables, "page_size": args.page_size, "diagram": args.diagram,
+                        "search": not args.no_search, **partition_options}
+        output_options = {"mermaid": partition_options, "html": html_options}
+        up_to_date = not args.force and all(manifest.is_current(output_file, generator, workbook_digest,
+                                                                output_options.get(name))
+                                            for name, output_file in output_files.items())
+    if up_to_date:
+        print(f"Flow diagrams are up to date: {output_dir}")
+        return "up to date"
     
     print(f"Reading Excel file: {excel_path}\n")
     
+    cache = None if args.no_cache else SheetCache(args.cache_dir)
+    layout_cache = None if args.no_cache else args.cache_dir
+    
     # Read Excel file
-    sheets_data = read_excel_file(excel_path)
+    with profiler.stage("read_excel_file") as stage:
+        # Batch mode already runs one workbook per core
+        sheets_data = read_excel_file(excel_path, engine=args.engine, cache=cache, low_memory=args.low_memory,
+                                      workers=1 if args.batch else args.jobs)
+        stage.count(sheets=lambda: len(sheets_data or {}),
+                    rows=lambda: sum(len(df) for df in (sheets_data or {}).values()))
     
     if not sheets_data:
-        print("Failed to read Excel file.")
-        return
+        raise RuntimeError(f"Failed to read Excel file: {excel_path}")
     
-    # Create output directory
-    output_dir = Path("docs/flow-diagrams")
-    output_dir.mkdir(exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Create Mermaid markdown file
-    mermaid_file = output_dir / "flow-diagram.mmd"
-    create_mermaid_flow_diagram(sheets_data, mermaid_file)
+    with profiler.stage("sheet_digest"):
+        sheet_digests = {name: sheet_digest(df) for name, df in sheets_data.items()}
+        stale = [name for name, output_file in output_files.items()
+                 if args.force or not manifest.inputs_unchanged(output_file, generator, sheet_digests,
+                                                                options=output_options.get(name))]
     
-    # Create HTML visualization
-    html_file = output_dir / "flow-diagram.html"
-    create_detailed_flow_diagram(sheets_data, html_file)
+    # Build the graph once and hand it to every writer that needs regenerating
+    with profiler.stage("build_flow_graph") as stage:
+        graph = build_flow_graph(sheets_data) if stale else None
+        stage.count(nodes=lambda: graph.node_count if graph else 0,
+                    edges=lambda: graph.edge_count if graph else 0)
+    
+    # Large graphs become one small diagram per partition plus an overview
+    # with the partitions collapsed; the main files then show the overview
+    parts_dir = output_dir / f"{mermaid_file.stem}-parts"
+    diagram_graph = graph
+    partition_links = None
+    if "mermaid" in stale or "html" in stale:
+        with profiler.stage("partition_graph") as stage:
+            partitions = partition_graph(graph, args.max_nodes, args.partition)
+            stage.count(partitions=len(partitions))
+        if partitions:
+            with profiler.stage("emit_partitions") as stage:
+                parts, diagram_graph = partition_graphs(graph, partitions, parts_dir.name)
+                create_partition_pages(parts, partitions, parts_dir, html_file, "mermaid" in stale,
+                                       "html" in stale, args.diagram, layout_cache)
+                stage.count(pages=len(parts))
+            partition_links = [(partition["name"], f"{parts_dir.name}/{partition_page_name(index)}",
+                                len(partition["nodes"])) for index, partition in enumerate(partitions)]
+        else:
+            remove_partition_pages(parts_dir)
+    
+    # Every selected format is written from the same graph, concurrently
+    writers = {}
+    if "mermaid" in stale:
+        writers["mermaid"] = partial(create_mermaid_flow_diagram, diagram_graph, mermaid_file)
+    if "html" in stale:
+        writers["html"] = partial(create_detailed_flow_diagram, diagram_graph, sheets_data, html_file, args.tables,
+                                  args.page_size, args.diagram, layout_cache, partition_links, not args.no_search)
+    for name in stale:
+        if name in EXPORTERS:
+            writers[name] = partial(export_graph, graph, name, output_files[name], "Flow Diagram")
+    for name, output_file in output_files.items():
+        if name not in stale:
+            print(f"\nInputs unchanged, skipped: {output_file}")
+    
+    with profiler.stage("emit_outputs") as stage:
+        # cProfile only sees this thread, so the writers run here while it is on
+        seconds = run_exports(writers, workers=1 if profiler.cprofile else None)
+        stage.count(**{f"{name}_ms": round(value * 1000, 1) for name, value in seconds.items()},
+                    bytes=lambda: sum(output_files[name].stat().st_size for name in writers))
+    
+    with profiler.stage("manifest_save"):
+        # Partition pages and paged-table chunks are recorded with the output that writes them
+        data_dir = output_dir / f"{html_file.stem}-data"
+        sidecars = {"mermaid": sorted(parts_dir.glob("part-*.mmd")),
+                    "html": sorted(parts_dir.glob("part-*.html"))
+                            + (sorted(data_dir.glob("sheet-*.js")) if args.tables == "paged" else [])}
+        for name, output_file in output_files.items():
+            manifest.record(output_file, generator, workbook_digest, sheet_digests,
+                            options=output_options.get(name), sidecars=sidecars.get(name, ()))
+        manifest.save()
     
     print(f"\n✅ Flow diagrams created successfully!")
-    print(f"   - Mermaid file: {mermaid_file}")
-    print(f"   - HTML file: {html_file}")
-    print(f"\nYou can:")
-    print(f"   1. Open {html_file} in a browser to view the diagram")
-    print(f"   2. Use the Mermaid file in Markdown or Mermaid Live Editor")
-    print(f"   3. Import the Mermaid code into tools like Draw.io, Notion, or GitHub")
+    for name, output_file in output_files.items():
+        print(f"   - {format_label(name)} file: {output_file}")
+    if "html" in output_files:
+        print(f"\nYou can:")
+        print(f"   1. Open {html_file} in a browser to view the diagram")
+        print(f"   2. Use the Mermaid file in Markdown or Mermaid Live Editor")
+        print(f"   3. Import the Mermaid code into tools like Draw.io, Notion, or GitHub")
+    return "generated"
+
+def main():
+    parser = argparse.ArgumentParser(description="Create flow diagrams from the requirements Excel file")
+    parser.add_argument("workbooks", nargs="*",
+                        help="Workbooks or glob patterns (quote them, e.g. 'sites/**/*.xlsx'); "
+                             "with more than one, each gets its own folder under --output-dir")
+    parser.add_argument("--output-dir", default="docs/flow-diagrams",
+                        help="Output directory (default: docs/flow-diagrams)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Worker processes for batch mode, or per workbook with --engine parallel "
+                             "(default: one per CPU core)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(DEFAULT_FORMATS),
+                        help="Outputs to write from the one parsed graph: " + ", ".join(FORMATS)
+                             + " (default: mermaid html)")
+    parser.add_argument("--engine", choices=ENGINE_CHOICES, default="auto",
+                        help="Workbook reader: stream walks the sheet XML lazily without pandas, parallel streams "
+                             "every sheet in its own worker process, pandas loads DataFrames; auto streams .xlsx "
+                             "and .xlsm files and uses pandas for other formats (.xls, .xlsb, .ods)")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Keep repeated labels such as screen and module names as categoricals (pandas engine; "
+                             "streamed and cached sheets always share them), and with --no-cache stream each "
+                             "sheet from the workbook on every pass instead of holding its rows in memory")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always re-parse the Excel file instead of using the parse cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Parse cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--force", action="store_true",
+                        help="Regenerate every output even if its inputs are unchanged")
+    parser.add_argument("--tables", choices=TABLE_MODES, default="inline",
+                        help="Source data as inline HTML tables, or paged JSON chunks loaded on demand")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f"Rows per page/chunk with --tables paged (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument("--diagram", choices=["svg", "mermaid"], default="svg",
+                        help="Embed the diagram in the HTML page as static SVG laid out here (works offline, "
+                             "no JavaScript), or as Mermaid source rendered in the browser from a CDN")
+    parser.add_argument("--no-search", action="store_true",
+                        help="Leave the search box and its prebuilt index out of the HTML page")
+    parser.add_argument("--partition", choices=STRATEGIES, default="auto",
+                        help="How to split graphs larger than --max-nodes: by subgraph (sheet), weakly (wcc) or "
+                             "strongly (scc) connected component; auto picks subgraph or wcc; none keeps one diagram")
+    parser.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES,
+                        help=f"Largest graph drawn as a single diagram (default: {DEFAULT_MAX_NODES})")
+    parser.add_argument("--diff", metavar="OLD_WORKBOOK", default=None,
+                        help="Compare OLD_WORKBOOK with the workbook and write a highlighted Mermaid/HTML diff "
+                             "and a JSON change list (flow-diagram-diff.mmd/.html/.json) instead of the diagrams")
+    parser.add_argument("--bundle", action="store_true",
+                        help="Also write an offline bundle to OUTPUT_DIR/bundle: content-hashed CSS/JS assets, "
+                             "minified HTML and .gz (plus .br with brotli installed) siblings of every file")
+    parser.add_argument("--mermaid-js", metavar="PATH", default=None,
+                        help="mermaid.min.js to vendor into the bundle for --diagram mermaid "
+                             "(default: node_modules/mermaid/dist/mermaid.min.js)")
+    parser.add_argument("--profile", metavar="TRACE_JSON", default=None,
+                        help="Time every stage and write a JSON trace (wall/CPU time, memory, counts)")
+    parser.add_argument("--profile-cprofile", metavar="PROF_FILE", default=None,
+                        help="With --profile, also dump cProfile stats of the slowest stage (slows every stage)")
+    parser.add_argument("--profile-tracemalloc", action="store_true",
+                        help="With --profile, also record tracemalloc allocation deltas (slow)")
+    args = parser.parse_args()
+    args.batch = False
+    
+    if args.workbooks:
+        workbooks = expand_workbooks(args.workbooks)
+        if not workbooks:
+            print("No workbooks matched: " + ", ".join(args.workbooks))
+            sys.exit(1)
+        if len(workbooks) > 1 and args.diff:
+            print("--diff takes a single workbook")
+            sys.exit(1)
+        if len(workbooks) > 1:
+            args.batch = True
+            print(f"Generating flow diagrams for {len(workbooks)} workbooks into {args.output_dir}\n")
+            results = run_batch(generate_diagrams, workbooks, args.output_dir, args, workers=args.jobs)
+            if print_batch_summary(results):
+                sys.exit(1)
+            return
+        excel_path = workbooks[0]
+    else:
+        # Find Excel file
+        excel_files = [
+            "docs/Requirment Document .xlsx",
+            "Documentss/Requirment Document .xlsx",
+            "docs/Requirement Document.xlsx"
+        ]
+        
+        excel_path = None
+        for path in excel_files:
+            if os.path.exists(path):
+                excel_path = path
+                break
+        
+        if not excel_path:
+            print("Excel file not found. Please provide the path to your Excel file.")
+            print("Looking for files in:")
+            for path in excel_files:
+                print(f"  - {path}")
+            return
+    
+    if args.diff:
+        diff_workbooks(args.diff, excel_path, args.output_dir, args)
+        return
+    
+    try:
+        generate_diagrams(excel_path, args.output_dir, args)
+    except RuntimeError as e:
+        print(e)
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,258 @@
+"""
+Script to read purchase orders from the SQLite database and create purchase-lifecycle flow diagrams
+Supports multiple formats: Mermaid (markdown), HTML visualization, Graphviz (DOT), node-link JSON and GraphML
+"""
+
+import sys
+import os
+import argparse
+import html
+from functools import partial
+from pathlib import Path
+
+from flow_diagram.bundle import DEFAULT_BUNDLE_DIR, build_bundle, find_renderer
+from flow_diagram.cache import DEFAULT_CACHE_DIR
+from flow_diagram.exporters import DEFAULT_FORMATS, EXPORTERS, FORMATS, export_graph, format_label, output_paths, run_exports
+from flow_diagram.html import html_table
+from flow_diagram.layout import layout_graph
+from flow_diagram.mermaid import mermaid_chunks, mermaid_file_chunks
+from flow_diagram.purchases import (BIRDS, CAGES, DEFAULT_DATABASE, DEFAULT_TOP_SUPPLIERS, FETCH_SIZE, ORDERS, VALUE,
+                                    PurchaseFlows, build_lifecycle_graph, build_supplier_graph, read_purchases,
+                                    status_label)
+from flow_diagram.rollups import read_rollup_totals
+from flow_diagram.svg import svg_chunks
+from flow_diagram.writers import write_chunks
+
+LIFECYCLE_STEM = "purchase-lifecycle"
+SUPPLIER_STEM = "purchase-suppliers"
+
+def read_purchase_flows(db_path, fetch_size=FETCH_SIZE, from_rollups=False):
+    """Stream the purchases table and fold it into status and supplier totals in one pass
+
+    With from_rollups the totals come from the rollup tables kept by update-rollups.py instead.
+    """
+    if from_rollups:
+        flows = PurchaseFlows.from_totals(read_rollup_totals(db_path))
+        print(f"Read {flows.orders:,} purchase orders from the rollups in {db_path}")
+    else:
+        flows = PurchaseFlows.from_rows(read_purchases(db_path, fetch_size))
+        print(f"Read {flows.orders:,} purchase orders from {db_path}")
+    for status in flows.statuses():
+        print(f"  {status_label(status)}: {flows.by_status[status][ORDERS]:,}")
+    return flows
+
+def status_rows(flows):
+    """Yield one summary row per status: orders, birds, cages and total value"""
+    for status in flows.statuses():
+        totals = flows.by_status[status]
+        yield [status_label(status), totals[ORDERS], totals[BIRDS], totals[CAGES], f"{totals[VALUE]:,.2f}"]
+
+def supplier_rows(flows):
+    """Yield one row per supplier, most orders first: orders per status, then birds, cages and total value"""
+    statuses = flows.statuses()
+    totals = flows.supplier_totals()
+    for supplier in flows.top_suppliers(None):
+        counts = [flows.by_supplier.get((supplier, status), [0])[ORDERS] for status in statuses]
+        entry = totals[supplier]
+        yield [supplier, *counts, entry[BIRDS], entry[CAGES], f"{entry[VALUE]:,.2f}"]
+
+def create_mermaid_flow_diagram(graph, output_file):
+    """Create a Mermaid flowchart file"""
+    if write_chunks(output_file, mermaid_file_chunks(graph)):
+        print(f"Mermaid diagram created: {output_file}")
+    else:
+        print(f"Mermaid diagram unchanged: {output_file}")
+    return output_file
+
+def purchase_html_chunks(diagrams, flows, db_path):
+    """Yield the purchase flow page: each (title, graph, layout) diagram, then the status and supplier tables
+
+    A diagram without a layout is left to Mermaid in the browser.
+    """
+    mermaid_script = "" if all(layout is not None for _, _, layout in diagrams) else """
+    <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>"""
+    yield """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Purchase Flow Diagram</title>""" + mermaid_script + """
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            padding: 20px;
+            background: #f5f5f5;
+        }
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            background: white;
+            padding: 20px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        h1 {
+            color: #333;
+            border-bottom: 2px solid #228B22;
+            padding-bottom: 10px;
+        }
+        .mermaid, .diagram {
+            text-align: center;
+            margin: 20px 0;
+        }
+        .diagram {
+            overflow-x: auto;
+        }
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-top: 20px;
+        }
+        th, td {
+            border: 1px solid #ddd;
+            padding: 8px;
+            text-align: left;
+        }
+        th {
+            background-color: #228B22;
+            color: white;
+        }
+        tr:nth-child(even) {
+            background-color: #f9f9f9;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Purchase Flow - Aziz Poultry Farm Management System</h1>
+"""
+    yield f"        <p>{flows.orders:,} purchase orders from <code>{html.escape(str(db_path))}</code></p>\n"
+    yield ("        <p>Each order's status is set when it is placed and the database keeps only that status, "
+           "so the edges count orders by their current status, not moves between statuses.</p>\n")
+
+    for title, graph, layout in diagrams:
+        yield f"        <h2>{html.escape(title)}</h2>\n"
+        if layout is not None:
+            yield '        <div class="diagram">\n'
+            yield from svg_chunks(graph, layout, title)
+        else:
+            yield '        <div class="mermaid">\n'
+            yield from mermaid_chunks(graph)
+        yield "        </div>\n"
+
+    yield "        <h2>Orders by Status</h2>\n"
+    yield from html_table(["Status", "Orders", "Birds", "Cages", "Total Value"], status_rows(flows),
+                          table_id="table-status", index=False, escape=True)
+    yield "        <h2>Orders by Supplier</h2>\n"
+    columns = ["Supplier", *(status_label(status) for status in flows.statuses()), "Birds", "Cages", "Total Value"]
+    yield from html_table(columns, supplier_rows(flows), table_id="table-suppliers", index=False, escape=True)
+
+    yield "    </div>\n"
+    if mermaid_script:
+        yield """
+    <script>
+        mermaid.initialize({ startOnLoad: true, theme: 'default' });
+    </script>
+"""
+    yield """</body>
+</html>"""
+
+def create_purchase_html(lifecycle, suppliers, flows, db_path, output_file, diagram="svg", layout_cache=None):
+    """Create the HTML page with both purchase diagrams and their totals"""
+    diagrams = [(title, graph, layout_graph(graph, layout_cache) if diagram == "svg" else None)
+                for title, graph in (("Orders by Current Status", lifecycle), ("Suppliers to Status", suppliers))]
+    if write_chunks(output_file, purchase_html_chunks(diagrams, flows, db_path)):
+        print(f"HTML flow diagram created: {output_file}")
+    else:
+        print(f"HTML flow diagram unchanged: {output_file}")
+    return output_file
+
+def bundle_outputs(output_dir, args):
+    """Write the offline bundle of the output directory: hashed assets, minified pages, .gz/.br siblings"""
+    stats = build_bundle(output_dir, renderer=find_renderer(args.mermaid_js))
+    print(f"\nBundle written to {Path(output_dir) / DEFAULT_BUNDLE_DIR}: {stats['files']} files, "
+          f"{stats['bytes'] / 1024:.0f} KB ({stats['gzip_bytes'] / 1024:.0f} KB gzipped)")
+
+def generate_diagrams(db_path, output_dir, args):
+    """Aggregate the purchases table and write the lifecycle and supplier diagrams in every selected format"""
+    output_dir = Path(output_dir)
+    flows = read_purchase_flows(db_path, args.fetch_size, args.from_rollups)
+    if not flows.orders:
+        print("No purchase orders found.")
+        return
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    lifecycle = build_lifecycle_graph(flows)
+    suppliers = build_supplier_graph(flows, args.top_suppliers)
+    layout_cache = None if args.no_cache else args.cache_dir
+
+    # The HTML page shows both graphs; every other format gets one file per graph
+    graph_formats = [name for name in args.formats if name != "html"]
+    outputs = {stem: output_paths(output_dir, stem, graph_formats) for stem in (LIFECYCLE_STEM, SUPPLIER_STEM)}
+    html_file = output_dir / "purchase-flow-diagram.html"
+    writers = {}
+    for stem, graph, title in ((LIFECYCLE_STEM, lifecycle, "Purchase Lifecycle"),
+                               (SUPPLIER_STEM, suppliers, "Purchase Suppliers")):
+        for name, output_file in outputs[stem].items():
+            if name == "mermaid":
+                writers[f"{stem}.{name}"] = partial(create_mermaid_flow_diagram, graph, output_file)
+            elif name in EXPORTERS:
+                writers[f"{stem}.{name}"] = partial(export_graph, graph, name, output_file, title)
+    if "html" in args.formats:
+        writers["html"] = partial(create_purchase_html, lifecycle, suppliers, flows, db_path, html_file,
+                                  args.diagram, layout_cache)
+    run_exports(writers)
+
+    print(f"\n✅ Purchase flow diagrams created successfully!")
+    for stem in outputs:
+        for name, output_file in outputs[stem].items():
+            print(f"   - {format_label(name)} file: {output_file}")
+    if "html" in args.formats:
+        print(f"   - HTML file: {html_file}")
+    if args.bundle:
+        bundle_outputs(output_dir, args)
+
+def main():
+    parser = argparse.ArgumentParser(description="Create purchase-lifecycle flow diagrams from the SQLite database")
+    parser.add_argument("database", nargs="?", default=DEFAULT_DATABASE,
+                        help=f"SQLite database written by the app (default: {DEFAULT_DATABASE}); opened read-only")
+    parser.add_argument("--output-dir", default="docs/flow-diagrams",
+                        help="Output directory (default: docs/flow-diagrams)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(DEFAULT_FORMATS),
+                        help="Outputs to write: " + ", ".join(FORMATS) + " (default: mermaid html)")
+    parser.add_argument("--fetch-size", type=int, default=FETCH_SIZE,
+                        help=f"Rows fetched from the database at a time (default: {FETCH_SIZE})")
+    parser.add_argument("--from-rollups", action="store_true",
+                        help="Read the totals from the rollup tables kept by update-rollups.py instead of "
+                             "scanning every purchase")
+    parser.add_argument("--top-suppliers", type=int, default=DEFAULT_TOP_SUPPLIERS,
+                        help="Suppliers drawn individually, by order count; the rest share one node "
+                             f"(default: {DEFAULT_TOP_SUPPLIERS})")
+    parser.add_argument("--diagram", choices=["svg", "mermaid"], default="svg",
+                        help="Embed the diagrams in the HTML page as static SVG laid out here (works offline, "
+                             "no JavaScript), or as Mermaid source rendered in the browser from a CDN")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always lay the diagrams out again instead of using the layout cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Layout cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--bundle", action="store_true",
+                        help="Also write an offline bundle to OUTPUT_DIR/bundle: content-hashed CSS/JS assets, "
+                             "minified HTML and .gz (plus .br with brotli installed) siblings of every file")
+    parser.add_argument("--mermaid-js", metavar="PATH", default=None,
+                        help="mermaid.min.js to vendor into the bundle for --diagram mermaid "
+                             "(default: node_modules/mermaid/dist/mermaid.min.js)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"Database not found: {args.database}")
+        print("Run the app once (npm run dev) to create it, or pass the path to aziz-poultry.db")
+        sys.exit(1)
+
+    try:
+        generate_diagrams(args.database, args.output_dir, args)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Shared helpers for the flow diagram scripts in this directory
+"""
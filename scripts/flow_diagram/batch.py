@@ -0,0 +1,124 @@
+"""
+Batch generation of flow diagrams for many workbooks
+
+Each workbook is generated into its own output directory by a process pool
+sized to the machine's cores. A failure in one workbook is recorded in the
+summary and does not stop the others.
+"""
+
+import contextlib
+import glob
+import io
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+
+def expand_workbooks(patterns):
+    """Expand paths and glob patterns (** allowed) into a de-duplicated list of workbook files"""
+    workbooks = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            path = os.path.normpath(match)
+            if os.path.isfile(path) and path not in seen:
+                seen.add(path)
+                workbooks.append(path)
+    return workbooks
+
+
+def slugify(text, default="workbook"):
+    """Lower-case text and join its words with hyphens, for file names"""
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or default
+
+
+def batch_output_dirs(workbooks, output_root):
+    """Give every workbook its own directory under output_root, named after the file
+
+    Workbooks sharing a file name (e.g. one per site folder) are told apart by
+    their parent folder's name.
+    """
+    stems = [slugify(Path(workbook).stem) for workbook in workbooks]
+    output_dirs = {}
+    taken = set()
+    for workbook, stem in zip(workbooks, stems):
+        name = stem if stems.count(stem) == 1 else f"{slugify(Path(workbook).parent.name)}-{stem}"
+        candidate = name
+        suffix = 2
+        while candidate in taken:
+            candidate = f"{name}-{suffix}"
+            suffix += 1
+        taken.add(candidate)
+        output_dirs[workbook] = Path(output_root) / candidate
+    return output_dirs
+
+
+def _run_job(generate, workbook, output_dir, options):
+    """Run one workbook in a worker, capturing its console output"""
+    log = io.StringIO()
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            status = generate(workbook, output_dir, options)
+        error = None
+    except Exception as e:
+        status = "failed"
+        error = f"{type(e).__name__}: {e}"
+    return {
+        "workbook": workbook,
+        "output_dir": str(output_dir),
+        "status": status,
+        "error": error,
+        "seconds": time.perf_counter() - started,
+        "log": log.getvalue(),
+    }
+
+
+def run_batch(generate, workbooks, output_root, options, workers=None):
+    """Generate every workbook in parallel and return one result dict per workbook, in input order
+
+    generate(workbook, output_dir, options) must be a picklable top-level
+    function returning a short status string; an exception marks that
+    workbook as failed.
+    """
+    output_dirs = batch_output_dirs(workbooks, output_root)
+    workers = workers or os.cpu_count() or 1
+    results = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(workbooks))) as pool:
+        futures = {
+            pool.submit(_run_job, generate, workbook, output_dirs[workbook], options): workbook
+            for workbook in workbooks
+        }
+        for future in as_completed(futures):
+            workbook = futures[future]
+            try:
+                results[workbook] = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. killed or out of memory)
+                results[workbook] = {
+                    "workbook": workbook,
+                    "output_dir": str(output_dirs[workbook]),
+                    "status": "failed",
+                    "error": f"{type(e).__name__}: {e}",
+                    "seconds": 0.0,
+                    "log": "",
+                }
+            print(f"  [{results[workbook]['status']}] {workbook}")
+    return [results[workbook] for workbook in workbooks]
+
+
+def print_batch_summary(results):
+    """Print a per-workbook summary and return the number of failures"""
+    failed = [result for result in results if result["status"] == "failed"]
+    print(f"\nBatch summary: {len(results) - len(failed)} succeeded, {len(failed)} failed")
+    for result in results:
+        print(f"  {result['status']:<11} {result['seconds']:6.2f}s  {result['workbook']} -> {result['output_dir']}")
+    for result in failed:
+        print(f"\n❌ {result['workbook']}: {result['error']}")
+        tail = result["log"].strip().splitlines()[-5:]
+        for line in tail:
+            print(f"     {line}")
+    return len(failed)
@@ -0,0 +1,189 @@
+"""
+Self-contained, precompressed bundle of the generated outputs
+
+build_bundle copies an output directory into a bundle directory that a
+static server can publish as-is, with no internet access needed:
+
+- Each HTML page's inline <style> blocks become one minified stylesheet and
+  its inline scripts become script files, all under assets/ with the content
+  hash in the name. Pages of the same kind share the same assets, so they
+  can be cached for good and are downloaded once.
+- The Mermaid CDN script is replaced by a vendored copy of mermaid.min.js
+  (only pages drawn with --diagram mermaid need it).
+- The HTML is minified: indentation and blank lines are dropped outside
+  <pre>, <textarea> and <script> elements.
+- Every file gets a .gz sibling, and a .br sibling when the optional brotli
+  package is installed, for servers that send precompressed files.
+
+Files are only rewritten (and recompressed) when their bytes change, and
+anything in the bundle directory that the outputs no longer produce is
+removed.
+"""
+
+import gzip
+import hashlib
+import re
+from pathlib import Path
+
+from flow_diagram.writers import write_bytes_if_changed
+
+try:
+    import brotli
+except ImportError:  # .br siblings are optional
+    brotli = None
+
+DEFAULT_BUNDLE_DIR = "bundle"
+ASSETS_DIR = "assets"
+MERMAID_CDN = "https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"
+# Where a vendored renderer is looked for, relative to the working directory and the repository root
+RENDERER_PATHS = ("node_modules/mermaid/dist/mermaid.min.js",)
+
+_STYLE = re.compile(r"<style>(.*?)</style>\n?", re.S)
+_SCRIPT = re.compile(r"<script>(.*?)</script>", re.S)
+_CDN_SCRIPT = re.compile(r'<script src="' + re.escape(MERMAID_CDN) + r'"></script>')
+_PROTECTED = re.compile(r"<(pre|textarea|script)\b.*?</\1>", re.S)
+_LINE_BREAK = re.compile(r"\s*\n\s*")
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE = re.compile(r"\s*([{};,>])\s*")
+
+
+def _gzip(data):
+    return gzip.compress(data, 9, mtime=0)
+
+
+COMPRESSORS = [(".gz", _gzip)]
+if brotli is not None:
+    COMPRESSORS.append((".br", lambda data: brotli.compress(data, quality=11)))
+
+
+def find_renderer(path=None):
+    """Return the mermaid.min.js to vendor: path if given, else the first of RENDERER_PATHS found, else None"""
+    if path:
+        if not Path(path).is_file():
+            raise RuntimeError(f"Mermaid renderer not found: {path}")
+        return Path(path)
+    for root in (Path.cwd(), Path(__file__).resolve().parents[2]):
+        for candidate in RENDERER_PATHS:
+            if (root / candidate).is_file():
+                return root / candidate
+    return None
+
+
+def minify_css(css):
+    """Drop comments and the whitespace around punctuation, e.g. "h1 {\\n  color: #333;\\n}" -> "h1{color:#333}" """
+    css = _CSS_COMMENT.sub("", css)
+    css = _CSS_SPACE.sub(r"\1", css.strip())
+    return re.sub(r":\s+", ":", css).replace(";}", "}")
+
+
+def minify_html(text):
+    """Remove indentation and blank lines, leaving <pre>, <textarea> and <script> contents untouched"""
+    parts = []
+    position = 0
+    for match in _PROTECTED.finditer(text):
+        parts.append(_LINE_BREAK.sub("\n", text[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_LINE_BREAK.sub("\n", text[position:]))
+    return "".join(parts).strip() + "\n"
+
+
+def asset_name(stem, data, suffix):
+    """Content-hashed file name, e.g. flow.3f2a9c1b0d4e5f67.css"""
+    return f"{stem}.{hashlib.blake2b(data, digest_size=8).hexdigest()}{suffix}"
+
+
+class _Bundle:
+    """Assets collected from the pages and the files written so far"""
+
+    def __init__(self, bundle_dir, renderer):
+        self.bundle_dir = bundle_dir
+        self.renderer = renderer
+        self._renderer_name = None
+        self.assets = {}
+        self.written = set()
+        self.stats = {"files": 0, "bytes": 0, "gzip_bytes": 0}
+
+    def add_asset(self, stem, data, suffix):
+        name = asset_name(stem, data, suffix)
+        self.assets[name] = data
+        return name
+
+    def renderer_asset(self):
+        if self._renderer_name is None:
+            if self.renderer is None:
+                raise RuntimeError("Pages drawn with Mermaid need a local mermaid.min.js to bundle: "
+                                   "pass --mermaid-js or use --diagram svg")
+            self._renderer_name = self.add_asset("mermaid", Path(self.renderer).read_bytes(), ".min.js")
+        return self._renderer_name
+
+    def page(self, text, depth):
+        """Move a page's styles and scripts into assets and minify what is left"""
+        prefix = "../" * depth + f"{ASSETS_DIR}/"
+        styles = _STYLE.findall(text)
+        if styles:
+            css = minify_css("\n".join(styles)).encode("utf-8")
+            link = f'<link rel="stylesheet" href="{prefix}{self.add_asset("flow", css, ".css")}">\n'
+            # The combined stylesheet takes the place of the first block, in the head
+            first = _STYLE.search(text).start()
+            text = _STYLE.sub(lambda match: link if match.start() == first else "", text)
+        if _CDN_SCRIPT.search(text):
+            text = _CDN_SCRIPT.sub(f'<script src="{prefix}{self.renderer_asset()}"></script>', text)
+        text = _SCRIPT.sub(lambda match: f'<script src="{prefix}'
+                           f'{self.add_asset("script", match.group(1).encode("utf-8"), ".js")}"></script>', text)
+        return minify_html(text)
+
+    def emit(self, target, data):
+        """Write one file and its compressed siblings, recompressing only when it changed"""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        changed = write_bytes_if_changed(target, data)
+        self.written.add(target)
+        self.stats["files"] += 1
+        self.stats["bytes"] += len(data)
+        for suffix, compress in COMPRESSORS:
+            sibling = target.with_name(target.name + suffix)
+            self.written.add(sibling)
+            if changed or not sibling.exists():
+                write_bytes_if_changed(sibling, compress(data))
+            if suffix == ".gz":
+                self.stats["gzip_bytes"] += sibling.stat().st_size
+
+    def remove_stale(self):
+        for path in sorted(self.bundle_dir.rglob("*"), key=lambda path: len(path.parts), reverse=True):
+            if path.is_file() and path not in self.written:
+                path.unlink()
+            elif path.is_dir() and not any(path.iterdir()):
+                path.rmdir()
+
+
+def _output_files(output_dir, bundle_dir):
+    for path in sorted(output_dir.rglob("*")):
+        relative = path.relative_to(output_dir)
+        # Skip the manifest, temporary files and the bundle itself
+        if any(part.startswith(".") for part in relative.parts) or path == bundle_dir or bundle_dir in path.parents:
+            continue
+        if path.is_file():
+            yield path, relative
+
+
+def build_bundle(output_dir, bundle_dir=None, renderer=None):
+    """Write the bundle of output_dir (default: its bundle/ subdirectory) and return its size stats
+
+    renderer is the mermaid.min.js to vendor (see find_renderer); it is only
+    read when a page loads Mermaid from the CDN. The stats dict has the number
+    of files, their total bytes and the total size of the .gz siblings.
+    """
+    output_dir = Path(output_dir).resolve()
+    bundle_dir = Path(bundle_dir).resolve() if bundle_dir else output_dir / DEFAULT_BUNDLE_DIR
+    bundle = _Bundle(bundle_dir, renderer)
+
+    for path, relative in _output_files(output_dir, bundle_dir):
+        data = path.read_bytes()
+        if path.suffix == ".html":
+            data = bundle.page(data.decode("utf-8"), len(relative.parts) - 1).encode("utf-8")
+        bundle.emit(bundle_dir / relative, data)
+    for name, data in bundle.assets.items():
+        bundle.emit(bundle_dir / ASSETS_DIR / name, data)
+
+    bundle.remove_stale()
+    return bundle.stats
@@ -0,0 +1,353 @@
+"""
+On-disk parse cache for requirement workbooks
+
+Parsed sheets are stored in a small columnar binary file per sheet, keyed by
+the workbook's content hash, the sheet name and the reader options. Entries
+are loaded through mmap, so a cache hit skips the Excel parse entirely and
+only touches the pages that are actually read. The same encoding doubles as
+the compact buffer parallel parse workers send back (CachedSheet.from_bytes).
+
+File layout (all integers little-endian):
+
+    b"FDC1" | uint32 header length | JSON header | column blocks
+
+Every column block starts on an 8-byte boundary. Whole-number columns
+without gaps are an int64 array; other numeric columns are a float64 array
+with NaN for missing cells, the dtypes pandas would pick. Text columns are an int64 offsets
+array (n + 1 entries), a one-byte-per-row missing mask padded to 8 bytes and
+the concatenated UTF-8 bytes of every value. Text columns that mostly repeat
+a few labels (screen names, user types) are stored as categories instead: a
+uint32 code per row (0xFFFFFFFF when missing), padded to 8 bytes, followed by
+the distinct labels laid out like a text column. Each label is decoded once
+and shared by every row that uses it.
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from itertools import islice
+from pathlib import Path
+
+from flow_diagram.sheets import is_missing, iter_sheet_rows, rows_to_frame
+
+MAGIC = b"FDC1"
+FORMAT_VERSION = 3
+DEFAULT_CACHE_DIR = ".cache/flow-diagrams"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+_SUFFIX = ".fdc"
+_MISSING_CODE = 0xFFFFFFFF
+
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _pad(length):
+    return (-length) % 8
+
+
+def _encode_texts(texts):
+    """Offsets, missing mask and UTF-8 payload of a text column"""
+    offsets = array("q", [0])
+    missing = bytearray()
+    payload = bytearray()
+    for text in texts:
+        missing.append(text is None)
+        if text is not None:
+            payload += text.encode("utf-8")
+        offsets.append(len(payload))
+    missing += b"\0" * _pad(len(missing))
+    return offsets.tobytes() + bytes(missing) + bytes(payload)
+
+
+def encode_columns(columns, rows):
+    """Encode rows into the column blocks of a cache file, returning (descriptors, blocks)"""
+    values_by_column = [[] for _ in columns]
+    for row in rows:
+        for idx, value in enumerate(row):
+            values_by_column[idx].append(None if is_missing(value) else value)
+
+    descriptors = []
+    blocks = []
+    for name, values in zip(columns, values_by_column):
+        numeric = all(
+            value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+            for value in values
+        )
+        descriptor = {"name": name}
+        if numeric and values and all(isinstance(value, int) for value in values):
+            block = array("q", values).tobytes()
+            kind = "int"
+        elif numeric and any(value is not None for value in values):
+            data = array("d", (math.nan if value is None else float(value) for value in values))
+            block = data.tobytes()
+            kind = "float"
+        else:
+            texts = [None if value is None else str(value) for value in values]
+            labels = {}
+            for text in texts:
+                if text is not None:
+                    labels.setdefault(text, len(labels))
+            if len(labels) * 2 <= len(texts) - texts.count(None):
+                codes = array("I", (_MISSING_CODE if text is None else labels[text] for text in texts))
+                block = codes.tobytes()
+                block += b"\0" * _pad(len(block)) + _encode_texts(list(labels))
+                descriptor["labels"] = len(labels)
+                kind = "category"
+            else:
+                block = _encode_texts(texts)
+                kind = "str"
+        descriptor.update(kind=kind, length=len(block))
+        descriptors.append(descriptor)
+        blocks.append(block)
+    return descriptors, blocks
+
+
+def encode_sheet(sheet_name, columns, rows):
+    """Return the bytes of a cache file holding the given rows"""
+    rows = list(rows)
+    descriptors, blocks = encode_columns(columns, rows)
+    header = json.dumps({"sheet": sheet_name, "rows": len(rows), "columns": descriptors}).encode("utf-8")
+    parts = [MAGIC, struct.pack("<I", len(header)), header, b"\0" * _pad(8 + len(header))]
+    for block in blocks:
+        parts.append(block)
+        parts.append(b"\0" * _pad(len(block)))
+    return b"".join(parts)
+
+
+class CachedSheet:
+    """A sheet loaded from a memory-mapped cache file, or from the same bytes in memory
+
+    Exposes the same row interface as the streaming reader: columns,
+    iter_rows(), column(), head(), len() and to_frame().
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(path, "rb") as handle:
+            self._load(mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Wrap an encode_sheet() buffer, e.g. one returned by a parse worker"""
+        sheet = object.__new__(cls)
+        sheet.path = None
+        sheet._load(data)
+        return sheet
+
+    def to_bytes(self):
+        """Return the encoded sheet, as stored in a cache file"""
+        if self._projected:
+            return encode_sheet(self.name, self.columns, self.iter_rows())
+        return bytes(self._map)
+
+    def _load(self, buffer):
+        self._map = buffer
+        self._projected = False
+        view = memoryview(buffer)
+        if bytes(view[:4]) != MAGIC:
+            raise ValueError(f"Not a flow diagram cache file: {self.path or 'buffer'}")
+        (header_length,) = struct.unpack_from("<I", view, 4)
+        header = json.loads(bytes(view[8:8 + header_length]))
+        self.name = header["sheet"]
+        self.columns = [column["name"] for column in header["columns"]]
+        self._row_count = header["rows"]
+
+        self._readers = []
+        position = 8 + header_length
+        position += _pad(position)
+        for column in header["columns"]:
+            block = view[position:position + column["length"]]
+            if column["kind"] == "int":
+                self._readers.append(self._int_reader(block))
+            elif column["kind"] == "float":
+                self._readers.append(self._float_reader(block))
+            elif column["kind"] == "category":
+                self._readers.append(self._category_reader(block, column["labels"]))
+            else:
+                self._readers.append(self._str_reader(block, self._row_count))
+            position += column["length"] + _pad(column["length"])
+
+    def _int_reader(self, block):
+        data = block.cast("q")
+
+        def read(idx):
+            return data[idx]
+
+        return read
+
+    def _float_reader(self, block):
+        data = block.cast("d")
+
+        def read(idx):
+            value = data[idx]
+            return None if math.isnan(value) else value
+
+        return read
+
+    def _str_reader(self, block, count):
+        mask_start = (count + 1) * 8
+        payload_start = mask_start + count + _pad(count)
+        offsets = block[:mask_start].cast("q")
+        missing = block[mask_start:mask_start + count]
+        payload = block[payload_start:]
+
+        def read(idx):
+            if missing[idx]:
+                return None
+            return str(payload[offsets[idx]:offsets[idx + 1]], "utf-8")
+
+        return read
+
+    def _category_reader(self, block, label_count):
+        codes_length = self._row_count * 4
+        codes = block[:codes_length].cast("I")
+        read_label = self._str_reader(block[codes_length + _pad(codes_length):], label_count)
+        labels = []
+
+        def read(idx):
+            code = codes[idx]
+            if code == _MISSING_CODE:
+                return None
+            if not labels:
+                labels.extend(read_label(i) for i in range(label_count))
+            return labels[code]
+
+        return read
+
+    def project(self, columns):
+        """Return a view of this sheet with only the named columns (in that order)"""
+        view = object.__new__(CachedSheet)
+        view.path, view.name, view._map, view._row_count = self.path, self.name, self._map, self._row_count
+        view._projected = True
+        positions = [self.columns.index(name) for name in columns if name in self.columns]
+        view.columns = [self.columns[i] for i in positions]
+        view._readers = [self._readers[i] for i in positions]
+        return view
+
+    @property
+    def empty(self):
+        return self._row_count == 0 or not self.columns
+
+    def __len__(self):
+        return self._row_count
+
+    def iter_rows(self):
+        readers = self._readers
+        for idx in range(self._row_count):
+            yield tuple(read(idx) for read in readers)
+
+    def column(self, name):
+        read = self._readers[self.columns.index(name)]
+        for idx in range(self._row_count):
+            yield read(idx)
+
+    def head(self, n=5):
+        return list(islice(self.iter_rows(), n))
+
+    def to_frame(self):
+        """Materialize the cached sheet as a pandas DataFrame"""
+        return rows_to_frame(self.iter_rows(), self.columns)
+
+
+class SheetCache:
+    """Directory of cached sheets with size-based LRU eviction"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def _source_key(self, file_path, sheet_name, options):
+        """Identify a (workbook path, sheet, reader options) slot independent of content"""
+        source = json.dumps(
+            [os.path.abspath(file_path), sheet_name, options, FORMAT_VERSION], sort_keys=True
+        )
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+    def _entry_path(self, file_path, content_digest, sheet_name, options):
+        slot = self._source_key(file_path, sheet_name, options)
+        return self.cache_dir / f"{slot}-{content_digest[:32]}{_SUFFIX}"
+
+    def get(self, file_path, content_digest, sheet_name, options):
+        """Return a CachedSheet for this workbook content, or None on a miss"""
+        path = self._entry_path(file_path, content_digest, sheet_name, options)
+        if not path.exists():
+            return None
+        try:
+            sheet = CachedSheet(path)
+        except (OSError, ValueError):
+            path.unlink(missing_ok=True)
+            return None
+        # Mark as recently used for eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return sheet
+
+    def put(self, file_path, content_digest, sheet_name, options, sheet):
+        """Store a parsed sheet and return it reloaded from the cache"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(file_path, content_digest, sheet_name, options)
+
+        # Sheets that are already encoded (parallel parse results) are written as is
+        if isinstance(sheet, CachedSheet):
+            data = sheet.to_bytes()
+        else:
+            rows = list(iter_sheet_rows(sheet))  # before columns, so a streamed sheet is walked once
+            data = encode_sheet(sheet_name, list(sheet.columns), rows)
+
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(temp_path, path)
+
+        self._invalidate_stale(path)
+        self.evict(keep=path)
+        try:
+            return CachedSheet(path)
+        except (OSError, ValueError):
+            # Removed by another generator sharing this cache directory in the meantime
+            return CachedSheet.from_bytes(data)
+
+    def _invalidate_stale(self, current):
+        """Remove entries for the same source slot that were built from older content"""
+        slot = current.name.split("-", 1)[0]
+        for entry in self.cache_dir.glob(f"{slot}-*{_SUFFIX}"):
+            if entry != current:
+                entry.unlink(missing_ok=True)
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits in max_bytes
+
+        Diagram layouts cached in the same directory (layout-*.json) count too.
+        keep, the entry just written, is never deleted, even when it alone is
+        larger than max_bytes.
+        """
+        entries = []
+        total = 0
+        for entry in [*self.cache_dir.glob(f"*{_SUFFIX}"), *self.cache_dir.glob("layout-*.json")]:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Removed by another generator sharing this cache directory
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            entry.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,297 @@
+"""
+Revision diff between two versions of a requirements workbook
+
+Every row is hashed once (manifest.row_digest) and keyed by its key column,
+the first one unless a sheet names another; a key that repeats is numbered
+("Login", "Login #2", ...). The row hashes also make up the sheet digest, so
+sheets whose digests match are known to be unchanged and are never compared
+row by row. Screens (node labels) and transitions (label pairs) of the two
+flow graphs are compared as sets, which keeps the whole diff linear in the
+size of both workbooks.
+
+A screen counts as changed when it exists in both versions but one of its
+rows was added, removed or edited, its outgoing transitions differ or it
+moved to another sheet. The results are written as a JSON change list and
+as a Mermaid/HTML view of the touched screens, coloured by status.
+"""
+
+import html
+import json
+from pathlib import Path
+
+from flow_diagram.graph import FlowGraph
+from flow_diagram.html import html_table
+from flow_diagram.layout import layout_graph
+from flow_diagram.manifest import cell_digest_text, combine_row_digests, row_digest
+from flow_diagram.mermaid import mermaid_chunks, mermaid_file_chunks
+from flow_diagram.sheets import iter_sheet_rows
+from flow_diagram.svg import svg_chunks
+from flow_diagram.writers import write_chunks
+
+ADDED_STYLE = "fill:#dcfce7,stroke:#16a34a,stroke-width:2px"
+REMOVED_STYLE = "fill:#fee2e2,stroke:#dc2626,stroke-dasharray:5 5"
+CHANGED_STYLE = "fill:#fef3c7,stroke:#d97706,stroke-width:2px"
+ADDED_EDGE_STYLE = "stroke:#16a34a,stroke-width:2px"
+REMOVED_EDGE_STYLE = "stroke:#dc2626,stroke-dasharray:5 5"
+
+
+def _key_text(key):
+    label, occurrence = key
+    return label if occurrence == 1 else f"{label} #{occurrence}"
+
+
+def keyed_row_digests(sheet, key_column=None):
+    """Return ({(key label, occurrence): row digest}, sheet digest) for a sheet
+
+    Rows with a blank key are keyed by their row number instead.
+    """
+    columns = list(sheet.columns)
+    key_idx = columns.index(key_column) if key_column in columns else 0
+    rows = {}
+    seen = {}
+    digests = []
+    for number, row in enumerate(iter_sheet_rows(sheet), 1):
+        digest = row_digest(row)
+        digests.append(digest)
+        value = row[key_idx] if columns else None
+        label = (cell_digest_text(value) or "").strip()
+        if not label:
+            label = f"row {number}"
+        occurrence = seen[label] = seen.get(label, 0) + 1
+        rows[(label, occurrence)] = digest
+    return rows, combine_row_digests(columns, digests)
+
+
+def diff_sheets(old_sheets, new_sheets, key_columns=None):
+    """Compare two workbooks sheet by sheet
+
+    Returns {"added": [...], "removed": [...], "unchanged": [...],
+    "changed": {sheet: {"rows_added", "rows_removed", "rows_changed"}}}
+    where the row lists hold (key label, occurrence) keys.
+    """
+    key_columns = key_columns or {}
+    changes = {"added": [name for name in new_sheets if name not in old_sheets],
+               "removed": [name for name in old_sheets if name not in new_sheets],
+               "unchanged": [], "changed": {}}
+    for name in new_sheets:
+        if name not in old_sheets:
+            continue
+        old_rows, old_digest = keyed_row_digests(old_sheets[name], key_columns.get(name))
+        new_rows, new_digest = keyed_row_digests(new_sheets[name], key_columns.get(name))
+        if old_digest == new_digest:
+            changes["unchanged"].append(name)
+            continue
+        changes["changed"][name] = {
+            "rows_added": [key for key in new_rows if key not in old_rows],
+            "rows_removed": [key for key in old_rows if key not in new_rows],
+            "rows_changed": [key for key, digest in new_rows.items() if key in old_rows and old_rows[key] != digest],
+        }
+    return changes
+
+
+def changed_row_labels(sheet_changes):
+    """Key labels of every row added, removed or edited in a changed sheet"""
+    labels = set()
+    for rows in sheet_changes["changed"].values():
+        for keys in rows.values():
+            labels.update(label for label, _ in keys)
+    return labels
+
+
+def _subgraph_of(graph, node):
+    owner = graph.node_subgraph[node]
+    return graph.subgraph_names[owner] if owner >= 0 else None
+
+
+def diff_graphs(old_graph, new_graph, changed_labels=()):
+    """Compare the screens and transitions of two flow graphs
+
+    Returns {"screens": {"added", "removed", "changed"}, "transitions":
+    {"added", "removed"}}; screens are labels and transitions [source, target]
+    label pairs, in the order the graphs hold them.
+    """
+    old_edges = {(old_graph.labels[source], old_graph.labels[target]) for source, target in old_graph.edges()}
+    new_edges = {(new_graph.labels[source], new_graph.labels[target]) for source, target in new_graph.edges()}
+    added_edges = [(new_graph.labels[source], new_graph.labels[target]) for source, target in new_graph.edges()
+                   if (new_graph.labels[source], new_graph.labels[target]) not in old_edges]
+    removed_edges = [(old_graph.labels[source], old_graph.labels[target]) for source, target in old_graph.edges()
+                     if (old_graph.labels[source], old_graph.labels[target]) not in new_edges]
+
+    rewired = {source for source, _ in added_edges} | {source for source, _ in removed_edges}
+    changed_labels = set(changed_labels)
+    changed = []
+    for node, label in enumerate(new_graph.labels):
+        old_node = old_graph.find(label)
+        if old_node is None:
+            continue
+        if (str(label) in changed_labels or label in rewired
+                or _subgraph_of(old_graph, old_node) != _subgraph_of(new_graph, node)):
+            changed.append(label)
+
+    return {
+        "screens": {"added": [label for label in new_graph.labels if old_graph.find(label) is None],
+                    "removed": [label for label in old_graph.labels if new_graph.find(label) is None],
+                    "changed": changed},
+        "transitions": {"added": [list(edge) for edge in added_edges],
+                        "removed": [list(edge) for edge in removed_edges]},
+    }
+
+
+def diff_graph(old_graph, new_graph, changes):
+    """Return a FlowGraph of the touched screens and the transitions between them, coloured by status
+
+    Added screens and transitions are green, removed ones red and dashed,
+    changed screens amber; untouched endpoints of changed transitions are
+    drawn as they are.
+    """
+    screens = changes["screens"]
+    transitions = changes["transitions"]
+    touched = set(screens["added"]) | set(screens["removed"]) | set(screens["changed"])
+    for source, target in transitions["added"] + transitions["removed"]:
+        touched.update((source, target))
+
+    graph = FlowGraph()
+    for source_graph in (new_graph, old_graph):
+        for node, label in enumerate(source_graph.labels):
+            if label in touched and graph.find(label) is None:
+                graph.add_node(label, node_id=source_graph.node_ids[node], shape=source_graph.shapes[node],
+                               subgraph=_subgraph_of(source_graph, node))
+
+    for style, labels in ((ADDED_STYLE, screens["added"]), (REMOVED_STYLE, screens["removed"]),
+                          (CHANGED_STYLE, screens["changed"])):
+        for label in labels:
+            graph.set_style(graph.find(label), style)
+
+    added = {tuple(edge) for edge in transitions["added"]}
+    for source, target in new_graph.edges():
+        source_label, target_label = new_graph.labels[source], new_graph.labels[target]
+        if source_label in touched and target_label in touched:
+            graph.add_edge(graph.find(source_label), graph.find(target_label))
+            if (source_label, target_label) in added:
+                graph.set_edge_style(graph.find(source_label), graph.find(target_label), ADDED_EDGE_STYLE)
+    for source_label, target_label in transitions["removed"]:
+        source, target = graph.find(source_label), graph.find(target_label)
+        graph.add_edge(source, target)
+        graph.set_edge_style(source, target, REMOVED_EDGE_STYLE)
+    return graph
+
+
+def change_list(sheet_changes, graph_changes, old_path, new_path):
+    """Combine sheet and graph changes into the JSON-ready change list"""
+    sheets = {
+        "added": sheet_changes["added"],
+        "removed": sheet_changes["removed"],
+        "unchanged": sheet_changes["unchanged"],
+        "changed": {name: {kind: [_key_text(key) for key in keys] for kind, keys in rows.items()}
+                    for name, rows in sheet_changes["changed"].items()},
+    }
+    screens = {kind: [str(label) for label in labels] for kind, labels in graph_changes["screens"].items()}
+    transitions = {kind: [[str(source), str(target)] for source, target in edges]
+                   for kind, edges in graph_changes["transitions"].items()}
+    summary = {f"screens_{kind}": len(labels) for kind, labels in screens.items()}
+    summary.update({f"transitions_{kind}": len(edges) for kind, edges in transitions.items()})
+    summary["sheets_changed"] = len(sheets["added"]) + len(sheets["removed"]) + len(sheets["changed"])
+    return {"old": str(old_path), "new": str(new_path), "summary": summary,
+            "sheets": sheets, "screens": screens, "transitions": transitions}
+
+
+def diff_html_chunks(graph, changes, title, layout=None):
+    """Yield the HTML diff page: summary, legend, highlighted diagram and change tables"""
+    mermaid_script = "" if layout is not None else """
+    <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>"""
+    summary = changes["summary"]
+
+    yield """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>""" + html.escape(title) + """</title>""" + mermaid_script + """
+    <style>
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; padding: 20px; margin: 0; background: #f9fafb; }
+        .container { max-width: 1400px; margin: 0 auto; background: white; padding: 30px; border-radius: 12px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }
+        h1 { color: #228B22; border-bottom: 3px solid #228B22; padding-bottom: 15px; }
+        .info-box { background: #dbeafe; border-left: 4px solid #3b82f6; padding: 15px; margin: 20px 0; border-radius: 4px; }
+        .legend span { display: inline-block; padding: 4px 10px; margin-right: 8px; border-radius: 4px; }
+        .legend .added { background: #dcfce7; border: 2px solid #16a34a; }
+        .legend .removed { background: #fee2e2; border: 2px dashed #dc2626; }
+        .legend .changed { background: #fef3c7; border: 2px solid #d97706; }
+        .mermaid, .diagram { text-align: center; margin: 30px 0; padding: 20px; background: #f9fafb; border-radius: 8px; border: 1px solid #e5e7eb; overflow-x: auto; }
+        table { width: 100%; border-collapse: collapse; margin-top: 20px; font-size: 14px; }
+        th, td { border: 1px solid #e5e7eb; padding: 8px 12px; text-align: left; }
+        th { background-color: #228B22; color: white; }
+    </style>
+</head>
+<body>
+    <div class="container">
+"""
+    yield f"        <h1>{html.escape(title)}</h1>\n"
+    yield (f'        <div class="info-box"><strong>Old:</strong> {html.escape(changes["old"])}<br>'
+           f'<strong>New:</strong> {html.escape(changes["new"])}<br>'
+           f'<strong>Screens:</strong> +{summary["screens_added"]} / -{summary["screens_removed"]} / '
+           f'~{summary["screens_changed"]} &nbsp; <strong>Transitions:</strong> +{summary["transitions_added"]} / '
+           f'-{summary["transitions_removed"]} &nbsp; <strong>Sheets changed:</strong> {summary["sheets_changed"]}'
+           f'</div>\n')
+    yield ('        <div class="legend"><span class="added">Added</span><span class="removed">Removed</span>'
+           '<span class="changed">Changed</span></div>\n')
+
+    if graph.node_count == 0:
+        yield "        <p>No screens or transitions changed.</p>\n"
+    elif layout is not None:
+        yield '        <div class="diagram">\n'
+        yield from svg_chunks(graph, layout, title)
+        yield "        </div>\n"
+    else:
+        yield '        <div class="mermaid">\n'
+        yield from mermaid_chunks(graph)
+        yield "        </div>\n"
+
+    sheets = changes["sheets"]
+    sheet_rows = [(name, "added", "", "", "") for name in sheets["added"]]
+    sheet_rows += [(name, "removed", "", "", "") for name in sheets["removed"]]
+    sheet_rows += [(name, "changed", len(rows["rows_added"]), len(rows["rows_removed"]), len(rows["rows_changed"]))
+                   for name, rows in sheets["changed"].items()]
+    yield "        <h2>Sheets</h2>\n"
+    yield from html_table(["Sheet", "Status", "Rows added", "Rows removed", "Rows changed"], sheet_rows,
+                          table_id="diff-sheets", classes="diff-table", index=False, escape=True)
+
+    yield "        <h2>Screens</h2>\n"
+    yield from html_table(["Status", "Screen"],
+                          [(kind, label) for kind, labels in changes["screens"].items() for label in labels],
+                          table_id="diff-screens", classes="diff-table", index=False, escape=True)
+
+    yield "        <h2>Transitions</h2>\n"
+    yield from html_table(["Status", "From", "To"],
+                          [(kind, source, target) for kind, edges in changes["transitions"].items()
+                           for source, target in edges],
+                          table_id="diff-transitions", classes="diff-table", index=False, escape=True)
+
+    yield "    </div>\n"
+    if layout is None:
+        yield "    <script>mermaid.initialize({ startOnLoad: true, theme: 'default' });</script>\n"
+    yield "</body>\n</html>"
+
+
+def diff_output_paths(output_dir, stem):
+    """Return the (Mermaid, HTML, JSON) diff files, e.g. flow-diagram-diff.mmd"""
+    output_dir = Path(output_dir)
+    return tuple(output_dir / f"{stem}-diff{suffix}" for suffix in (".mmd", ".html", ".json"))
+
+
+def write_diff(graph, changes, output_dir, stem, title, diagram="svg", layout_cache=None):
+    """Write the Mermaid, HTML and JSON diff files; returns their paths"""
+    mermaid_file, html_file, json_file = diff_output_paths(output_dir, stem)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    layout = layout_graph(graph, layout_cache) if diagram == "svg" and graph.node_count else None
+
+    outputs = (
+        (mermaid_file, "Mermaid diff", mermaid_file_chunks(graph)),
+        (html_file, "HTML diff", diff_html_chunks(graph, changes, title, layout)),
+        (json_file, "JSON change list", [json.dumps(changes, indent=2, ensure_ascii=False) + "\n"]),
+    )
+    for output_file, display_name, chunks in outputs:
+        if write_chunks(output_file, chunks):
+            print(f"{display_name} created: {output_file}")
+        else:
+            print(f"{display_name} unchanged: {output_file}")
+    return mermaid_file, html_file, json_file
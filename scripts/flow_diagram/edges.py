@@ -0,0 +1,115 @@
+"""
+Columnar extraction of nodes and edges from mapping sheets
+
+A mapping sheet holds a node in its first column and the nodes it connects
+to in the remaining columns. Instead of walking every row and cell in Python,
+a DataFrame is turned into a presence mask once and the (row, column) pairs
+of present cells are stacked into an edge list in a single pass.
+
+Lightweight sheets (streamed, cached or in-memory) are walked as plain
+tuples instead, so building the graph never imports numpy or pandas; the
+labels come out exactly as the DataFrame path would format them.
+"""
+
+from flow_diagram.sheets import float_columns, is_missing, iter_sheet_rows, sheet_to_frame
+
+
+def _cell_label(value, as_float, strip):
+    if is_missing(value):
+        return None
+    text = str(float(value)) if as_float else str(value)
+    if strip:
+        text = text.strip()
+        if not text:
+            return None
+    return text
+
+
+def iter_row_edges(sheet, strip=False):
+    """Yield (source, targets) label pairs of a lightweight sheet, row by row
+
+    Rows with an empty first cell are skipped; targets keep column order.
+    """
+    rows = list(iter_sheet_rows(sheet))
+    width = len(sheet.columns)
+    if not rows or width == 0:
+        return
+    widened = float_columns(rows, width)
+    for row in rows:
+        labels = [_cell_label(value, idx in widened, strip) for idx, value in enumerate(row[:width])]
+        if labels[0] is None:
+            continue
+        yield labels[0], [label for label in labels[1:] if label is not None]
+
+
+def sheet_nodes_and_edges(sheet, strip=False):
+    """Return (nodes, edges) DataFrames for a mapping sheet
+
+    nodes has one row per source cell in the first column: row, label.
+    edges has one row per non-empty cell to the right of a source, in row
+    then column order: row, col, source, target. With strip=True labels are
+    stripped and cells that are blank after stripping are ignored.
+    """
+    import numpy as np
+    import pandas as pd
+
+    frame = sheet_to_frame(sheet)
+    empty_nodes = pd.DataFrame({"row": pd.Series(dtype=int), "label": pd.Series(dtype=object)})
+    empty_edges = pd.DataFrame({"row": pd.Series(dtype=int), "col": pd.Series(dtype=int),
+                                "source": pd.Series(dtype=object), "target": pd.Series(dtype=object)})
+    if frame.shape[0] == 0 or frame.shape[1] == 0:
+        return empty_nodes, empty_edges
+
+    cells = frame.astype(object)
+    present = cells.notna().to_numpy().copy()
+    text = cells.astype(str)
+    if strip:
+        text = text.apply(lambda column: column.str.strip())
+        present &= (text != "").to_numpy()
+    text = text.to_numpy(dtype=object)
+
+    source_rows = np.flatnonzero(present[:, 0])
+    nodes = pd.DataFrame({"row": source_rows, "label": text[source_rows, 0]})
+
+    # Stack the target columns of rows that have a source; np.nonzero walks
+    # the mask row-major, which keeps the original row then column order
+    target_mask = present[:, 1:] & present[:, :1]
+    rows, cols = np.nonzero(target_mask)
+    cols = cols + 1
+    edges = pd.DataFrame({
+        "row": rows,
+        "col": cols,
+        "source": text[rows, 0],
+        "target": text[rows, cols],
+    })
+    return nodes, edges
+
+
+def add_sheet_to_graph(graph, sheet, subgraph):
+    """Add a mapping sheet's nodes and edges to a FlowGraph under one subgraph
+
+    Labels are stripped; nodes are interned in order of first appearance
+    (each source, then its targets).
+    """
+    graph.add_subgraph(subgraph)
+    if hasattr(sheet, "iter_rows"):
+        for source_label, target_labels in iter_row_edges(sheet, strip=True):
+            source = graph.add_node(source_label, subgraph=subgraph)
+            for target_label in target_labels:
+                graph.add_edge(source, graph.add_node(target_label, subgraph=subgraph))
+        return
+
+    import pandas as pd
+
+    sources, edges = sheet_nodes_and_edges(sheet, strip=True)
+
+    ordered = pd.concat([
+        pd.DataFrame({"row": sources["row"], "col": 0, "label": sources["label"]}),
+        pd.DataFrame({"row": edges["row"], "col": edges["col"], "label": edges["target"]}),
+    ]).sort_values(["row", "col"], kind="stable")
+
+    # Intern each distinct label once, then map the edge columns to node numbers
+    codes = {label: graph.add_node(label, subgraph=subgraph)
+             for label in ordered["label"].drop_duplicates()}
+    for source, target in zip(edges["source"].map(codes), edges["target"].map(codes)):
+        graph.add_edge(source, target)
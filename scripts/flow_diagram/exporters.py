@@ -0,0 +1,278 @@
+"""
+Graph export formats behind one registry
+
+Every exporter turns an already built FlowGraph into a stream of text
+chunks, so adding a format never adds another pass over the workbook: the
+scripts parse once, build the graph once and hand it to each selected
+format. run_exports() runs the writers of one run concurrently in a thread
+pool; they only read the graph, and what they print is held back and
+printed in task order once they are done.
+
+Registered formats: "dot" (Graphviz), "json" (node-link JSON, as read by
+networkx.node_link_graph and d3) and "graphml".
+"""
+
+import io
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from xml.sax.saxutils import escape, quoteattr
+
+from flow_diagram.mermaid import parse_style
+from flow_diagram.writers import write_chunks
+
+# name -> (file suffix, display name, chunks(graph, title) generator)
+EXPORTERS = {}
+
+
+def register(name, suffix, display_name):
+    """Decorator adding a chunks(graph, title) generator to the registry"""
+    def decorate(chunks):
+        EXPORTERS[name] = (suffix, display_name, chunks)
+        return chunks
+    return decorate
+
+
+def _subgraph_name(graph, node):
+    owner = graph.node_subgraph[node]
+    return graph.subgraph_names[owner] if owner >= 0 else None
+
+
+# Mermaid shape -> (Graphviz shape, extra style)
+_DOT_SHAPES = {
+    "rect": ("box", None),
+    "round": ("box", "rounded"),
+    "stadium": ("box", "rounded"),
+    "diamond": ("diamond", None),
+}
+
+
+def _dot_string(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def _dot_node(graph, node):
+    shape, extra_style = _DOT_SHAPES[graph.shapes[node]]
+    style = parse_style(graph.styles.get(node))
+    dot_style = [value for value in (extra_style, "filled" if "fill" in style else None) if value]
+    attributes = [f"label={_dot_string(graph.labels[node])}", f"shape={shape}"]
+    if dot_style:
+        attributes.append(f"style={_dot_string(','.join(dot_style))}")
+    if "fill" in style:
+        attributes.append(f"fillcolor={_dot_string(style['fill'])}")
+    if "stroke" in style:
+        attributes.append(f"color={_dot_string(style['stroke'])}")
+    if "color" in style:
+        attributes.append(f"fontcolor={_dot_string(style['color'])}")
+    if node in graph.links:
+        url, tooltip = graph.links[node]
+        attributes.append(f"URL={_dot_string(url)}")
+        if tooltip:
+            attributes.append(f"tooltip={_dot_string(tooltip)}")
+    return f"{_dot_string(graph.node_ids[node])} [{', '.join(attributes)}];"
+
+
+def _weight_text(weight):
+    """Integral weights without an exponent or trailing .0, e.g. 1399969"""
+    return str(int(weight)) if float(weight).is_integer() else repr(float(weight))
+
+
+def _dot_edge(graph, source, target):
+    """Attribute list of a labelled or weighted edge, or nothing"""
+    attributes = []
+    if (source, target) in graph.edge_labels:
+        attributes.append(f"label={_dot_string(graph.edge_labels[(source, target)])}")
+    if (source, target) in graph.edge_weights:
+        attributes.append(f"weight={_weight_text(graph.edge_weights[(source, target)])}")
+    return f" [{', '.join(attributes)}]" if attributes else ""
+
+
+@register("dot", ".dot", "Graphviz DOT")
+def dot_chunks(graph, title="Flow diagram"):
+    """Yield a Graphviz digraph; subgraphs become clusters"""
+    yield "digraph flow {\n"
+    yield f"    graph [label={_dot_string(title)}, labelloc=t, rankdir=TB];\n"
+    yield '    node [fontname="Helvetica"];\n'
+
+    members = {}
+    for node, owner in enumerate(graph.node_subgraph):
+        members.setdefault(owner, []).append(node)
+    for node in members.get(-1, []):
+        yield f"    {_dot_node(graph, node)}\n"
+    for index, name in enumerate(graph.subgraph_names):
+        yield f"    subgraph {_dot_string('cluster_' + graph.subgraph_ids[index])} {{\n"
+        yield f"        label={_dot_string(name)};\n"
+        for node in members.get(index, []):
+            yield f"        {_dot_node(graph, node)}\n"
+        yield "    }\n"
+
+    for source, target in graph.edges():
+        edge = f"{_dot_string(graph.node_ids[source])} -> {_dot_string(graph.node_ids[target])}"
+        yield f"    {edge}{_dot_edge(graph, source, target)};\n"
+    yield "}\n"
+
+
+@register("json", ".json", "Node-link JSON")
+def json_chunks(graph, title="Flow diagram"):
+    """Yield node-link JSON, one node or link per line"""
+    yield '{"directed": true, "multigraph": false, '
+    yield f'"graph": {json.dumps({"name": title}, ensure_ascii=False)},\n"nodes": [\n'
+    for node in range(graph.node_count):
+        record = {"id": graph.node_ids[node], "label": str(graph.labels[node]), "shape": graph.shapes[node],
+                  "subgraph": _subgraph_name(graph, node)}
+        if node in graph.styles:
+            record["style"] = graph.styles[node]
+        if node in graph.links:
+            record["url"], record["tooltip"] = graph.links[node]
+        separator = ",\n" if node < graph.node_count - 1 else "\n"
+        yield json.dumps(record, ensure_ascii=False) + separator
+    yield '],\n"links": [\n'
+    for number, (source, target) in enumerate(graph.edges()):
+        separator = ",\n" if number < graph.edge_count - 1 else "\n"
+        record = {"source": graph.node_ids[source], "target": graph.node_ids[target]}
+        if (source, target) in graph.edge_labels:
+            record["label"] = str(graph.edge_labels[(source, target)])
+        if (source, target) in graph.edge_weights:
+            record["weight"] = graph.edge_weights[(source, target)]
+        yield json.dumps(record, ensure_ascii=False) + separator
+    yield "]}\n"
+
+
+_GRAPHML_KEYS = (
+    ("label", "node", "string"),
+    ("shape", "node", "string"),
+    ("subgraph", "node", "string"),
+    ("style", "node", "string"),
+    ("url", "node", "string"),
+    ("edge_label", "edge", "string"),
+    ("weight", "edge", "double"),
+)
+
+
+@register("graphml", ".graphml", "GraphML")
+def graphml_chunks(graph, title="Flow diagram"):
+    """Yield a GraphML document with label, shape, subgraph, style and url node data and edge labels and weights"""
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    # Edge keys only appear when some edge has a label or weight
+    present = {"edge_label": bool(graph.edge_labels), "weight": bool(graph.edge_weights)}
+    for name, domain, kind in _GRAPHML_KEYS:
+        if not present.get(name, True):
+            continue
+        yield f'  <key id="{name}" for="{domain}" attr.name="{name}" attr.type="{kind}"/>\n'
+    yield f'  <graph id={quoteattr(title)} edgedefault="directed">\n'
+    for node in range(graph.node_count):
+        data = {"label": str(graph.labels[node]), "shape": graph.shapes[node],
+                "subgraph": _subgraph_name(graph, node), "style": graph.styles.get(node),
+                "url": graph.links[node][0] if node in graph.links else None}
+        fields = "".join(f'<data key="{key}">{escape(value)}</data>' for key, value in data.items() if value)
+        yield f"    <node id={quoteattr(graph.node_ids[node])}>{fields}</node>\n"
+    for source, target in graph.edges():
+        endpoints = f"source={quoteattr(graph.node_ids[source])} target={quoteattr(graph.node_ids[target])}"
+        label = graph.edge_labels.get((source, target))
+        weight = graph.edge_weights.get((source, target))
+        data = {"edge_label": None if label is None else str(label), "weight": None if weight is None else _weight_text(weight)}
+        fields = "".join(f'<data key="{key}">{escape(value)}</data>' for key, value in data.items() if value is not None)
+        yield f"    <edge {endpoints}>{fields}</edge>\n" if fields else f"    <edge {endpoints}/>\n"
+    yield "  </graph>\n</graphml>\n"
+
+
+# The scripts' own Mermaid and HTML writers, then every registered exporter
+FORMATS = ("mermaid", "html", *EXPORTERS)
+DEFAULT_FORMATS = ("mermaid", "html")
+_SCRIPT_FORMATS = {"mermaid": (".mmd", "Mermaid"), "html": (".html", "HTML")}
+
+
+def output_paths(output_dir, stem, formats):
+    """Return {format: output file} for the selected formats, e.g. flow-diagram.dot"""
+    suffixes = {**{name: suffix for name, (suffix, _) in _SCRIPT_FORMATS.items()},
+                **{name: suffix for name, (suffix, _, _) in EXPORTERS.items()}}
+    return {name: output_dir / f"{stem}{suffixes[name]}" for name in dict.fromkeys(formats)}
+
+
+def format_label(name):
+    """Human-readable name of a format"""
+    return _SCRIPT_FORMATS[name][1] if name in _SCRIPT_FORMATS else EXPORTERS[name][1]
+
+
+def export_graph(graph, name, output_file, title="Flow diagram"):
+    """Write the graph in a registered format, leaving an unchanged file untouched"""
+    _, display_name, chunks = EXPORTERS[name]
+    if write_chunks(output_file, chunks(graph, title)):
+        print(f"{display_name} export created: {output_file}")
+    else:
+        print(f"{display_name} export unchanged: {output_file}")
+    return output_file
+
+
+class _TaskOutput:
+    """Stand-in for sys.stdout that keeps what each writer task prints in its own buffer"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers = {}
+        self._local = threading.local()
+
+    def run(self, name, task):
+        self._local.buffer = self.buffers[name] = io.StringIO()
+        try:
+            return task()
+        finally:
+            self._local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        return (self.stream if buffer is None else buffer).write(text)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def run_exports(tasks, workers=None):
+    """Run {name: callable} writers concurrently; returns {name: seconds}
+
+    Whatever the writers print is printed from the calling thread once all
+    have finished, in task order, so lines from different writers never
+    interleave. workers=1 runs them one after another in the calling thread
+    instead, e.g. under cProfile, which only sees that thread. The first
+    writer to fail has its exception re-raised once all have finished.
+    """
+    def timed(task):
+        started = time.perf_counter()
+        task()
+        return time.perf_counter() - started
+
+    if not tasks:
+        return {}
+    if workers == 1:
+        seconds, errors = {}, []
+        for name, task in tasks.items():
+            try:
+                seconds[name] = timed(task)
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+        return seconds
+
+    output = _TaskOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=workers or len(tasks)) as pool:
+            futures = {name: pool.submit(output.run, name, partial(timed, task)) for name, task in tasks.items()}
+    finally:
+        sys.stdout = output.stream
+    for name in tasks:
+        if name in output.buffers:
+            sys.stdout.write(output.buffers[name].getvalue())
+    errors = [future.exception() for future in futures.values() if future.exception() is not None]
+    if errors:
+        raise errors[0]
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,182 @@
+"""
+Compact graph representation shared by every diagram writer
+
+Node labels are interned to small integers once; Mermaid IDs are derived
+from the label a single time and kept collision-free. Edges live in two
+parallel unsigned int arrays and are deduplicated on insert, and every node
+remembers the subgraph it was first declared in. Edge styles, labels and
+weights are optional and kept in dicts keyed by (source, target).
+"""
+
+import re
+from array import array
+
+SHAPES = ("rect", "round", "stadium", "diamond")
+
+_ID_TABLE = str.maketrans({" ": "_", "-": "_", "(": None, ")": None})
+_INVALID_ID_CHARS = re.compile(r"[^\w]")
+# Words Mermaid's flowchart grammar would read as keywords
+_RESERVED_IDS = {"end", "graph", "flowchart", "subgraph", "style", "classDef", "class", "click"}
+
+
+def sanitize_id(label):
+    """Turn a label into a Mermaid-safe identifier (not yet made unique)"""
+    node_id = _INVALID_ID_CHARS.sub("_", str(label).strip().translate(_ID_TABLE))
+    if not node_id:
+        node_id = "node"
+    if node_id in _RESERVED_IDS:
+        node_id += "_"
+    return node_id
+
+
+class FlowGraph:
+    """Directed graph with interned integer node IDs and deduplicated edges"""
+
+    def __init__(self):
+        self.labels = []
+        self.node_ids = []
+        self.shapes = []
+        self.node_subgraph = array("i")
+        self.styles = {}
+        self.edge_styles = {}
+        self.edge_labels = {}
+        self.edge_weights = {}
+        self.links = {}
+
+        self.subgraph_names = []
+        self.subgraph_ids = []
+
+        self.edge_sources = array("I")
+        self.edge_targets = array("I")
+
+        self._by_label = {}
+        self._taken_ids = set()
+        self._subgraph_index = {}
+        self._edge_keys = set()
+
+    def _unique_id(self, wanted):
+        """Reserve a Mermaid ID, suffixing _2, _3, ... when it is already taken"""
+        candidate = wanted
+        suffix = 2
+        while candidate in self._taken_ids:
+            candidate = f"{wanted}_{suffix}"
+            suffix += 1
+        self._taken_ids.add(candidate)
+        return candidate
+
+    def add_subgraph(self, name):
+        """Declare a subgraph (e.g. one per sheet) and return its index"""
+        if name in self._subgraph_index:
+            return self._subgraph_index[name]
+        index = len(self.subgraph_names)
+        self.subgraph_names.append(name)
+        self.subgraph_ids.append(self._unique_id(sanitize_id(name)))
+        self._subgraph_index[name] = index
+        return index
+
+    def add_node(self, label, node_id=None, shape="rect", subgraph=None):
+        """Intern label and return its node number
+
+        node_id overrides the ID derived from the label. A node keeps the
+        subgraph it was first placed in.
+        """
+        node = self._by_label.get(label)
+        if node is not None:
+            if subgraph is not None and self.node_subgraph[node] < 0:
+                self.node_subgraph[node] = self.add_subgraph(subgraph)
+            return node
+
+        node = len(self.labels)
+        self._by_label[label] = node
+        self.labels.append(label)
+        self.node_ids.append(self._unique_id(node_id or sanitize_id(label)))
+        self.shapes.append(shape)
+        self.node_subgraph.append(-1 if subgraph is None else self.add_subgraph(subgraph))
+        return node
+
+    def find(self, label):
+        """Return the node number of label, or None if it is not in the graph"""
+        return self._by_label.get(label)
+
+    def add_edge(self, source, target):
+        """Add an edge between two node numbers; returns False if it already exists"""
+        key = (source << 32) | target
+        if key in self._edge_keys:
+            return False
+        self._edge_keys.add(key)
+        self.edge_sources.append(source)
+        self.edge_targets.append(target)
+        return True
+
+    def connect(self, source_label, target_label, subgraph=None):
+        """Intern both labels and add the edge between them"""
+        source = self.add_node(source_label, subgraph=subgraph)
+        target = self.add_node(target_label, subgraph=subgraph)
+        return self.add_edge(source, target)
+
+    def set_style(self, node, style):
+        self.styles[node] = style
+
+    def set_edge_style(self, source, target, style):
+        """Style one edge, e.g. stroke:#dc2626,stroke-dasharray:4"""
+        self.edge_styles[(source, target)] = style
+
+    def set_edge_label(self, source, target, label):
+        """Caption one edge, e.g. 120 orders"""
+        self.edge_labels[(source, target)] = label
+
+    def set_edge_weight(self, source, target, weight):
+        """Attach a number to one edge (e.g. a volume) for exporters that carry weights"""
+        self.edge_weights[(source, target)] = weight
+
+    def copy_edge(self, graph, source, target, new_source, new_target):
+        """Add new_source -> new_target with the style, label and weight of graph's source -> target edge"""
+        self.add_edge(new_source, new_target)
+        edge = (source, target)
+        if edge in graph.edge_styles:
+            self.set_edge_style(new_source, new_target, graph.edge_styles[edge])
+        if edge in graph.edge_labels:
+            self.set_edge_label(new_source, new_target, graph.edge_labels[edge])
+        if edge in graph.edge_weights:
+            self.set_edge_weight(new_source, new_target, graph.edge_weights[edge])
+
+    def set_link(self, node, url, tooltip=None):
+        """Make a node a link (e.g. to another diagram page)"""
+        self.links[node] = (url, tooltip)
+
+    @property
+    def node_count(self):
+        return len(self.labels)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_sources)
+
+    def edges(self):
+        """Yield (source, target) node number pairs in insertion order"""
+        return zip(self.edge_sources, self.edge_targets)
+
+    def induced(self, nodes):
+        """Return a new FlowGraph with only the given nodes and the edges between them
+
+        Labels, IDs, shapes, subgraphs, node and edge styles, edge labels and
+        weights and links are kept.
+        """
+        part = FlowGraph()
+        local = {}
+        for node in sorted(nodes):
+            owner = self.node_subgraph[node]
+            local[node] = part.add_node(self.labels[node], node_id=self.node_ids[node], shape=self.shapes[node],
+                                        subgraph=self.subgraph_names[owner] if owner >= 0 else None)
+            if node in self.styles:
+                part.set_style(local[node], self.styles[node])
+            if node in self.links:
+                part.set_link(local[node], *self.links[node])
+        for source, target in self.edges():
+            if source in local and target in local:
+                part.copy_edge(self, source, target, local[source], local[target])
+        return part
+
+    def members(self, subgraph):
+        """Return the node numbers declared in a subgraph, by index"""
+        return [node for node, owner in enumerate(self.node_subgraph) if owner == subgraph]
@@ -0,0 +1,63 @@
+"""
+Streaming HTML table writer
+
+Produces the same markup as DataFrame.to_html(classes=..., table_id=...),
+one row at a time, so tables of any size can be written without building
+the whole document in memory or going through pandas.
+"""
+
+import html
+import math
+
+_CONTROL_CHARS = str.maketrans({"\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def cell_text(value, escape=False, as_float=False):
+    """Format a cell the way to_html does: NaN for missing, control characters escaped
+
+    as_float renders whole numbers of a float64 column as 1.0, like pandas.
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if as_float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    if isinstance(value, float) and value.is_integer():
+        text = f"{value:.1f}"
+    else:
+        text = str(value)
+    text = text.translate(_CONTROL_CHARS)
+    if escape:
+        text = html.escape(text, quote=False)
+    return text.strip()
+
+
+def html_table(columns, rows, table_id=None, classes="data-table", index=True, escape=False, row_id=None,
+               float_columns=()):
+    """Yield an HTML table in fragments: the header, then one chunk per row
+
+    With a row_id prefix every row gets id="<prefix><position>" so it can be linked to.
+    float_columns holds the positions of columns pandas would load as float64
+    (sheets.sheet_float_columns), so every engine renders them the same.
+    """
+    class_attr = f"dataframe {classes}" if classes else "dataframe"
+    id_attr = f' id="{table_id}"' if table_id else ""
+    header = [f'<table border="1" class="{class_attr}"{id_attr}>\n',
+              "  <thead>\n",
+              '    <tr style="text-align: right;">\n']
+    if index:
+        header.append("      <th></th>\n")
+    for name in columns:
+        header.append(f"      <th>{cell_text(name, escape)}</th>\n")
+    header.append("    </tr>\n  </thead>\n  <tbody>\n")
+    yield "".join(header)
+
+    for position, row in enumerate(rows):
+        cells = [f'    <tr id="{row_id}{position}">\n' if row_id else "    <tr>\n"]
+        if index:
+            cells.append(f"      <th>{position}</th>\n")
+        for idx, value in enumerate(row):
+            cells.append(f"      <td>{cell_text(value, escape, idx in float_columns)}</td>\n")
+        cells.append("    </tr>\n")
+        yield "".join(cells)
+
+    yield "  </tbody>\n</table>"
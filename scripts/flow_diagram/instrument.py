@@ -0,0 +1,195 @@
+"""
+Per-stage timing and memory instrumentation for the flow diagram scripts
+
+Wrap each pipeline stage in ``with profiler.stage("name") as stage:``. When
+profiling is off, stage() returns one shared no-op object, so the only cost
+is a method call per stage. When on, every stage records wall time, CPU
+time, resident memory (current and peak) and, optionally, tracemalloc
+deltas, plus whatever counts the caller attaches (rows, nodes, edges).
+Counts may be given as callables; they are only evaluated when profiling.
+"""
+
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from flow_diagram.writers import write_if_changed
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss():
+    """Return the resident set size in bytes, or None where it cannot be read cheaply"""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            return int(handle.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss():
+    """Return the process's peak resident set size in bytes, or None if unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _NullStage:
+    """Stand-in returned while profiling is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def count(self, **counts):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """One timed pipeline stage; use count() to attach row/node/edge counts"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.counts = {}
+        self._cprofile = None
+
+    def count(self, **counts):
+        self.counts.update(counts)
+
+    def __enter__(self):
+        profiler = self.profiler
+        self.depth = profiler._depth
+        profiler._depth += 1
+        self._rss_start = current_rss()
+        if profiler.trace_memory:
+            self._traced_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        # cProfile cannot nest, so only top-level stages are profiled
+        if profiler.cprofile and self.depth == 0:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.process_time() - self._cpu_start
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+        profiler = self.profiler
+        profiler._depth -= 1
+        record = {
+            "name": self.name,
+            "depth": self.depth,
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "rss_bytes": current_rss(),
+            "peak_rss_bytes": peak_rss(),
+        }
+        if record["rss_bytes"] is not None and self._rss_start is not None:
+            record["rss_delta_bytes"] = record["rss_bytes"] - self._rss_start
+        if profiler.trace_memory:
+            traced, traced_peak = tracemalloc.get_traced_memory()
+            record["tracemalloc_delta_bytes"] = traced - self._traced_start
+            record["tracemalloc_peak_bytes"] = traced_peak - self._traced_start
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        record["counts"] = {key: value() if callable(value) else value
+                            for key, value in self.counts.items()}
+        profiler._finish(record, self._cprofile)
+        return False
+
+
+class Profiler:
+    """Collects stage records for one run and writes them as a JSON trace
+
+    cprofile=True runs every top-level stage under cProfile (which slows
+    them down) and keeps the statistics of the slowest one for dumping.
+    trace_memory=True turns on tracemalloc for allocation deltas.
+    """
+
+    def __init__(self, enabled=False, cprofile=False, trace_memory=False):
+        self.enabled = enabled
+        self.cprofile = enabled and cprofile
+        self.trace_memory = enabled and trace_memory
+        self.stages = []
+        self._depth = 0
+        self._slowest = None
+        self._slowest_stats = None
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name):
+        """Return a context manager timing the named stage (a no-op when disabled)"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return Stage(self, name)
+
+    def _finish(self, record, stats):
+        self.stages.append(record)
+        if record["depth"] == 0 and (self._slowest is None
+                                     or record["wall_seconds"] > self._slowest["wall_seconds"]):
+            self._slowest = record
+            self._slowest_stats = stats
+
+    @property
+    def slowest(self):
+        """Name of the slowest top-level stage so far"""
+        return self._slowest["name"] if self._slowest else None
+
+    def trace(self, **meta):
+        """Return the JSON-serializable trace of every recorded stage"""
+        return {
+            **meta,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "wall_seconds": time.perf_counter() - self._started,
+            "cpu_seconds": time.process_time() - self._cpu_started,
+            "peak_rss_bytes": peak_rss(),
+            "cprofile": self.cprofile,
+            "tracemalloc": self.trace_memory,
+            "slowest_stage": self.slowest,
+            "stages": self.stages,
+        }
+
+    def write(self, trace_file, cprofile_file=None, **meta):
+        """Write the JSON trace and, if requested, the cProfile stats of the slowest stage"""
+        if not self.enabled:
+            return
+        write_if_changed(trace_file, json.dumps(self.trace(**meta), indent=2) + "\n")
+        if cprofile_file and self._slowest_stats is not None:
+            self._slowest_stats.dump_stats(str(cprofile_file))
+
+    def report(self):
+        """Print a short per-stage summary"""
+        if not self.enabled or not self.stages:
+            return
+        print(f"\n{'Stage':<34} {'wall ms':>10} {'cpu ms':>10} {'rss MB':>9}  counts")
+        for record in self.stages:
+            rss = record["rss_bytes"]
+            rss_text = f"{rss / 2 ** 20:9.1f}" if rss is not None else f"{'-':>9}"
+            counts = ", ".join(f"{key}={value}" for key, value in record["counts"].items())
+            name = "  " * record["depth"] + record["name"]
+            print(f"{name:<34} {record['wall_seconds'] * 1000:10.1f} {record['cpu_seconds'] * 1000:10.1f} "
+                  f"{rss_text}  {counts}")
@@ -0,0 +1,370 @@
+"""
+Layered (Sugiyama-style) layout of a FlowGraph for static rendering
+
+The classic pipeline, top to bottom: back edges found by a depth-first
+search are reversed to break cycles, nodes are put on layers by longest
+path, edges spanning several layers get one dummy node per layer, node
+order within each layer is improved by barycenter sweeps (members of one
+subgraph are kept side by side), and x positions are pulled towards the
+average of each node's neighbours without overlapping.
+
+Sizes are estimated from the label text, so no font metrics or browser are
+needed. Layouts are pure data and can be cached on disk by graph hash.
+"""
+
+import hashlib
+import json
+import os
+import textwrap
+from pathlib import Path
+
+from flow_diagram.writers import write_if_changed
+
+# Bump when the positions computed for the same graph change
+LAYOUT_VERSION = 1
+
+FONT_SIZE = 14
+CHAR_WIDTH = 7.4
+LINE_HEIGHT = 18
+WRAP_CHARS = 26
+PADDING_X = 14
+PADDING_Y = 10
+NODE_SEP = 28
+RANK_SEP = 56
+CLUSTER_PAD = 14
+CLUSTER_LABEL = 24
+MARGIN = 16
+DUMMY_WIDTH = 8
+SWEEPS = 4
+PLACEMENT_PASSES = 6
+
+
+def label_lines(label):
+    """Split a label into the lines it is drawn with"""
+    return textwrap.wrap(str(label), WRAP_CHARS) or [""]
+
+
+def node_size(label, shape):
+    """Estimate the drawn (width, height) of a node from its label and shape"""
+    lines = label_lines(label)
+    width = max(len(line) for line in lines) * CHAR_WIDTH + 2 * PADDING_X
+    height = len(lines) * LINE_HEIGHT + 2 * PADDING_Y
+    if shape == "diamond":
+        # The label has to fit inside the rhombus
+        width, height = width * 1.5, height * 1.5
+    elif shape == "stadium":
+        width += height / 2
+    return width, height
+
+
+def graph_digest(graph):
+    """Hash everything the layout depends on: labels, shapes, subgraphs and edges (not styles)"""
+    digest = hashlib.sha256(f"layout:{LAYOUT_VERSION}".encode("utf-8"))
+    digest.update(repr((graph.labels, graph.shapes, list(graph.node_subgraph),
+                        graph.subgraph_names)).encode("utf-8"))
+    digest.update(graph.edge_sources.tobytes())
+    digest.update(graph.edge_targets.tobytes())
+    return digest.hexdigest()
+
+
+def _break_cycles(node_count, edges):
+    """Return the set of edge indexes whose direction must be reversed to make the graph acyclic"""
+    outgoing = [[] for _ in range(node_count)]
+    for index, (source, target) in enumerate(edges):
+        outgoing[source].append((target, index))
+
+    state = [0] * node_count  # 0 unvisited, 1 on the DFS stack, 2 done
+    reversed_edges = set()
+    for root in range(node_count):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(outgoing[root]))]
+        while stack:
+            node, children = stack[-1]
+            for target, index in children:
+                if state[target] == 1:
+                    reversed_edges.add(index)
+                elif state[target] == 0:
+                    state[target] = 1
+                    stack.append((target, iter(outgoing[target])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return reversed_edges
+
+
+def _assign_layers(node_count, dag_edges):
+    """Longest-path layering: every node sits one layer below its deepest predecessor"""
+    outgoing = [[] for _ in range(node_count)]
+    indegree = [0] * node_count
+    for source, target in dag_edges:
+        outgoing[source].append(target)
+        indegree[target] += 1
+
+    layer = [0] * node_count
+    ready = [node for node in range(node_count) if indegree[node] == 0]
+    while ready:
+        node = ready.pop()
+        for target in outgoing[node]:
+            layer[target] = max(layer[target], layer[node] + 1)
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                ready.append(target)
+    return layer
+
+
+def _order_layer(layer_nodes, barycenter, group):
+    """Sort one layer by barycenter, moving each subgraph's members as one block
+
+    Subgraph blocks always appear in subgraph order, so every frame spans
+    the same left-to-right slot in all layers; free nodes settle between them.
+    """
+    blocks = {}
+    for node in layer_nodes:
+        key = group[node] if group[node] >= 0 else ("node", node)
+        blocks.setdefault(key, []).append(node)
+
+    keys = {key: sum(barycenter[n] for n in members) / len(members) for key, members in blocks.items()}
+    subgraphs = sorted(key for key in blocks if not isinstance(key, tuple))
+    for key, value in zip(subgraphs, sorted(keys[key] for key in subgraphs)):
+        keys[key] = value
+
+    result = []
+    for key in sorted(blocks, key=lambda key: (keys[key], isinstance(key, tuple))):
+        result.extend(sorted(blocks[key], key=lambda n: barycenter[n]))
+    return result
+
+
+def _reduce_crossings(layers, up, down, group):
+    """Alternate downward and upward barycenter sweeps over the layers"""
+    position = [0.0] * len(group)
+    for layer_nodes in layers:
+        for index, node in enumerate(layer_nodes):
+            position[node] = float(index)
+
+    def sweep(layer_range, neighbours):
+        for layer_index in layer_range:
+            layer_nodes = layers[layer_index]
+            barycenter = {}
+            for node in layer_nodes:
+                linked = neighbours[node]
+                barycenter[node] = (sum(position[n] for n in linked) / len(linked)
+                                    if linked else position[node])
+            layers[layer_index] = _order_layer(layer_nodes, barycenter, group)
+            for index, node in enumerate(layers[layer_index]):
+                position[node] = float(index)
+
+    for _ in range(SWEEPS):
+        sweep(range(1, len(layers)), up)
+        sweep(range(len(layers) - 2, -1, -1), down)
+
+
+def _place(layers, widths, up, down, group):
+    """Return x centres: packed left to right, then pulled towards neighbours without overlap"""
+    x = [0.0] * len(widths)
+
+    def gap(left, right):
+        # Leave room for the cluster frames when a row crosses between subgraphs
+        extra = 2 * CLUSTER_PAD if group[left] != group[right] else 0
+        return (widths[left] + widths[right]) / 2 + NODE_SEP + extra
+
+    for layer_nodes in layers:
+        cursor = 0.0
+        for index, node in enumerate(layer_nodes):
+            if index:
+                cursor += gap(layer_nodes[index - 1], node)
+            x[node] = cursor
+
+    for _ in range(PLACEMENT_PASSES):
+        for layer_nodes in layers:
+            wanted = []
+            for node in layer_nodes:
+                linked = up[node] + down[node]
+                wanted.append(sum(x[n] for n in linked) / len(linked) if linked else x[node])
+            # Enforce the minimum gaps from the left and from the right, then average both
+            left = list(wanted)
+            for index in range(1, len(layer_nodes)):
+                left[index] = max(left[index], left[index - 1] + gap(layer_nodes[index - 1], layer_nodes[index]))
+            right = list(wanted)
+            for index in range(len(layer_nodes) - 2, -1, -1):
+                right[index] = min(right[index], right[index + 1] - gap(layer_nodes[index], layer_nodes[index + 1]))
+            for index, node in enumerate(layer_nodes):
+                x[node] = (left[index] + right[index]) / 2
+            # Averaging can reintroduce small overlaps; one more left-to-right pass settles them
+            for index in range(1, len(layer_nodes)):
+                node, previous = layer_nodes[index], layer_nodes[index - 1]
+                x[node] = max(x[node], x[previous] + gap(previous, node))
+    return x
+
+
+def _separate_clusters(layers, x, widths, group, cluster_count):
+    """Shift later subgraphs right until no two subgraph frames share an x range
+
+    Within a layer everything from the later subgraph's first member onwards
+    moves by the same amount, so gaps inside a layer only ever grow.
+    """
+    def extent(index):
+        members = [node for node in range(len(group)) if group[node] == index]
+        if not members:
+            return None
+        return (min(x[n] - widths[n] / 2 for n in members), max(x[n] + widths[n] / 2 for n in members))
+
+    previous = None
+    for index in range(cluster_count):
+        current = extent(index)
+        if current is None:
+            continue
+        if previous is not None:
+            shift = previous[1] + 2 * CLUSTER_PAD + NODE_SEP - current[0]
+            if shift > 0:
+                for layer_nodes in layers:
+                    cut = next((p for p, node in enumerate(layer_nodes) if group[node] == index), None)
+                    if cut is None:
+                        last_before = max((p for p, node in enumerate(layer_nodes)
+                                           if 0 <= group[node] < index), default=-1)
+                        cut = next((p for p, node in enumerate(layer_nodes)
+                                    if p > last_before and x[node] >= current[0]), len(layer_nodes))
+                    for node in layer_nodes[cut:]:
+                        x[node] += shift
+                current = extent(index)
+        previous = current
+
+
+def compute_layout(graph):
+    """Lay out the graph top to bottom and return the positions as plain data
+
+    The result holds, per node, [x, y, width, height] of its box (top-left
+    corner), per edge its polyline points, per subgraph its frame, and the
+    overall width and height.
+    """
+    node_count = graph.node_count
+    edges = [(source, target) for source, target in graph.edges() if source != target]
+    self_loops = sorted({source for source, target in graph.edges() if source == target})
+
+    reversed_edges = _break_cycles(node_count, edges)
+    dag_edges = [(target, source) if index in reversed_edges else (source, target)
+                 for index, (source, target) in enumerate(edges)]
+    layer = _assign_layers(node_count, dag_edges)
+
+    widths = []
+    heights = []
+    for node in range(node_count):
+        width, height = node_size(graph.labels[node], graph.shapes[node])
+        widths.append(width)
+        heights.append(height)
+    group = list(graph.node_subgraph)
+
+    # Replace edges spanning several layers with chains through dummy nodes
+    up = [[] for _ in range(node_count)]
+    down = [[] for _ in range(node_count)]
+    chains = []
+    for source, target in dag_edges:
+        chain = [source]
+        previous = source
+        for dummy_layer in range(layer[source] + 1, layer[target]):
+            dummy = len(widths)
+            widths.append(DUMMY_WIDTH)
+            heights.append(0)
+            group.append(-1)
+            layer.append(dummy_layer)
+            up.append([])
+            down.append([])
+            down[previous].append(dummy)
+            up[dummy].append(previous)
+            chain.append(dummy)
+            previous = dummy
+        down[previous].append(target)
+        up[target].append(previous)
+        chain.append(target)
+        chains.append(chain)
+
+    layer_count = max(layer) + 1 if layer else 0
+    layers = [[] for _ in range(layer_count)]
+    # Initial order: subgraph by subgraph, then insertion order
+    for node in sorted(range(len(widths)), key=lambda n: (group[n] if n < node_count else -1, n)):
+        layers[layer[node]].append(node)
+
+    _reduce_crossings(layers, up, down, group)
+    x = _place(layers, widths, up, down, group)
+    _separate_clusters(layers, x, widths, group, len(graph.subgraph_names))
+
+    # Vertical positions: each layer is as tall as its tallest box
+    y = [0.0] * len(widths)
+    cursor = 0.0
+    for index, layer_nodes in enumerate(layers):
+        # Leave room for a cluster title above the first layer holding subgraph members
+        if any(group[node] >= 0 for node in layer_nodes):
+            cursor += CLUSTER_LABEL
+        layer_height = max((heights[node] for node in layer_nodes), default=0)
+        for node in layer_nodes:
+            y[node] = cursor + layer_height / 2
+        cursor += layer_height + RANK_SEP
+
+    # Shift everything so the drawing starts at the margin
+    min_x = min((x[node] - widths[node] / 2 for node in range(len(widths))), default=0.0)
+    offset_x = MARGIN + 2 * CLUSTER_PAD - min_x
+    offset_y = MARGIN
+    x = [value + offset_x for value in x]
+    y = [value + offset_y for value in y]
+
+    nodes = [[round(x[n] - widths[n] / 2, 1), round(y[n] - heights[n] / 2, 1),
+              round(widths[n], 1), round(heights[n], 1)] for n in range(node_count)]
+
+    edge_paths = []
+    for (source, target), chain in zip(edges, chains):
+        points = [[round(x[n], 1), round(y[n], 1)] for n in chain]
+        top, bottom = chain[0], chain[-1]
+        # Leave from the bottom of the upper box and enter the top of the lower one
+        points[0][1] = round(y[top] + heights[top] / 2, 1)
+        points[-1][1] = round(y[bottom] - heights[bottom] / 2, 1)
+        if chain[0] != source:
+            points.reverse()
+        edge_paths.append([source, target, points])
+    for node in self_loops:
+        edge_paths.append([node, node, []])
+
+    clusters = []
+    for index in range(len(graph.subgraph_names)):
+        members = [n for n in range(node_count) if group[n] == index]
+        if not members:
+            continue
+        left = min(nodes[n][0] for n in members) - CLUSTER_PAD
+        top = min(nodes[n][1] for n in members) - CLUSTER_PAD - CLUSTER_LABEL
+        right = max(nodes[n][0] + nodes[n][2] for n in members) + CLUSTER_PAD
+        bottom = max(nodes[n][1] + nodes[n][3] for n in members) + CLUSTER_PAD
+        clusters.append([index, round(left, 1), round(top, 1), round(right - left, 1), round(bottom - top, 1)])
+
+    right_edge = max([n[0] + n[2] for n in nodes] + [c[1] + c[3] for c in clusters], default=0)
+    bottom_edge = max([n[1] + n[3] for n in nodes] + [c[2] + c[4] for c in clusters], default=0)
+    return {
+        "version": LAYOUT_VERSION,
+        "width": round(right_edge + MARGIN, 1),
+        "height": round(bottom_edge + MARGIN, 1),
+        "nodes": nodes,
+        "edges": edge_paths,
+        "clusters": clusters,
+    }
+
+
+def layout_graph(graph, cache_dir=None):
+    """Return the layout of graph, reusing a cached one with the same graph hash when possible"""
+    if cache_dir is None:
+        return compute_layout(graph)
+
+    cache_file = Path(cache_dir) / f"layout-{graph_digest(graph)[:32]}.json"
+    try:
+        with open(cache_file, encoding="utf-8") as handle:
+            layout = json.load(handle)
+        if layout.get("version") == LAYOUT_VERSION:
+            # Mark as recently used for the parse cache's eviction
+            os.utime(cache_file)
+            return layout
+    except (FileNotFoundError, ValueError):
+        pass
+
+    layout = compute_layout(graph)
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    write_if_changed(cache_file, json.dumps(layout, separators=(",", ":")))
+    return layout
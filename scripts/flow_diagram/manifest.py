@@ -0,0 +1,165 @@
+"""
+Build manifest for incremental regeneration of docs/flow-diagrams
+
+For every generated file the manifest records the generator version, the
+workbook content hash, a hash per input sheet, the screen list and the size,
+mtime and hash of the bytes that were written, plus the same for the
+sidecar files written with it (partition pages, table chunks, role
+diagrams), so outputs whose inputs have not changed can be skipped. An
+output only counts as current while it and its sidecars still hold the
+recorded bytes; the hash is only recomputed for files whose mtime moved.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from flow_diagram.cache import file_digest
+from flow_diagram.sheets import is_missing, iter_sheet_rows
+from flow_diagram.writers import write_if_changed
+
+MANIFEST_NAME = ".build-manifest.json"
+
+
+def generator_version(version, script_path):
+    """Combine a declared generator version with a hash of the generating script"""
+    with open(script_path, "rb") as handle:
+        source_digest = hashlib.sha256(handle.read()).hexdigest()[:12]
+    return f"{version}+{source_digest}"
+
+
+def cell_digest_text(value):
+    """A cell as text every reader agrees on: None when empty, whole numbers without '.0'
+
+    pandas turns sparse whole-number columns into floats, and a CachedSheet
+    keeps dates and the cells of mixed-type columns as their text, so a value
+    is hashed by its text whichever reader (or cache hit) produced it.
+    """
+    if is_missing(value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def row_digest(row):
+    """16-byte hash of one row's cell values, see cell_digest_text"""
+    text = repr(tuple(cell_digest_text(value) for value in row))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def combine_row_digests(columns, row_digests):
+    """Fold a sheet's column names and row hashes into its sheet digest"""
+    digest = hashlib.sha256()
+    digest.update(repr(list(columns)).encode("utf-8"))
+    for row_hash in row_digests:
+        digest.update(row_hash)
+    return digest.hexdigest()
+
+
+def sheet_digest(sheet):
+    """Hash the columns and cell values of a DataFrame or lightweight sheet
+
+    Built from the row hashes, so a revision diff (flow_diagram.diff) that has
+    hashed every row gets the same sheet digest without another pass.
+    """
+    return combine_row_digests(sheet.columns, (row_digest(row) for row in iter_sheet_rows(sheet)))
+
+
+def _fingerprint(path, previous=None):
+    """{size, mtime_ns, sha256} of a file, reusing previous's hash when its size and mtime still match"""
+    stat = Path(path).stat()
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    previous = previous or {}
+    if previous.get("sha256") and all(previous.get(key) == value for key, value in fingerprint.items()):
+        fingerprint["sha256"] = previous["sha256"]
+    else:
+        fingerprint["sha256"] = file_digest(path)
+    return fingerprint
+
+
+def _unchanged(path, recorded):
+    """True when path still holds the recorded bytes"""
+    try:
+        stat = Path(path).stat()
+    except FileNotFoundError:
+        return False
+    if stat.st_size != recorded.get("size"):
+        return False
+    return stat.st_mtime_ns == recorded.get("mtime_ns") or file_digest(path) == recorded.get("sha256")
+
+
+class BuildManifest:
+    """Per-output input fingerprints stored as JSON next to the generated files"""
+
+    def __init__(self, output_dir):
+        self.path = Path(output_dir) / MANIFEST_NAME
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                self.entries = json.load(handle)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def _entry(self, output_file):
+        return self.entries.get(Path(output_file).name)
+
+    def _intact(self, output_file, entry):
+        """True when output_file and its sidecar files are still as they were recorded"""
+        root = self.path.parent
+        return _unchanged(output_file, entry) and all(
+            _unchanged(root / name, recorded) for name, recorded in (entry.get("sidecars") or {}).items())
+
+    def is_current(self, output_file, generator, workbook_digest, options=None):
+        """True when output_file was last built by this generator from identical workbook bytes"""
+        entry = self._entry(output_file)
+        return (
+            entry is not None
+            and entry.get("generator") == generator
+            and entry.get("options") == options
+            and entry.get("workbook") == workbook_digest
+            and self._intact(output_file, entry)
+        )
+
+    def inputs_unchanged(self, output_file, generator, sheets, screens=None, options=None):
+        """True when the sheets (and screens) feeding output_file hash the same as last build"""
+        entry = self._entry(output_file)
+        return (
+            entry is not None
+            and entry.get("generator") == generator
+            and entry.get("options") == options
+            and entry.get("sheets") == sheets
+            and (screens is None or entry.get("screens") == list(screens))
+            and self._intact(output_file, entry)
+        )
+
+    def record(self, output_file, generator, workbook_digest, sheets, screens=None, options=None, sidecars=()):
+        """Remember the inputs of output_file as it is currently on disk
+
+        options holds output settings (e.g. the table mode) that change the
+        bytes written for the same inputs. sidecars lists the other files
+        written with output_file (e.g. its partition pages); deleting or
+        editing any of them makes the output stale.
+        """
+        previous = self._entry(output_file) or {}
+        entry = {
+            "generator": generator,
+            "options": options,
+            "workbook": workbook_digest,
+            "sheets": sheets,
+            "screens": list(screens) if screens is not None else None,
+            **_fingerprint(output_file, previous),
+        }
+        if sidecars:
+            root = self.path.parent
+            known = previous.get("sidecars") or {}
+            names = sorted(Path(os.path.relpath(path, root)).as_posix() for path in sidecars)
+            entry["sidecars"] = {name: _fingerprint(root / name, known.get(name)) for name in names}
+        self.entries[Path(output_file).name] = entry
+
+    def forget(self, output_file):
+        """Drop the entry of an output that is no longer generated"""
+        self.entries.pop(Path(output_file).name, None)
+
+    def save(self):
+        write_if_changed(self.path, json.dumps(self.entries, indent=2, sort_keys=True) + "\n")
@@ -0,0 +1,107 @@
+"""
+Mermaid flowchart emitter for FlowGraph
+"""
+
+import re
+
+_SHAPE_BRACKETS = {
+    "rect": ("[", "]"),
+    "round": ("(", ")"),
+    "stadium": ("([", "])"),
+    "diamond": ("{", "}"),
+}
+
+_STYLE_SPLIT = re.compile(r",(?![^(]*\))")
+
+
+def parse_style(style):
+    """Split a Mermaid style (fill:#228B22,stroke:#166534,color:#fff) into an ordered {property: value} dict"""
+    declarations = {}
+    for declaration in _STYLE_SPLIT.split(style or ""):
+        if ":" in declaration:
+            key, value = (part.strip() for part in declaration.split(":", 1))
+            declarations[key] = value
+    return declarations
+
+
+def node_definition(graph, node):
+    """Return the Mermaid declaration of a node, e.g. Login["User Authentication System"]"""
+    opening, closing = _SHAPE_BRACKETS[graph.shapes[node]]
+    label = str(graph.labels[node]).replace('"', "#quot;")
+    return f'{graph.node_ids[node]}{opening}"{label}"{closing}'
+
+
+def edge_definition(graph, source, target):
+    """Return the Mermaid declaration of an edge, captioned when it has a label: A -->|"120 orders"| B"""
+    label = graph.edge_labels.get((source, target))
+    if label is None:
+        return f"{graph.node_ids[source]} --> {graph.node_ids[target]}"
+    label = str(label).replace('"', "#quot;")
+    return f'{graph.node_ids[source]} -->|"{label}"| {graph.node_ids[target]}'
+
+
+def mermaid_lines(graph, direction="TD"):
+    """Yield the lines of a Mermaid flowchart for the graph
+
+    Nodes are declared inside their subgraph and every edge follows the
+    declarations of the subgraph its source belongs to. Node and edge
+    (linkStyle) styles come last.
+    """
+    yield f"flowchart {direction}"
+
+    edges_by_subgraph = {}
+    for source, target in graph.edges():
+        edges_by_subgraph.setdefault(graph.node_subgraph[source], []).append((source, target))
+
+    members_by_subgraph = {}
+    for node, owner in enumerate(graph.node_subgraph):
+        members_by_subgraph.setdefault(owner, []).append(node)
+
+    # linkStyle addresses edges by the order they are written in
+    edge_order = []
+    for node in members_by_subgraph.get(-1, []):
+        yield f"    {node_definition(graph, node)}"
+    for source, target in edges_by_subgraph.get(-1, []):
+        edge_order.append((source, target))
+        yield f"    {edge_definition(graph, source, target)}"
+
+    for index, name in enumerate(graph.subgraph_names):
+        yield f'    subgraph {graph.subgraph_ids[index]}["{name}"]'
+        for node in members_by_subgraph.get(index, []):
+            yield f"        {node_definition(graph, node)}"
+        for source, target in edges_by_subgraph.get(index, []):
+            edge_order.append((source, target))
+            yield f"        {edge_definition(graph, source, target)}"
+        yield "    end"
+        yield ""
+
+    if graph.styles:
+        yield ""
+        for node, style in graph.styles.items():
+            yield f"    style {graph.node_ids[node]} {style}"
+
+    for position, edge in enumerate(edge_order if graph.edge_styles else ()):
+        if edge in graph.edge_styles:
+            yield f"    linkStyle {position} {graph.edge_styles[edge]}"
+
+    for node, (url, tooltip) in graph.links.items():
+        tooltip_text = f' "{tooltip.replace(chr(34), "#quot;")}"' if tooltip else ""
+        yield f'    click {graph.node_ids[node]} href "{url}"{tooltip_text}'
+
+
+def mermaid_chunks(graph, direction="TD"):
+    """Yield the flowchart source line by line, newline-terminated, for streaming writers"""
+    for line in mermaid_lines(graph, direction):
+        yield line + "\n"
+
+
+def mermaid_file_chunks(graph, direction="TD"):
+    """Yield a .mmd file: the flowchart source inside a ```mermaid fence, as the scripts write it"""
+    yield "```mermaid\n"
+    yield from mermaid_chunks(graph, direction)
+    yield "```"
+
+
+def to_mermaid(graph, direction="TD"):
+    """Return the Mermaid flowchart source for the graph"""
+    return "".join(mermaid_chunks(graph, direction))
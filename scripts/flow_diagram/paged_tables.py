@@ -0,0 +1,211 @@
+"""
+Paginated source-data tables for the generated HTML
+
+Instead of inlining every sheet as one large HTML table, the trimmed rows
+(entirely empty rows are dropped) are written as small JSON chunks in a
+directory next to the page, and a tiny viewer loads a chunk only when its
+page is shown. Each chunk is a .js file that hands its JSON payload to
+window.FlowTables.receive(...), so pages keep working when opened straight
+from disk (file://), where fetch() of local JSON is blocked.
+"""
+
+import html
+import json
+import math
+from pathlib import Path
+
+from flow_diagram.sheets import iter_sheet_rows
+from flow_diagram.writers import write_chunks
+
+DEFAULT_PAGE_SIZE = 200
+TABLE_MODES = ("inline", "paged")
+
+VIEWER_CSS = """
+        .sheet-viewer .pager {
+            display: flex;
+            gap: 10px;
+            align-items: center;
+            margin: 10px 0;
+        }
+        .sheet-viewer td {
+            white-space: pre-wrap;
+        }
+"""
+
+VIEWER_JS = """
+(function () {
+    var meta = JSON.parse(document.getElementById('flow-tables-meta').textContent);
+    var chunks = {};
+    var waiting = {};
+
+    window.FlowTables = {
+        receive: function (payload) {
+            var key = payload.sheet + ':' + payload.chunk;
+            chunks[key] = payload.rows;
+            (waiting[key] || []).forEach(function (done) { done(payload.rows); });
+            delete waiting[key];
+        }
+    };
+
+    function loadChunk(sheet, chunk, done) {
+        var key = sheet + ':' + chunk;
+        if (chunks[key]) { done(chunks[key]); return; }
+        if (!waiting[key]) {
+            waiting[key] = [];
+            var script = document.createElement('script');
+            script.src = meta.dir + '/sheet-' + sheet + '-' + chunk + '.js';
+            document.head.appendChild(script);
+        }
+        waiting[key].push(done);
+    }
+
+    function cell(tag, text) {
+        var element = document.createElement(tag);
+        element.textContent = text === null ? '' : String(text);
+        return element;
+    }
+
+    function render(viewer, page) {
+        var sheet = meta.sheets[Number(viewer.dataset.sheet)];
+        var pages = Math.max(sheet.chunks, 1);
+        page = Math.min(Math.max(page, 0), pages - 1);
+        viewer.dataset.page = page;
+        viewer.querySelector('.page-label').textContent =
+            'Page ' + (page + 1) + ' of ' + pages + ' (' + sheet.rows + ' rows)';
+        if (!sheet.chunks) { return; }
+        loadChunk(viewer.dataset.sheet, page, function (rows) {
+            var body = viewer.querySelector('tbody');
+            body.textContent = '';
+            rows.forEach(function (row) {
+                var tr = document.createElement('tr');
+                tr.id = 'row-' + viewer.dataset.sheet + '-' + row[0];
+                tr.appendChild(cell('th', row[0]));
+                row.slice(1).forEach(function (value) { tr.appendChild(cell('td', value)); });
+                body.appendChild(tr);
+            });
+            viewer.dispatchEvent(new CustomEvent('pagechange'));
+        });
+    }
+
+    function show(viewer) {
+        if (viewer.dataset.page === undefined) { render(viewer, 0); }
+    }
+
+    document.querySelectorAll('.sheet-viewer').forEach(function (viewer) {
+        viewer.querySelector('.prev').addEventListener('click', function () {
+            render(viewer, Number(viewer.dataset.page) - 1);
+        });
+        viewer.querySelector('.next').addEventListener('click', function () {
+            render(viewer, Number(viewer.dataset.page) + 1);
+        });
+    });
+
+    // Only fetch a sheet's first page once it scrolls into view
+    var viewers = document.querySelectorAll('.sheet-viewer');
+    if ('IntersectionObserver' in window) {
+        var observer = new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                if (entry.isIntersecting) {
+                    show(entry.target);
+                    observer.unobserve(entry.target);
+                }
+            });
+        });
+        viewers.forEach(function (viewer) { observer.observe(viewer); });
+    } else {
+        viewers.forEach(show);
+    }
+
+    window.FlowTables.goTo = function (sheet, row) {
+        var viewer = document.querySelector('.sheet-viewer[data-sheet="' + sheet + '"]');
+        var page = meta.sheets[sheet].pages.findIndex(function (first, idx, pages) {
+            return row >= first && (idx + 1 === pages.length || row < pages[idx + 1]);
+        });
+        render(viewer, page);
+        return viewer;
+    };
+})();
+"""
+
+
+def _json_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _write_chunk(data_dir, sheet_idx, chunk_idx, rows):
+    """Write one chunk of rows and return its file name"""
+    payload = json.dumps({"sheet": sheet_idx, "chunk": chunk_idx, "rows": rows},
+                         ensure_ascii=False, separators=(",", ":"))
+    chunk_file = Path(data_dir) / f"sheet-{sheet_idx}-{chunk_idx}.js"
+    write_chunks(chunk_file, ["FlowTables.receive(", payload, ");\n"])
+    return chunk_file.name
+
+
+def write_sheet_chunks(sheets_data, data_dir, page_size=DEFAULT_PAGE_SIZE, search=None):
+    """Write every sheet's non-empty rows as JSON chunks and return the viewer metadata
+
+    Rows keep their original row number as the first element. Chunk files left
+    over from a previous, larger workbook are removed. A SearchIndex passed as
+    search indexes each row on the way.
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    written = set()
+    sheets = []
+
+    for sheet_idx, (sheet_name, df) in enumerate(sheets_data.items()):
+        row_count = 0
+        page_starts = []
+        page = []
+        for row_number, row in enumerate(iter_sheet_rows(df)):
+            values = [_json_value(value) for value in row]
+            if all(value is None for value in values):
+                continue
+            if search is not None:
+                search.add_row(sheet_idx, row_number, row)
+            page.append([row_number] + values)
+            row_count += 1
+            if len(page) == page_size:
+                page_starts.append(page[0][0])
+                written.add(_write_chunk(data_dir, sheet_idx, len(page_starts) - 1, page))
+                page = []
+        if page:
+            page_starts.append(page[0][0])
+            written.add(_write_chunk(data_dir, sheet_idx, len(page_starts) - 1, page))
+
+        sheets.append({
+            "name": sheet_name,
+            "columns": [str(column).strip() for column in df.columns],
+            "rows": row_count,
+            "chunks": len(page_starts),
+            "pages": page_starts,
+        })
+
+    for stale in data_dir.glob("sheet-*.js"):
+        if stale.name not in written:
+            stale.unlink()
+
+    return {"dir": data_dir.name, "sheets": sheets}
+
+
+def paged_tables_chunks(meta):
+    """Yield the HTML for the paginated viewers, their metadata and the viewer script"""
+    yield f"<style>{VIEWER_CSS}</style>\n"
+    for sheet_idx, sheet in enumerate(meta["sheets"]):
+        yield f"<h3>{html.escape(sheet['name'])}</h3>\n"
+        yield f'<div class="sheet-viewer data-table" data-sheet="{sheet_idx}">\n'
+        yield ('  <div class="pager"><button class="prev" type="button">&larr; Prev</button>'
+               '<span class="page-label"></span>'
+               '<button class="next" type="button">Next &rarr;</button></div>\n')
+        yield f'  <table id="table-{sheet["name"].replace(" ", "-")}">\n    <thead>\n      <tr><th></th>'
+        yield "".join(f"<th>{html.escape(column)}</th>" for column in sheet["columns"])
+        yield "</tr>\n    </thead>\n    <tbody></tbody>\n  </table>\n</div>\n"
+
+    # Keep "</" out of the inline JSON so it cannot close the script element
+    meta_json = json.dumps(meta, ensure_ascii=False).replace("</", "<\\/")
+    yield f'<script type="application/json" id="flow-tables-meta">{meta_json}</script>\n'
+    yield f"<script>{VIEWER_JS}</script>\n"
@@ -0,0 +1,64 @@
+"""
+Multi-core parsing of multi-tab workbooks
+
+The parent reads the workbook's sheet list, shared-strings table and date
+styles once and hands them to every worker process through the pool
+initializer, so a task only names a sheet. Each worker streams its worksheet
+XML with the regular XlsxSheet reader and sends the rows back as parse cache
+column buffers (cache.encode_sheet): numeric columns as float arrays, text as
+offsets and UTF-8 bytes, repeated labels as codes. That is far less to pickle than a
+DataFrame or row tuples, and the parent wraps each buffer as an in-memory
+CachedSheet without decoding it. Sheets are submitted largest first, so the
+wall time approaches that of the largest sheet.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from flow_diagram.cache import CachedSheet, encode_sheet
+from flow_diagram.xlsx_reader import XlsxWorkbook
+
+# The workbook of the current worker process, set by _init_worker
+_worker_workbook = None
+
+
+def _init_worker(file_path, sheet_members, shared_strings, date_styles, date1904):
+    global _worker_workbook
+    _worker_workbook = XlsxWorkbook(file_path, sheet_members, shared_strings, date_styles, date1904)
+
+
+def _encode_sheet(workbook, name, usecols):
+    sheet = workbook.sheet(name, usecols)
+    rows = list(sheet.iter_rows())
+    return encode_sheet(name, sheet.columns, rows)
+
+
+def _parse_sheet(name, usecols):
+    return _encode_sheet(_worker_workbook, name, usecols)
+
+
+def parse_parallel(file_path, sheet_names=None, columns=None, workers=None):
+    """Parse the requested sheets in worker processes and return {name: CachedSheet} in workbook order
+
+    columns maps sheet names to the columns to keep, as for stream_workbook.
+    workers defaults to one per CPU core and never exceeds the number of
+    sheets; with a single worker the sheets are parsed in this process.
+    """
+    workbook = XlsxWorkbook(file_path)
+    if sheet_names is None:
+        wanted = workbook.sheet_names
+    else:
+        wanted = [name for name in sheet_names if name in workbook.sheet_names]
+    columns = columns or {}
+    workers = min(len(wanted), workers or os.cpu_count() or 1)
+
+    if workers <= 1:
+        return {name: CachedSheet.from_bytes(_encode_sheet(workbook, name, columns.get(name))) for name in wanted}
+
+    sizes = workbook.sheet_sizes()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(file_path, workbook.sheet_members, workbook.shared_strings,
+                                       workbook.date_styles, workbook.date1904)) as pool:
+        futures = {name: pool.submit(_parse_sheet, name, columns.get(name))
+                   for name in sorted(wanted, key=lambda name: -sizes[name])}
+    return {name: CachedSheet.from_bytes(futures[name].result()) for name in wanted}
@@ -0,0 +1,233 @@
+"""
+Partitioning of large flow graphs into small, linked sub-diagrams
+
+A graph with more than max_nodes nodes is split into partitions: by
+subgraph (module/sheet), by weakly connected component or by strongly
+connected component. Partitions still over the limit are split into their
+connected pieces and, as a last resort, into breadth-first slices, so every
+page stays small however large the whole graph is. Small pieces are packed
+together to avoid a flood of tiny pages.
+
+Each partition becomes its own FlowGraph in which edges leaving the
+partition end in a stub node linking to the neighbouring page, and the
+overview graph has one node per partition linking to its page.
+"""
+
+from collections import deque
+
+from flow_diagram.graph import FlowGraph
+
+DEFAULT_MAX_NODES = 200
+STRATEGIES = ("auto", "subgraph", "wcc", "scc", "none")
+
+
+def _undirected_adjacency(graph):
+    adjacency = [[] for _ in range(graph.node_count)]
+    for source, target in graph.edges():
+        if source != target:
+            adjacency[source].append(target)
+            adjacency[target].append(source)
+    return adjacency
+
+
+def weakly_connected_components(graph, nodes=None, adjacency=None):
+    """Return the weakly connected components among nodes (default: all), each in BFS order"""
+    adjacency = adjacency or _undirected_adjacency(graph)
+    allowed = set(range(graph.node_count) if nodes is None else nodes)
+    seen = set()
+    components = []
+    for start in (range(graph.node_count) if nodes is None else nodes):
+        if start in seen:
+            continue
+        seen.add(start)
+        component = []
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            component.append(node)
+            for neighbour in adjacency[node]:
+                if neighbour in allowed and neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+        components.append(component)
+    return components
+
+
+def strongly_connected_components(graph):
+    """Return the strongly connected components (iterative Tarjan), in order of discovery"""
+    outgoing = [[] for _ in range(graph.node_count)]
+    for source, target in graph.edges():
+        outgoing[source].append(target)
+
+    index_of = [-1] * graph.node_count
+    lowlink = [0] * graph.node_count
+    on_stack = [False] * graph.node_count
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(graph.node_count):
+        if index_of[root] >= 0:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child_index = work.pop()
+            if child_index == 0:
+                index_of[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            descended = False
+            children = outgoing[node]
+            while child_index < len(children):
+                child = children[child_index]
+                child_index += 1
+                if index_of[child] < 0:
+                    work.append((node, child_index))
+                    work.append((child, 0))
+                    descended = True
+                    break
+                if on_stack[child]:
+                    lowlink[node] = min(lowlink[node], index_of[child])
+            if descended:
+                continue
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component[::-1])
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+    return components
+
+
+def _pack(groups, max_nodes):
+    """Merge consecutive small groups (same name) into bins of at most max_nodes"""
+    packed = []
+    for name, nodes in groups:
+        if packed and packed[-1][0] == name and len(packed[-1][1]) + len(nodes) <= max_nodes:
+            packed[-1][1].extend(nodes)
+        else:
+            packed.append((name, list(nodes)))
+    return packed
+
+
+def partition_graph(graph, max_nodes=DEFAULT_MAX_NODES, strategy="auto"):
+    """Split the graph into partitions of at most max_nodes nodes
+
+    Returns a list of {"name", "nodes"} dicts, or an empty list when the
+    graph is small enough (or strategy is "none") and should stay whole.
+    "auto" splits by subgraph when the graph has populated subgraphs and by
+    weakly connected component otherwise.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown partition strategy: {strategy}")
+    if strategy == "none" or graph.node_count <= max_nodes:
+        return []
+
+    adjacency = _undirected_adjacency(graph)
+    if strategy == "auto":
+        strategy = "subgraph" if any(owner >= 0 for owner in graph.node_subgraph) else "wcc"
+
+    if strategy == "subgraph":
+        by_subgraph = {}
+        for node, owner in enumerate(graph.node_subgraph):
+            by_subgraph.setdefault(owner, []).append(node)
+        groups = [(graph.subgraph_names[owner] if owner >= 0 else "Other", nodes)
+                  for owner, nodes in sorted(by_subgraph.items(), key=lambda item: (item[0] < 0, item[0]))]
+    elif strategy == "scc":
+        groups = [("Cycle group", nodes) for nodes in strongly_connected_components(graph)]
+    else:
+        groups = [("Component", nodes) for nodes in weakly_connected_components(graph, adjacency=adjacency)]
+
+    pieces = []
+    for name, nodes in groups:
+        if len(nodes) <= max_nodes:
+            pieces.append((name, nodes))
+            continue
+        # Too big: split into its connected pieces, then slice what is still too big
+        for component in weakly_connected_components(graph, nodes, adjacency):
+            for start in range(0, len(component), max_nodes):
+                pieces.append((name, component[start:start + max_nodes]))
+
+    partitions = []
+    packed = _pack(pieces, max_nodes)
+    totals = {}
+    for name, _ in packed:
+        totals[name] = totals.get(name, 0) + 1
+    seen = {}
+    for name, nodes in packed:
+        seen[name] = seen.get(name, 0) + 1
+        label = name if totals[name] == 1 else f"{name} {seen[name]} of {totals[name]}"
+        partitions.append({"name": label, "nodes": nodes})
+    return partitions
+
+
+def partition_page_name(index, suffix=".html"):
+    """File name of a partition's page inside the parts folder"""
+    return f"part-{index + 1}{suffix}"
+
+
+def partition_graphs(graph, partitions, parts_dir):
+    """Build one FlowGraph per partition, plus the collapsed overview graph
+
+    Edges that leave a partition end in a round stub node linking to the
+    neighbouring page; overview nodes link to the pages in parts_dir (a
+    folder name relative to the overview page). Edge styles, labels and
+    weights are kept, on both halves of a cut edge.
+    """
+    partition_of = [-1] * graph.node_count
+    for index, partition in enumerate(partitions):
+        for node in partition["nodes"]:
+            partition_of[node] = index
+
+    parts = []
+    local_ids = []
+    for index, partition in enumerate(partitions):
+        part = FlowGraph()
+        local = {}
+        for node in partition["nodes"]:
+            owner = graph.node_subgraph[node]
+            local[node] = part.add_node(graph.labels[node], node_id=graph.node_ids[node],
+                                        shape=graph.shapes[node],
+                                        subgraph=graph.subgraph_names[owner] if owner >= 0 else None)
+            if node in graph.styles:
+                part.set_style(local[node], graph.styles[node])
+            if node in graph.links:
+                part.set_link(local[node], *graph.links[node])
+        parts.append(part)
+        local_ids.append(local)
+
+    def stub(index, other, arrow):
+        part = parts[index]
+        label = f"{arrow} {partitions[other]['name']}"
+        node = part.find(label)
+        if node is None:
+            node = part.add_node(label, node_id=f"part_{other + 1}", shape="round")
+            part.set_link(node, partition_page_name(other), f"Open {partitions[other]['name']}")
+        return node
+
+    overview = FlowGraph()
+    for index, partition in enumerate(partitions):
+        node = overview.add_node(f"{partition['name']} ({len(partition['nodes'])} nodes)",
+                                 node_id=f"part_{index + 1}")
+        overview.set_link(node, f"{parts_dir}/{partition_page_name(index)}", f"Open {partition['name']}")
+
+    for source, target in graph.edges():
+        source_part, target_part = partition_of[source], partition_of[target]
+        if source_part == target_part:
+            parts[source_part].copy_edge(graph, source, target, local_ids[source_part][source],
+                                         local_ids[source_part][target])
+            continue
+        parts[source_part].copy_edge(graph, source, target, local_ids[source_part][source],
+                                     stub(source_part, target_part, "→"))
+        parts[target_part].copy_edge(graph, source, target, stub(target_part, source_part, "←"),
+                                     local_ids[target_part][target])
+        overview.add_edge(source_part, target_part)
+
+    return parts, overview
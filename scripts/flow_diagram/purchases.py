@@ -0,0 +1,221 @@
+"""
+Purchase-lifecycle flows read from the application's SQLite database
+
+The Next.js app stores purchase orders in the `purchases` table of
+aziz-poultry.db (see lib/db.js). An order's status ('pending', 'picked up'
+or 'cancel') is set when it is created, 'pending' unless the request gives
+another (app/api/purchases/route.js); the app has no route that updates it
+afterwards. So the lifecycle graph draws Order Placed -> <current status>,
+one edge per status with the number of orders in it, and assumes no path
+between statuses.
+
+read_purchases opens the database read-only and streams the few columns it
+needs with fetchmany, so at most fetch_size rows are held at once.
+PurchaseFlows folds the rows into per-status and per-(supplier, status)
+totals in the same pass; its size depends on the number of suppliers, not
+on the number of orders. PurchaseFlows.from_totals loads the same totals
+already aggregated, e.g. from the rollup tables (flow_diagram.rollups). The
+two graphs built from it carry the order counts as edge weights and captions.
+"""
+
+import sqlite3
+from pathlib import Path
+
+from flow_diagram.graph import FlowGraph, sanitize_id
+
+DEFAULT_DATABASE = "aziz-poultry.db"
+FETCH_SIZE = 5000
+DEFAULT_TOP_SUPPLIERS = 20
+
+PURCHASE_QUERY = "SELECT supplier, status, birdQuantity, cageQuantity, totalValue FROM purchases"
+START_LABEL = "Order Placed"
+DEFAULT_STATUS = "pending"
+STATUS_LABELS = {"pending": "Pending", "picked up": "Picked Up", "cancel": "Cancelled"}
+STATUS_STYLES = {
+    "pending": "fill:#fef3c7,stroke:#d97706,color:#92400e",
+    "picked up": "fill:#228B22,stroke:#166534,color:#fff",
+    "cancel": "fill:#fee2e2,stroke:#dc2626,color:#991b1b",
+}
+START_STYLE = "fill:#e0f2fe,stroke:#0284c7,color:#075985"
+OTHER_SUPPLIERS = "Other suppliers"
+# Edge stroke widths scale linearly with the order count between these bounds
+MIN_STROKE, MAX_STROKE = 1.5, 8.0
+
+# Positions in a totals list
+ORDERS, BIRDS, CAGES, VALUE = range(4)
+
+
+def connect_read_only(db_path):
+    """Open the database read-only (it may be in use by the app), never creating it"""
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    try:
+        return sqlite3.connect(uri, uri=True)
+    except sqlite3.Error as e:
+        raise RuntimeError(f"Cannot open database {db_path}: {e}") from e
+
+
+def read_purchases(db_path, fetch_size=FETCH_SIZE):
+    """Yield (supplier, status, birds, cages, total value) rows, fetch_size rows at a time
+
+    An unreadable file or a missing table raises RuntimeError.
+    """
+    connection = connect_read_only(db_path)
+    try:
+        try:
+            cursor = connection.execute(PURCHASE_QUERY)
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Cannot read purchases from {db_path}: {e}") from e
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        connection.close()
+
+
+def status_label(status):
+    """Display name of a status, e.g. 'picked up' -> 'Picked Up'"""
+    return STATUS_LABELS.get(status, str(status).strip().title())
+
+
+def _merge(combined, totals):
+    for position, amount in enumerate(totals):
+        combined[position] += amount
+
+
+def _add(totals, key, orders, birds, cages, value):
+    entry = totals.get(key)
+    if entry is None:
+        entry = totals[key] = [0, 0, 0, 0.0]
+    entry[ORDERS] += orders
+    entry[BIRDS] += birds or 0
+    entry[CAGES] += cages or 0
+    entry[VALUE] += value or 0.0
+
+
+class PurchaseFlows:
+    """Order totals ([orders, birds, cages, value]) per status and per (supplier, status)"""
+
+    def __init__(self):
+        self.by_status = {}
+        self.by_supplier = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Aggregate (supplier, status, birds, cages, value) rows in one pass"""
+        flows = cls()
+        for row in rows:
+            flows.add(*row)
+        return flows
+
+    @classmethod
+    def from_totals(cls, rows):
+        """Load (supplier, status, orders, birds, cages, value) rows that are already aggregated"""
+        flows = cls()
+        for supplier, status, *totals in rows:
+            flows.add(supplier, status, *totals[1:], orders=totals[0])
+        return flows
+
+    def add(self, supplier, status, birds, cages, value, orders=1):
+        """Count orders (one by default) with these birds, cages and value"""
+        supplier = str(supplier).strip() if supplier is not None else ""
+        status = str(status).strip().lower() if status is not None else DEFAULT_STATUS
+        _add(self.by_status, status, orders, birds, cages, value)
+        _add(self.by_supplier, (supplier or "(no supplier)", status), orders, birds, cages, value)
+
+    @property
+    def orders(self):
+        return sum(totals[ORDERS] for totals in self.by_status.values())
+
+    def statuses(self):
+        """Known statuses in lifecycle order, then any others alphabetically"""
+        known = [status for status in STATUS_LABELS if status in self.by_status]
+        return known + sorted(status for status in self.by_status if status not in STATUS_LABELS)
+
+    def supplier_totals(self):
+        """{supplier: [orders, birds, cages, value]} over every status"""
+        totals = {}
+        for (supplier, _), entry in self.by_supplier.items():
+            _merge(totals.setdefault(supplier, [0, 0, 0, 0.0]), entry)
+        return totals
+
+    def top_suppliers(self, limit=DEFAULT_TOP_SUPPLIERS):
+        """The limit suppliers with the most orders, most first (all of them when limit is None)"""
+        totals = self.supplier_totals()
+        ranked = sorted(totals, key=lambda supplier: (-totals[supplier][ORDERS], supplier))
+        return ranked if limit is None else ranked[:limit]
+
+
+def caption(totals):
+    """Edge caption, e.g. '1,200 orders' (bird and cage volumes go in the page's tables)"""
+    return f"{totals[ORDERS]:,} order{'s' if totals[ORDERS] != 1 else ''}"
+
+
+def weigh_edges(graph):
+    """Style every weighted edge with a stroke width proportional to its weight"""
+    if not graph.edge_weights:
+        return
+    heaviest = max(graph.edge_weights.values()) or 1
+    for (source, target), weight in graph.edge_weights.items():
+        width = MIN_STROKE + (MAX_STROKE - MIN_STROKE) * weight / heaviest
+        graph.set_edge_style(source, target, f"stroke-width:{width:.1f}px")
+
+
+def _status_node(graph, status, subgraph=None):
+    node = graph.add_node(status_label(status), node_id=sanitize_id(f"status_{status}"), shape="round", subgraph=subgraph)
+    if status in STATUS_STYLES:
+        graph.set_style(node, STATUS_STYLES[status])
+    return node
+
+
+def _weighted_edge(graph, source, target, totals):
+    graph.add_edge(source, target)
+    graph.set_edge_weight(source, target, totals[ORDERS])
+    graph.set_edge_label(source, target, caption(totals))
+
+
+def build_lifecycle_graph(flows):
+    """Order Placed -> current status, weighted by the number of orders with that status"""
+    graph = FlowGraph()
+    start = graph.add_node(START_LABEL, node_id="order_placed", shape="stadium")
+    graph.set_style(start, START_STYLE)
+    for status in flows.statuses():
+        _weighted_edge(graph, start, _status_node(graph, status), flows.by_status[status])
+    weigh_edges(graph)
+    return graph
+
+
+def build_supplier_graph(flows, limit=DEFAULT_TOP_SUPPLIERS):
+    """Supplier -> current status, weighted by order count; suppliers past limit are merged into one node"""
+    graph = FlowGraph()
+    top = flows.top_suppliers(limit)
+    kept = set(top)
+    statuses = flows.statuses()
+
+    # Declare suppliers first so they sit above the statuses
+    labels = {supplier: supplier if supplier not in STATUS_LABELS.values() else f"{supplier} (supplier)"
+              for supplier in top}
+    for supplier in top:
+        graph.add_node(labels[supplier], subgraph="Suppliers")
+    others = len(flows.supplier_totals()) - len(top)
+    other_label = f"{OTHER_SUPPLIERS} ({others:,})"
+    status_nodes = {status: _status_node(graph, status, "Status") for status in statuses}
+
+    merged = {}
+    for (supplier, status), totals in flows.by_supplier.items():
+        if supplier not in kept:
+            _merge(merged.setdefault(status, [0, 0, 0, 0.0]), totals)
+
+    for supplier in top:
+        for status in statuses:
+            totals = flows.by_supplier.get((supplier, status))
+            if totals:
+                _weighted_edge(graph, graph.find(labels[supplier]), status_nodes[status], totals)
+    if merged:
+        other = graph.add_node(other_label, node_id="other_suppliers", subgraph="Suppliers")
+        for status in statuses:
+            if status in merged:
+                _weighted_edge(graph, other, status_nodes[status], merged[status])
+    weigh_edges(graph)
+    return graph
@@ -0,0 +1,162 @@
+"""
+Role-aware flows read from the workbook
+
+The "User Mapping" sheet lists a user type per row and the screens it may
+use (a comma, semicolon or newline separated list; blank means every
+screen). An optional "Screen Flow" sheet lists a screen in its first column
+and the screens it leads to in the others, in the same layout as the v1
+mapping sheets.
+
+ReachabilityIndex precomputes, as Python-int bitsets (bit n is node n), the
+set of nodes every role can reach from the start node through screens it is
+allowed to use. All roles are propagated through the graph together in one
+pass, so answering "which screens can role X reach" or drawing a per-role
+diagram never walks the graph again, however many roles there are.
+"""
+
+import re
+
+from flow_diagram.edges import iter_row_edges
+from flow_diagram.sheets import is_missing, iter_sheet_rows
+
+ROLE_SHEET = "User Mapping"
+ROLE_COLUMN = "User Type"
+ROLE_SCREENS_COLUMN = "Screens"
+TRANSITION_SHEET = "Screen Flow"
+
+_LIST_SEPARATORS = re.compile(r"[,;\n]")
+
+
+def split_screen_list(value):
+    """Split a cell such as "Reports, Sales Management" into stripped screen names"""
+    if is_missing(value):
+        return []
+    return [name.strip() for name in _LIST_SEPARATORS.split(str(value)) if name.strip()]
+
+
+def read_role_screens(sheet):
+    """Return {role: [screens]} from a User Mapping sheet; None means the role may use every screen
+
+    Rows without a user type are skipped; a role listed twice gets the union
+    of its screens.
+    """
+    if sheet is None or ROLE_COLUMN not in list(sheet.columns):
+        return {}
+    columns = list(sheet.columns)
+    role_idx = columns.index(ROLE_COLUMN)
+    screens_idx = columns.index(ROLE_SCREENS_COLUMN) if ROLE_SCREENS_COLUMN in columns else None
+
+    roles = {}
+    for row in iter_sheet_rows(sheet):
+        if is_missing(row[role_idx]) or not str(row[role_idx]).strip():
+            continue
+        role = str(row[role_idx]).strip()
+        screens = split_screen_list(row[screens_idx]) if screens_idx is not None else []
+        if not screens or (role in roles and roles[role] is None):
+            roles[role] = None
+            continue
+        known = roles.setdefault(role, [])
+        known.extend(screen for screen in screens if screen not in known)
+    return roles
+
+
+def read_transitions(sheet):
+    """Return {screen: [next screens]} from a Screen Flow sheet, in sheet order"""
+    if sheet is None:
+        return {}
+    transitions = {}
+    for source, targets in iter_row_edges(sheet, strip=True):
+        following = transitions.setdefault(source, [])
+        for cell in targets:
+            following.extend(target for target in split_screen_list(cell) if target not in following)
+    return transitions
+
+
+def iter_bits(bits):
+    """Yield the positions of the set bits of a Python int, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class ReachabilityIndex:
+    """Bitset reachability from the start node of a FlowGraph, per role
+
+    roles maps a role name to the screen labels it may use (None for all);
+    labels in always_allowed (e.g. Start and the login screen) are usable by
+    every role. Screen names are matched exactly first, then ignoring case;
+    names the graph does not have are kept in unmatched.
+    """
+
+    def __init__(self, graph, start, roles=None, always_allowed=()):
+        self.graph = graph
+        self.start = start
+        self.roles = list(roles or {})
+        self.unmatched = {}
+
+        by_lower = {}
+        for node, label in enumerate(graph.labels):
+            by_lower.setdefault(str(label).lower(), node)
+
+        # Bit r of allowed[node] is set when role r may use that node
+        every_role = (1 << len(self.roles)) - 1
+        allowed = [0] * graph.node_count
+        for label in always_allowed:
+            node = graph.find(label)
+            if node is not None:
+                allowed[node] = every_role
+        for role_bit, role in enumerate(self.roles):
+            screens = roles[role]
+            if screens is None:
+                for node in range(graph.node_count):
+                    allowed[node] |= 1 << role_bit
+                continue
+            for screen in screens:
+                node = graph.find(screen)
+                if node is None:
+                    node = by_lower.get(screen.lower())
+                if node is None:
+                    self.unmatched.setdefault(role, []).append(screen)
+                else:
+                    allowed[node] |= 1 << role_bit
+
+        self._role_bits = self._propagate_roles(graph, start, allowed, every_role)
+
+    @staticmethod
+    def _propagate_roles(graph, start, allowed, every_role):
+        """Push every role's bit along the edges at once; returns the node bitset per role"""
+        outgoing = [[] for _ in range(graph.node_count)]
+        for source, target in graph.edges():
+            outgoing[source].append(target)
+
+        reached = [0] * graph.node_count
+        if start is not None and every_role:
+            reached[start] = every_role & allowed[start]
+        pending = [start] if start is not None and reached[start] else []
+        while pending:
+            node = pending.pop()
+            for target in outgoing[node]:
+                arriving = reached[node] & allowed[target] & ~reached[target]
+                if arriving:
+                    reached[target] |= arriving
+                    pending.append(target)
+
+        # Transpose node -> roles into role -> nodes
+        role_bits = [0] * every_role.bit_length()
+        for node, roles in enumerate(reached):
+            for role_bit in iter_bits(roles):
+                role_bits[role_bit] |= 1 << node
+        return role_bits
+
+    def role_bits(self, role):
+        """Bitset of the nodes role can reach from the start node"""
+        return self._role_bits[self.roles.index(role)]
+
+    def role_nodes(self, role):
+        """Node numbers role can reach from the start node, in node order"""
+        return list(iter_bits(self.role_bits(role)))
+
+    def role_screens(self, role):
+        """Labels of the screens role can reach from the start node"""
+        return [self.graph.labels[node] for node in self.role_nodes(role)]
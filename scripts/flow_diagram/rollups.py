@@ -0,0 +1,220 @@
+"""
+Incremental rollup tables over the app's purchases and products
+
+The app only ever inserts into `purchases` and `products` (see
+app/api/*/route.js), and both use AUTOINCREMENT ids, which never go back.
+So each rollup remembers the highest id it has folded in (rollup_state),
+and a refresh aggregates only the rows above that high-water mark with one
+INSERT ... SELECT ... ON CONFLICT DO UPDATE. The id range is a rowid range
+scan, so a refresh costs time proportional to the new rows, not to the size
+of the table. Edited or deleted rows are only picked up by rebuild_rollups.
+
+purchase_rollup holds orders, birds, cages and total value per (day,
+supplier, status), the finest grain the reports ask for; the daily,
+supplier and status views sum it up and stay small however many orders
+there are. product_rollup counts products and their prices per category.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from flow_diagram.purchases import DEFAULT_DATABASE, connect_read_only
+from flow_diagram.writers import write_if_changed
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_state (
+    source TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL,
+    refreshed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS purchase_rollup (
+    day TEXT NOT NULL,
+    supplier TEXT NOT NULL,
+    status TEXT NOT NULL,
+    orders INTEGER NOT NULL,
+    birds INTEGER NOT NULL,
+    cages INTEGER NOT NULL,
+    total_value REAL NOT NULL,
+    PRIMARY KEY (day, supplier, status)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_purchase_rollup_supplier ON purchase_rollup (supplier, status);
+CREATE INDEX IF NOT EXISTS idx_purchase_rollup_status ON purchase_rollup (status, day);
+CREATE TABLE IF NOT EXISTS product_rollup (
+    category TEXT PRIMARY KEY,
+    products INTEGER NOT NULL,
+    total_price REAL NOT NULL,
+    min_price REAL,
+    max_price REAL
+) WITHOUT ROWID;
+CREATE VIEW IF NOT EXISTS purchase_rollup_daily AS
+    SELECT day, SUM(orders) AS orders, SUM(birds) AS birds, SUM(cages) AS cages, SUM(total_value) AS total_value
+    FROM purchase_rollup GROUP BY day;
+CREATE VIEW IF NOT EXISTS purchase_rollup_supplier AS
+    SELECT supplier, SUM(orders) AS orders, SUM(birds) AS birds, SUM(cages) AS cages, SUM(total_value) AS total_value
+    FROM purchase_rollup GROUP BY supplier;
+CREATE VIEW IF NOT EXISTS purchase_rollup_status AS
+    SELECT status, SUM(orders) AS orders, SUM(birds) AS birds, SUM(cages) AS cages, SUM(total_value) AS total_value
+    FROM purchase_rollup GROUP BY status;
+"""
+
+# Indexes on the app's own tables for the report pages' date, supplier and category filters
+SOURCE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_purchases_date ON purchases (date);
+CREATE INDEX IF NOT EXISTS idx_purchases_supplier_status ON purchases (supplier, status);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products (category);
+"""
+
+# source table -> statement folding the rows with last_id < id <= high_id into its rollup
+ROLLUPS = {
+    "purchases": """
+        INSERT INTO purchase_rollup (day, supplier, status, orders, birds, cages, total_value)
+        SELECT substr(date, 1, 10), supplier, status, COUNT(*), SUM(birdQuantity), SUM(cageQuantity), SUM(totalValue)
+        FROM purchases WHERE id > :last_id AND id <= :high_id
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, supplier, status) DO UPDATE SET
+            orders = orders + excluded.orders,
+            birds = birds + excluded.birds,
+            cages = cages + excluded.cages,
+            total_value = total_value + excluded.total_value
+    """,
+    "products": """
+        INSERT INTO product_rollup (category, products, total_price, min_price, max_price)
+        SELECT COALESCE(category, ''), COUNT(*), TOTAL(price), MIN(price), MAX(price)
+        FROM products WHERE id > :last_id AND id <= :high_id
+        GROUP BY 1
+        ON CONFLICT (category) DO UPDATE SET
+            products = products + excluded.products,
+            total_price = total_price + excluded.total_price,
+            min_price = MIN(COALESCE(min_price, excluded.min_price), COALESCE(excluded.min_price, min_price)),
+            max_price = MAX(COALESCE(max_price, excluded.max_price), COALESCE(excluded.max_price, max_price))
+    """,
+}
+ROLLUP_TABLES = {"purchases": "purchase_rollup", "products": "product_rollup"}
+
+# Queries behind export_rollups, by section name
+EXPORT_QUERIES = {
+    "daily": "SELECT * FROM purchase_rollup_daily ORDER BY day",
+    "suppliers": "SELECT * FROM purchase_rollup_supplier ORDER BY orders DESC, supplier",
+    "statuses": "SELECT * FROM purchase_rollup_status ORDER BY status",
+    "products": "SELECT * FROM product_rollup ORDER BY category",
+}
+
+
+def connect(db_path):
+    """Open the app database for writing the rollups; it must already exist"""
+    if not Path(db_path).is_file():
+        raise RuntimeError(f"Database not found: {db_path}")
+    # Autocommit, so each refresh controls its own transaction; wait for the app's writes
+    return sqlite3.connect(db_path, timeout=30, isolation_level=None)
+
+
+def _existing_tables(connection):
+    return {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def ensure_schema(connection, source_indexes=True):
+    """Create the rollup tables, views and indexes (and the source-table indexes) if missing"""
+    missing = [source for source in ROLLUPS if source not in _existing_tables(connection)]
+    if missing:
+        raise RuntimeError(f"Table(s) {', '.join(missing)} not found; run the app once to create them")
+    connection.executescript(ROLLUP_SCHEMA)
+    if source_indexes:
+        connection.executescript(SOURCE_INDEXES)
+
+
+def _refresh(connection, source):
+    """Fold the rows added to source since the last refresh into its rollup; returns (rows, last_id, high_id)
+
+    The high-water mark (and its refreshed_at) only moves when there were new rows.
+    """
+    row = connection.execute("SELECT last_id FROM rollup_state WHERE source = ?", (source,)).fetchone()
+    last_id = row[0] if row else 0
+    high_id = connection.execute(f"SELECT COALESCE(MAX(id), 0) FROM {source}").fetchone()[0]
+    added = 0
+    if high_id > last_id:
+        added = connection.execute(f"SELECT COUNT(*) FROM {source} WHERE id > ? AND id <= ?",
+                                   (last_id, high_id)).fetchone()[0]
+        connection.execute(ROLLUPS[source], {"last_id": last_id, "high_id": high_id})
+        connection.execute("INSERT INTO rollup_state (source, last_id, refreshed_at) VALUES (?, ?, datetime('now')) "
+                           "ON CONFLICT (source) DO UPDATE SET last_id = excluded.last_id, "
+                           "refreshed_at = excluded.refreshed_at",
+                           (source, high_id))
+    elif row is None:
+        connection.execute("INSERT INTO rollup_state (source, last_id, refreshed_at) VALUES (?, 0, datetime('now'))",
+                           (source,))
+    return added, last_id, high_id
+
+
+def refresh_rollups(db_path=DEFAULT_DATABASE, rebuild=False, source_indexes=True):
+    """Bring every rollup up to date and return {source: (new rows, previous last_id, new last_id, seconds)}
+
+    Each source is refreshed in its own write transaction, so readers always
+    see a rollup together with the high-water mark it matches. With rebuild
+    the rollups are emptied and recomputed from every row.
+    """
+    connection = connect(db_path)
+    try:
+        ensure_schema(connection, source_indexes)
+        results = {}
+        for source in ROLLUPS:
+            started = time.perf_counter()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if rebuild:
+                    connection.execute(f"DELETE FROM {ROLLUP_TABLES[source]}")
+                    connection.execute("DELETE FROM rollup_state WHERE source = ?", (source,))
+                added, last_id, high_id = _refresh(connection, source)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            results[source] = (added, last_id, max(high_id, last_id), time.perf_counter() - started)
+        return results
+    finally:
+        connection.close()
+
+
+def rebuild_rollups(db_path=DEFAULT_DATABASE, source_indexes=True):
+    """Recompute every rollup from scratch, e.g. after rows were edited or deleted"""
+    return refresh_rollups(db_path, rebuild=True, source_indexes=source_indexes)
+
+
+def _rollup_connection(db_path):
+    connection = connect_read_only(db_path)
+    if "purchase_rollup" not in _existing_tables(connection):
+        connection.close()
+        raise RuntimeError(f"No rollups in {db_path}; run scripts/update-rollups.py first")
+    return connection
+
+
+def read_rollup_totals(db_path=DEFAULT_DATABASE):
+    """Return (supplier, status, orders, birds, cages, value) rows summed over days, for PurchaseFlows.from_totals"""
+    connection = _rollup_connection(db_path)
+    try:
+        return connection.execute("SELECT supplier, status, SUM(orders), SUM(birds), SUM(cages), SUM(total_value) "
+                                  "FROM purchase_rollup GROUP BY supplier, status").fetchall()
+    finally:
+        connection.close()
+
+
+def rollup_report(db_path=DEFAULT_DATABASE):
+    """Return the rollups as one dict: the high-water marks and a list of row dicts per EXPORT_QUERIES section"""
+    connection = _rollup_connection(db_path)
+    connection.row_factory = sqlite3.Row
+    try:
+        state = {row["source"]: {"last_id": row["last_id"], "refreshed_at": row["refreshed_at"]}
+                 for row in connection.execute("SELECT * FROM rollup_state ORDER BY source")}
+        report = {"database": str(db_path), "state": state}
+        for section, query in EXPORT_QUERIES.items():
+            report[section] = [dict(row) for row in connection.execute(query)]
+        return report
+    finally:
+        connection.close()
+
+
+def export_rollups(db_path, output_file):
+    """Write rollup_report as JSON, leaving an unchanged file untouched; returns True when written"""
+    report = rollup_report(db_path)
+    return write_if_changed(output_file, json.dumps(report, indent=2, ensure_ascii=False) + "\n")
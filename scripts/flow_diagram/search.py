@@ -0,0 +1,264 @@
+"""
+Prebuilt full-text search for the generated HTML pages
+
+SearchIndex collects screens (graph nodes), other page anchors such as role
+rows, and source table rows while the page is being written. It is filled
+from the same row iterator that writes the tables, so indexing needs no
+extra pass over the workbook. Every lowercase word becomes a token mapped to
+the sorted ids of the documents containing it.
+
+The index is embedded in the page as one JSON blob: the sorted token list,
+one delta-encoded posting list per token and the documents. The search box
+script binary-searches the token list for each query word, so prefixes match
+too ("purch" finds "purchase"). It intersects the words' postings and jumps
+to the matching diagram node, screen card or table row. For paged tables the
+row's page is loaded first through FlowTables.goTo. A lookup costs a binary
+search plus the postings it touches, however many rows the workbook has.
+"""
+
+import json
+import re
+from array import array
+
+from flow_diagram.sheets import is_missing
+
+# Document kinds: [SCREEN, label, Mermaid node ID(, link)], [ANCHOR, label,
+# element id] and [ROW, label, sheet index, row number]
+SCREEN, ANCHOR, ROW = 0, 1, 2
+SNIPPET_LENGTH = 80
+# Most tokens one query word may expand to, to keep one-letter prefixes cheap
+MAX_PREFIX_TOKENS = 500
+
+_TOKEN = re.compile(r"\w+")
+
+SEARCH_CSS = """
+        .flow-search {
+            position: relative;
+            margin: 0 0 20px;
+        }
+        .flow-search input {
+            width: 100%;
+            box-sizing: border-box;
+            padding: 10px 14px;
+            font-size: 15px;
+            border: 1px solid #d1d5db;
+            border-radius: 8px;
+        }
+        .flow-search ul {
+            list-style: none;
+            margin: 4px 0 0;
+            padding: 0;
+            max-height: 360px;
+            overflow-y: auto;
+            border: 1px solid #e5e7eb;
+            border-radius: 8px;
+            background: white;
+        }
+        .flow-search ul:empty {
+            display: none;
+        }
+        .flow-search li {
+            padding: 8px 14px;
+            cursor: pointer;
+        }
+        .flow-search li:hover, .flow-search li.active {
+            background: #f0fdf4;
+        }
+        .flow-search .kind {
+            color: #6b7280;
+            font-size: 12px;
+            margin-right: 8px;
+        }
+        .search-hit {
+            outline: 3px solid #f59e0b;
+        }
+        .search-hit .fd-node {
+            stroke: #f59e0b;
+            stroke-width: 4px;
+        }
+"""
+
+SEARCH_JS = """
+(function () {
+    var input = document.getElementById('flow-search-input');
+    var list = document.getElementById('flow-search-results');
+    var index = null;
+    var decoded = {};
+    var matches = [];
+
+    function load() {
+        if (!index) { index = JSON.parse(document.getElementById('flow-search-index').textContent); }
+        return index;
+    }
+
+    function postings(position) {
+        if (!decoded[position]) {
+            var ids = [], last = 0;
+            index.postings[position].forEach(function (delta) { last += delta; ids.push(last); });
+            decoded[position] = ids;
+        }
+        return decoded[position];
+    }
+
+    // Documents containing a token that starts with word
+    function lookup(word) {
+        var tokens = index.tokens, low = 0, high = tokens.length;
+        while (low < high) {
+            var middle = (low + high) >> 1;
+            if (tokens[middle] < word) { low = middle + 1; } else { high = middle; }
+        }
+        var found = new Set();
+        for (var i = low; i < tokens.length && i - low < %d && tokens[i].lastIndexOf(word, 0) === 0; i++) {
+            postings(i).forEach(function (id) { found.add(id); });
+        }
+        return found;
+    }
+
+    function search(query) {
+        var words = query.toLowerCase().match(/[\\p{L}\\p{N}_]+/gu) || [];
+        if (!words.length) { return []; }
+        var result = null;
+        words.forEach(function (word) {
+            var found = lookup(word);
+            result = result === null ? found : new Set(Array.from(result).filter(function (id) { return found.has(id); }));
+        });
+        return Array.from(result).sort(function (a, b) { return a - b; }).slice(0, 50);
+    }
+
+    function highlight(element) {
+        if (!element) { return; }
+        element.scrollIntoView({ block: 'center' });
+        element.classList.add('search-hit');
+        setTimeout(function () { element.classList.remove('search-hit'); }, 2000);
+    }
+
+    function jump(doc) {
+        if (doc[0] === %d) {
+            if (doc[3]) { window.location.href = doc[3]; return; }
+            highlight(document.getElementById('screen-' + doc[2]) || document.getElementById('node-' + doc[2]) ||
+                      document.querySelector('.mermaid, .diagram'));
+        } else if (doc[0] === %d) {
+            highlight(document.getElementById(doc[2]));
+        } else {
+            var id = 'row-' + doc[2] + '-' + doc[3];
+            if (!document.getElementById(id) && window.FlowTables && window.FlowTables.goTo) {
+                var viewer = window.FlowTables.goTo(doc[2], doc[3]);
+                viewer.addEventListener('pagechange', function () {
+                    highlight(document.getElementById(id));
+                }, { once: true });
+                return;
+            }
+            highlight(document.getElementById(id));
+        }
+    }
+
+    function show(query) {
+        load();
+        matches = search(query);
+        list.textContent = '';
+        matches.forEach(function (id, position) {
+            var doc = index.docs[id];
+            var item = document.createElement('li');
+            var kind = document.createElement('span');
+            kind.className = 'kind';
+            kind.textContent = doc[0] === %d ? 'Screen' : doc[0] === %d ? 'Role' : index.sheets[doc[2]] + ' #' + doc[3];
+            item.appendChild(kind);
+            item.appendChild(document.createTextNode(doc[1]));
+            item.addEventListener('click', function () { jump(doc); });
+            if (position === 0) { item.className = 'active'; }
+            list.appendChild(item);
+        });
+    }
+
+    input.addEventListener('input', function () { show(input.value); });
+    input.addEventListener('keydown', function (event) {
+        if (event.key === 'Enter' && matches.length) { jump(index.docs[matches[0]]); }
+        if (event.key === 'Escape') { input.value = ''; show(''); }
+    });
+})();
+""" % (MAX_PREFIX_TOKENS, SCREEN, ANCHOR, SCREEN, ANCHOR)
+
+
+def tokenize(text):
+    """Lowercase words of a text, e.g. "Purchase Order (PO)" -> ['purchase', 'order', 'po']"""
+    return _TOKEN.findall(str(text).lower())
+
+
+def _cell_string(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+class SearchIndex:
+    """Inverted index of the screens, anchors and table rows of one page"""
+
+    def __init__(self, sheet_names=()):
+        self.sheets = [str(name) for name in sheet_names]
+        self.docs = []
+        self._postings = {}
+
+    def _add(self, doc, texts):
+        doc_id = len(self.docs)
+        self.docs.append(doc)
+        for token in {token for text in texts for token in tokenize(text)}:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = array("I")
+            posting.append(doc_id)
+
+    def add_graph(self, graph):
+        """Index every node label; nodes that link elsewhere (partition stubs) jump to their link"""
+        for node, label in enumerate(graph.labels):
+            url = graph.links[node][0] if node in graph.links else None
+            self._add([SCREEN, str(label), graph.node_ids[node]] + ([url] if url else []), [label])
+
+    def add_anchor(self, label, element_id, texts=()):
+        """Index an element of the page by its id, e.g. a row of the role access table"""
+        self._add([ANCHOR, str(label), element_id], [label, *texts])
+
+    def add_row(self, sheet_idx, row_number, row):
+        """Index the text of one source table row; empty rows are skipped"""
+        texts = [_cell_string(value) for value in row if not is_missing(value)]
+        texts = [text for text in texts if text]
+        if texts:
+            self._add([ROW, " · ".join(texts[:3])[:SNIPPET_LENGTH], sheet_idx, row_number], texts)
+
+    def indexed_rows(self, sheet_idx, rows):
+        """Pass rows through unchanged, indexing each one as it goes by"""
+        for row_number, row in enumerate(rows):
+            self.add_row(sheet_idx, row_number, row)
+            yield row
+
+    def to_json(self):
+        """Serialize as {"sheets", "tokens", "postings", "docs"} with delta-encoded postings"""
+        tokens = sorted(self._postings)
+        postings = []
+        for token in tokens:
+            previous = 0
+            deltas = []
+            for doc_id in self._postings[token]:
+                deltas.append(doc_id - previous)
+                previous = doc_id
+            postings.append(deltas)
+        return json.dumps({"sheets": self.sheets, "tokens": tokens, "postings": postings, "docs": self.docs},
+                          ensure_ascii=False, separators=(",", ":"))
+
+
+def search_box_html():
+    """Markup of the search box, placed near the top of the page"""
+    return (f"<style>{SEARCH_CSS}</style>\n"
+            '        <div class="flow-search">\n'
+            '            <input id="flow-search-input" type="search" placeholder="Search screens, roles and '
+            'requirements..." autocomplete="off" aria-label="Search">\n'
+            '            <ul id="flow-search-results"></ul>\n'
+            "        </div>\n")
+
+
+def search_index_chunks(index):
+    """Yield the embedded index and the search script, placed after the tables it indexes"""
+    # Keep "</" out of the inline JSON so it cannot close the script element
+    yield '<script type="application/json" id="flow-search-index">'
+    yield index.to_json().replace("</", "<\\/")
+    yield "</script>\n"
+    yield f"<script>{SEARCH_JS}</script>\n"
@@ -0,0 +1,168 @@
+"""
+Row access helpers that work for DataFrames and the lightweight sheet types
+
+Streamed sheets (xlsx_reader.XlsxSheet), cached sheets (cache.CachedSheet)
+and in-memory sheets (MemorySheet) expose columns, iter_rows() and column();
+these helpers let the diagram builders treat them and pandas DataFrames the
+same way.
+"""
+
+import math
+from itertools import islice
+
+
+def is_missing(value):
+    """True for empty cells: None, or NaN as pandas stores them"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def iter_sheet_rows(sheet):
+    """Yield the rows of a DataFrame or lightweight sheet as plain tuples"""
+    if hasattr(sheet, "iter_rows"):
+        return sheet.iter_rows()
+    return sheet.itertuples(index=False, name=None)
+
+
+def iter_column(sheet, name):
+    """Yield the values of one column of a DataFrame or lightweight sheet"""
+    if hasattr(sheet, "iter_rows"):
+        return sheet.column(name)
+    return iter(sheet[name])
+
+
+def float_columns(rows, width):
+    """Columns that pandas would load as float64: all-numeric with a gap or a float"""
+    numeric = [True] * width
+    widened = [False] * width
+    for row in rows:
+        for idx, value in enumerate(row[:width]):
+            if not numeric[idx]:
+                continue
+            if is_missing(value) or isinstance(value, float):
+                widened[idx] = True
+            elif not isinstance(value, int) or isinstance(value, bool):
+                numeric[idx] = False
+    return {idx for idx in range(width) if numeric[idx] and widened[idx]}
+
+
+def sheet_float_columns(sheet):
+    """float_columns() of a lightweight sheet; empty for a DataFrame, which pandas already upcast
+
+    A lazily streamed sheet is walked once more for this.
+    """
+    if not hasattr(sheet, "iter_rows"):
+        return set()
+    return float_columns(sheet.iter_rows(), len(sheet.columns))
+
+
+def rows_to_frame(rows, columns):
+    """Build a DataFrame from row tuples, using NaN for missing cells like read_excel"""
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(list(rows), columns=columns)
+    return frame.where(frame.notna(), float("nan")).infer_objects()
+
+
+def sheet_preview(sheet, rows=5):
+    """Return the first rows of a sheet as a plain-text table, like DataFrame.head().to_string()"""
+    columns = [str(column) for column in sheet.columns]
+    body = [["NaN" if is_missing(value) else str(value).replace("\n", "\\n") for value in row]
+            for row in islice(iter_sheet_rows(sheet), rows)]
+    if not body:
+        return f"Empty sheet\nColumns: {columns}"
+
+    index_width = len(str(len(body) - 1))
+    widths = [max([len(column)] + [len(row[i]) for row in body if i < len(row)])
+              for i, column in enumerate(columns)]
+    lines = [" " * index_width + "".join(f"  {column:>{width}}" for column, width in zip(columns, widths))]
+    for number, row in enumerate(body):
+        lines.append(f"{number:<{index_width}}" + "".join(f"  {cell:>{width}}" for cell, width in zip(row, widths)))
+    return "\n".join(lines)
+
+
+def project_sheet(sheet, columns):
+    """Return the sheet limited to the named columns, in that order; None keeps every column
+
+    Names the sheet does not have are ignored. Lightweight sheets return a view
+    that never reads the other columns.
+    """
+    if columns is None:
+        return sheet
+    if hasattr(sheet, "iter_rows"):
+        return sheet.project(columns)
+    return sheet[[name for name in columns if name in sheet.columns]]
+
+
+def categorize_frame(frame, max_ratio=0.5):
+    """Store text columns that mostly repeat a few labels as pandas categoricals
+
+    A column is converted when its distinct values are at most max_ratio of
+    its present cells, which keeps one copy of each label plus small codes.
+    """
+    from pandas.api.types import is_object_dtype, is_string_dtype
+
+    conversions = {}
+    for name in frame.columns:
+        column = frame[name]
+        if not (is_object_dtype(column.dtype) or is_string_dtype(column.dtype)):
+            continue
+        present = column.count()
+        if present and column.nunique() <= present * max_ratio:
+            conversions[name] = "category"
+    return frame.astype(conversions) if conversions else frame
+
+
+def sheet_to_frame(sheet):
+    """Return the sheet as a DataFrame, materializing lightweight sheets"""
+    if hasattr(sheet, "iter_rows"):
+        return sheet.to_frame()
+    return sheet
+
+
+class MemorySheet:
+    """Rows of a sheet held in memory as tuples, detached from the workbook file"""
+
+    def __init__(self, columns, rows):
+        self.columns = list(columns)
+        self.rows = list(rows)
+
+    @property
+    def empty(self):
+        return not self.rows
+
+    def iter_rows(self):
+        return iter(self.rows)
+
+    def column(self, name):
+        idx = self.columns.index(name)
+        return (row[idx] for row in self.rows)
+
+    def project(self, columns):
+        positions = [self.columns.index(name) for name in columns if name in self.columns]
+        return MemorySheet([self.columns[i] for i in positions],
+                           (tuple(row[i] for i in positions) for row in self.rows))
+
+    def head(self, n=5):
+        return list(islice(self.rows, n))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def to_frame(self):
+        return rows_to_frame(self.rows, self.columns)
+
+
+def detach_sheet(sheet):
+    """Return a copy of a lazily streamed sheet that no longer reads the workbook file
+
+    Needed when the workbook may be rewritten while the sheet is still in use,
+    as in watch mode, and to read a streamed sheet once for consumers that go
+    over it several times. DataFrames are already detached and returned unchanged.
+    """
+    if isinstance(sheet, MemorySheet):
+        return sheet
+    if hasattr(sheet, "iter_rows"):
+        # Rows first: a streamed sheet learns its header on the way, so the XML is walked once
+        rows = list(sheet.iter_rows())
+        return MemorySheet(sheet.columns, rows)
+    return sheet
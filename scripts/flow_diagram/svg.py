@@ -0,0 +1,128 @@
+"""
+Static SVG rendering of a laid-out FlowGraph
+
+Draws the boxes, subgraph frames and curved edges computed by
+flow_diagram.layout, using the same shapes and node styles as the Mermaid
+output, so a page can show the diagram without any JavaScript. Every node
+group carries id="node-<Mermaid ID>" for linking.
+"""
+
+import html
+
+from flow_diagram.layout import FONT_SIZE, LINE_HEIGHT, label_lines
+from flow_diagram.mermaid import parse_style
+
+SVG_CSS = """
+    .fd-node { fill: #ECECFF; stroke: #9370DB; stroke-width: 1px; }
+    .fd-label { font-family: 'trebuchet ms', verdana, arial, sans-serif; font-size: %dpx; fill: #333; }
+    .fd-edge { fill: none; stroke: #333; stroke-width: 1.5px; }
+    .fd-cluster { fill: #ffffde; stroke: #aaaa33; stroke-width: 1px; }
+    .fd-cluster-label { font-family: 'trebuchet ms', verdana, arial, sans-serif; font-size: %dpx; fill: #333; }
+""" % (FONT_SIZE, FONT_SIZE)
+
+# Only added for graphs with captioned edges
+EDGE_LABEL_CSS = """
+    .fd-edge-label { font-family: 'trebuchet ms', verdana, arial, sans-serif; font-size: %dpx; fill: #333;
+                     paint-order: stroke; stroke: #fff; stroke-width: 3px; }
+""" % (FONT_SIZE - 2)
+
+
+def svg_style(mermaid_style):
+    """Turn a Mermaid style (fill:#228B22,stroke:#166534,color:#fff) into (shape style, text style)"""
+    shape = []
+    text = []
+    for key, value in parse_style(mermaid_style).items():
+        if key == "color":
+            text.append(f"fill:{value}")
+        else:
+            shape.append(f"{key}:{value}")
+    return ";".join(shape), ";".join(text)
+
+
+def _shape_markup(shape, x, y, width, height, style):
+    style_attr = f' style="{html.escape(style)}"' if style else ""
+    if shape == "diamond":
+        cx, cy = x + width / 2, y + height / 2
+        points = f"{cx:g},{y:g} {x + width:g},{cy:g} {cx:g},{y + height:g} {x:g},{cy:g}"
+        return f'<polygon class="fd-node" points="{points}"{style_attr}/>'
+    radius = {"round": 8, "stadium": height / 2}.get(shape, 0)
+    return (f'<rect class="fd-node" x="{x:g}" y="{y:g}" width="{width:g}" height="{height:g}" '
+            f'rx="{radius:g}" ry="{radius:g}"{style_attr}/>')
+
+
+def _edge_path(points):
+    """Smooth vertical curve through the polyline points, like Mermaid's basis curves"""
+    (x0, y0) = points[0]
+    path = [f"M{x0:g},{y0:g}"]
+    for x1, y1 in points[1:]:
+        middle = (y0 + y1) / 2
+        path.append(f"C{x0:g},{middle:g} {x1:g},{middle:g} {x1:g},{y1:g}")
+        x0, y0 = x1, y1
+    return " ".join(path)
+
+
+def _edge_midpoint(points):
+    if len(points) % 2:
+        return points[len(points) // 2]
+    (x0, y0), (x1, y1) = points[len(points) // 2 - 1], points[len(points) // 2]
+    return (x0 + x1) / 2, (y0 + y1) / 2
+
+
+def svg_chunks(graph, layout, title="Flow diagram"):
+    """Yield the SVG markup for a graph and its layout"""
+    width, height = layout["width"], layout["height"]
+    yield (f'<svg xmlns="http://www.w3.org/2000/svg" class="flow-svg" viewBox="0 0 {width:g} {height:g}" '
+           f'width="{width:g}" height="{height:g}" role="img" aria-label="{html.escape(title)}">\n')
+    yield f"<style>{SVG_CSS}{EDGE_LABEL_CSS if graph.edge_labels else ''}</style>\n"
+    yield ('<defs><marker id="fd-arrow" viewBox="0 0 10 10" refX="9" refY="5" markerWidth="8" '
+           'markerHeight="8" orient="auto"><path d="M0,0 L10,5 L0,10 z" fill="#333"/></marker></defs>\n')
+
+    for index, x, y, frame_width, frame_height in layout["clusters"]:
+        yield (f'<g class="fd-subgraph" id="subgraph-{html.escape(graph.subgraph_ids[index])}">'
+               f'<rect class="fd-cluster" x="{x:g}" y="{y:g}" width="{frame_width:g}" height="{frame_height:g}"/>'
+               f'<text class="fd-cluster-label" x="{x + frame_width / 2:g}" y="{y + LINE_HEIGHT:g}" '
+               f'text-anchor="middle">{html.escape(str(graph.subgraph_names[index]))}</text></g>\n')
+
+    for source, target, points in layout["edges"]:
+        if source == target:
+            x, y, box_width, box_height = layout["nodes"][source]
+            right, middle = x + box_width, y + box_height / 2
+            path = (f"M{right:g},{middle - 6:g} C{right + 30:g},{middle - 24:g} "
+                    f"{right + 30:g},{middle + 24:g} {right:g},{middle + 6:g}")
+        else:
+            path = _edge_path(points)
+        edge_style, _ = svg_style(graph.edge_styles.get((source, target)))
+        style_attr = f' style="{html.escape(edge_style)}"' if edge_style else ""
+        yield f'<path class="fd-edge" d="{path}"{style_attr} marker-end="url(#fd-arrow)"/>\n'
+        label = graph.edge_labels.get((source, target))
+        if label is not None and source != target:
+            # Caption at the middle bend of the edge
+            x, y = _edge_midpoint(points)
+            yield f'<text class="fd-edge-label" x="{x:g}" y="{y:g}" text-anchor="middle">{html.escape(str(label))}</text>\n'
+
+    for node, (x, y, box_width, box_height) in enumerate(layout["nodes"]):
+        shape_style, text_style = svg_style(graph.styles.get(node))
+        lines = label_lines(graph.labels[node])
+        center_x = x + box_width / 2
+        first_line = y + box_height / 2 - (len(lines) - 1) * LINE_HEIGHT / 2
+        text_attr = f' style="{html.escape(text_style)}"' if text_style else ""
+        spans = "".join(
+            f'<tspan x="{center_x:g}" y="{first_line + i * LINE_HEIGHT:g}">{html.escape(line)}</tspan>'
+            for i, line in enumerate(lines)
+        )
+        url, tooltip = graph.links.get(node, (None, None))
+        group = (f'<g class="fd-node-group" id="node-{html.escape(graph.node_ids[node])}">'
+                 f'<title>{html.escape(str(tooltip or graph.labels[node]))}</title>'
+                 f'{_shape_markup(graph.shapes[node], x, y, box_width, box_height, shape_style)}'
+                 f'<text class="fd-label" text-anchor="middle" dominant-baseline="central"{text_attr}>{spans}</text>'
+                 f'</g>')
+        if url:
+            group = f'<a href="{html.escape(url)}">{group}</a>'
+        yield group + "\n"
+
+    yield "</svg>\n"
+
+
+def to_svg(graph, layout, title="Flow diagram"):
+    """Return the SVG document for a graph and its layout"""
+    return "".join(svg_chunks(graph, layout, title))
@@ -0,0 +1,206 @@
+"""
+Synthetic requirement workbooks for benchmarking the flow diagram scripts
+
+Writes .xlsx files shaped like the real "Requirment Document" and "User
+Mapping" sheets (same headers, shared strings, a bold header row) at any row
+count. Sparsity blanks a share of the text cells, and formatted-empty
+regions add style-only cells to the right of the data and below it, the way
+spreadsheet templates pre-format a large grid.
+"""
+
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+REQUIREMENT_SHEET = "Requirment Document"
+MAPPING_SHEET = "User Mapping"
+REQUIREMENT_COLUMNS = ["Sl No", "Screen Name", "Details ", "Rules Engine",
+                       "Business Requirement ", "Functional Requirement ", "Phase #"]
+MAPPING_COLUMNS = ["Sl No", "User Type", "Screens"]
+
+USER_TYPES = ["Admin", "Manager", "Accountant", "Storekeeper", "Sales", "Auditor"]
+SCREEN_STEMS = ["User Authentication System", "Dashboard Overview", "Godown Management",
+                "Purchase Order Management", "Sales Tracking", "Expense Management",
+                "Reports", "Master Data Management", "User Management"]
+_WORDS = ("bird batch cage feed supplier order invoice godown stock mortality vaccine "
+          "weight price payment receipt report daily weekly monthly approve reject "
+          "record update create delete view export filter search total balance "
+          "customer delivery pending picked cancel admin manager role permission").split()
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Style 0 is the default, 1 the bold header and 2 a filled, value-less grid cell
+_STYLES = (
+    f'{_XML_HEADER}<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="3"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FFFFF2CC"/></patternFill></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="0" fontId="0" fillId="2" borderId="0" xfId="0" applyFill="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def column_letters(index):
+    """Return the spreadsheet column letters for a zero-based column index (0 -> A)"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+class _SharedStrings:
+    """Interns cell text into the workbook's shared string table"""
+
+    def __init__(self):
+        self.index = {}
+
+    def ref(self, text):
+        if text not in self.index:
+            self.index[text] = len(self.index)
+        return self.index[text]
+
+    def xml(self):
+        items = "".join(f'<si><t xml:space="preserve">{escape(text)}</t></si>' for text in self.index)
+        return (f'{_XML_HEADER}<sst xmlns="{_MAIN_NS}" count="{len(self.index)}" '
+                f'uniqueCount="{len(self.index)}">{items}</sst>')
+
+
+def _row_xml(row_number, values, strings, style, formatted_columns):
+    """Return one <row>; None values are left out, columns up to formatted_columns get style-only cells"""
+    cells = []
+    for idx, value in enumerate(values):
+        ref = f"{column_letters(idx)}{row_number}"
+        if value is None:
+            if formatted_columns:
+                cells.append(f'<c r="{ref}" s="2"/>')
+        elif isinstance(value, str):
+            cells.append(f'<c r="{ref}" s="{style}" t="s"><v>{strings.ref(value)}</v></c>')
+        else:
+            cells.append(f'<c r="{ref}" s="{style}"><v>{value}</v></c>')
+    for idx in range(len(values), formatted_columns):
+        cells.append(f'<c r="{column_letters(idx)}{row_number}" s="2"/>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+
+def _write_sheet(archive, member, columns, rows, strings, formatted_rows, formatted_columns):
+    """Stream a worksheet into the archive row by row"""
+    with archive.open(member, "w") as handle:
+        handle.write(f'{_XML_HEADER}<worksheet xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheetData>'.encode("utf-8"))
+        handle.write(_row_xml(1, columns, strings, 1, formatted_columns).encode("utf-8"))
+        row_number = 1
+        for values in rows:
+            row_number += 1
+            handle.write(_row_xml(row_number, values, strings, 0, formatted_columns).encode("utf-8"))
+        # Formatted but empty grid below the data
+        blank = (None,) * max(len(columns), formatted_columns)
+        for _ in range(formatted_rows):
+            row_number += 1
+            handle.write(_row_xml(row_number, blank, strings, 0, formatted_columns).encode("utf-8"))
+        handle.write(b"</sheetData></worksheet>")
+
+
+def _sentence(rng, low, high):
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(low, high))).capitalize()
+
+
+def requirement_rows(rows, sparsity, rng):
+    """Yield rows for the requirements sheet; about one in eight rows starts a new screen"""
+    screen_count = max(len(SCREEN_STEMS), rows // 20)
+    screens = [SCREEN_STEMS[i] if i < len(SCREEN_STEMS) else f"{rng.choice(SCREEN_STEMS)} {i}"
+               for i in range(screen_count)]
+
+    def maybe(value):
+        return None if rng.random() < sparsity else value
+
+    for number in range(1, rows + 1):
+        screen = rng.choice(screens) if number % 8 == 1 else None
+        yield (
+            number,
+            screen,
+            maybe(_sentence(rng, 4, 12)),
+            maybe(rng.choice(["Yes", "No", "Auto approve", "Manual review"])),
+            maybe(_sentence(rng, 8, 24)),
+            maybe(_sentence(rng, 8, 24)),
+            maybe(f"Phase {rng.randint(1, 3)}"),
+        )
+
+
+def mapping_rows(count, rng):
+    """Yield rows for the user mapping sheet: a user type and a comma separated screen list"""
+    for number in range(1, count + 1):
+        user_type = USER_TYPES[(number - 1) % len(USER_TYPES)]
+        if number > len(USER_TYPES):
+            user_type = f"{user_type} {number}"
+        screens = rng.sample(SCREEN_STEMS, rng.randint(2, len(SCREEN_STEMS)))
+        yield (number, user_type, ", ".join(screens))
+
+
+def write_workbook(path, rows, sparsity=0.3, formatted_rows=0, formatted_columns=0,
+                   mapping_count=None, seed=0):
+    """Write a synthetic requirements workbook and return its path
+
+    rows is the number of requirement rows; sparsity (0..1) is the share of
+    text cells left empty. formatted_rows adds style-only rows below the data
+    and formatted_columns pads every row with style-only cells up to that many
+    columns (26 reaches column Z). mapping_count defaults to one user type per
+    thousand rows, at least the six base user types.
+    """
+    rng = random.Random(seed)
+    if mapping_count is None:
+        mapping_count = max(len(USER_TYPES), rows // 1000)
+    strings = _SharedStrings()
+
+    sheets = [(REQUIREMENT_SHEET, REQUIREMENT_COLUMNS, requirement_rows(rows, sparsity, rng)),
+              (MAPPING_SHEET, MAPPING_COLUMNS, mapping_rows(mapping_count, rng))]
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for number, (name, columns, sheet_rows) in enumerate(sheets, 1):
+            _write_sheet(archive, f"xl/worksheets/sheet{number}.xml", columns, sheet_rows,
+                         strings, formatted_rows, formatted_columns)
+
+        archive.writestr("xl/sharedStrings.xml", strings.xml())
+        archive.writestr("xl/styles.xml", _STYLES)
+
+        sheet_entries = "".join(f'<sheet name="{escape(name)}" sheetId="{number}" r:id="rId{number}"/>'
+                                for number, (name, _, _) in enumerate(sheets, 1))
+        archive.writestr("xl/workbook.xml",
+                         f'{_XML_HEADER}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+                         f'<sheets>{sheet_entries}</sheets></workbook>')
+
+        worksheet_type = f"{_REL_NS}/worksheet"
+        rels = "".join(f'<Relationship Id="rId{number}" Type="{worksheet_type}" '
+                       f'Target="worksheets/sheet{number}.xml"/>' for number in range(1, len(sheets) + 1))
+        rels += (f'<Relationship Id="rId{len(sheets) + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/>'
+                 f'<Relationship Id="rId{len(sheets) + 2}" Type="{_REL_NS}/sharedStrings" '
+                 'Target="sharedStrings.xml"/>')
+        archive.writestr("xl/_rels/workbook.xml.rels",
+                         f'{_XML_HEADER}<Relationships xmlns="{_PKG_REL_NS}">{rels}</Relationships>')
+        archive.writestr("_rels/.rels",
+                         f'{_XML_HEADER}<Relationships xmlns="{_PKG_REL_NS}">'
+                         f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+                         '</Relationships>')
+
+        sheet_type = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+        overrides = "".join(f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+                            f'ContentType="{sheet_type}.worksheet+xml"/>' for number in range(1, len(sheets) + 1))
+        archive.writestr("[Content_Types].xml",
+                         f'{_XML_HEADER}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                         '<Default Extension="xml" ContentType="application/xml"/>'
+                         f'<Override PartName="/xl/workbook.xml" ContentType="{sheet_type}.sheet.main+xml"/>'
+                         f'<Override PartName="/xl/styles.xml" ContentType="{sheet_type}.styles+xml"/>'
+                         f'<Override PartName="/xl/sharedStrings.xml" ContentType="{sheet_type}.sharedStrings+xml"/>'
+                         f'{overrides}</Types>')
+    return path
@@ -0,0 +1,56 @@
+"""
+Polling file watcher for --watch mode
+
+Polls the file's modification time and size rather than using inotify, so it
+needs no extra dependency and also works for workbooks on network shares and
+synced folders. Spreadsheet applications save in bursts (temporary file,
+rename, a second metadata write), so a change is only reported once the file
+has stopped changing for the debounce period.
+"""
+
+import os
+import time
+
+DEFAULT_INTERVAL = 0.5
+DEFAULT_DEBOUNCE = 1.0
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        # Briefly missing while the editor renames its temporary file into place
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def wait_for_change(path, last, interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE):
+    """Block until path differs from the signature last and has settled; return the new signature"""
+    current = last
+    while current == last or current is None:
+        time.sleep(interval)
+        current = _signature(path)
+
+    settled_since = time.monotonic()
+    while time.monotonic() - settled_since < debounce:
+        time.sleep(interval)
+        latest = _signature(path)
+        if latest != current or latest is None:
+            current = latest
+            settled_since = time.monotonic()
+    return current
+
+
+def watch_file(path, on_change, interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE):
+    """Call on_change() after every settled modification of path until interrupted
+
+    An exception from on_change (e.g. a workbook caught half-written) is
+    reported and watching continues with the next save.
+    """
+    last = _signature(path)
+    while True:
+        last = wait_for_change(path, last, interval, debounce)
+        try:
+            on_change()
+        except Exception as e:
+            print(f"❌ Update failed: {e}")
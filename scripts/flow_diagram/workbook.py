@@ -0,0 +1,128 @@
+"""
+Workbook loading shared by the flow diagram scripts
+
+pandas is only imported when the pandas engine is actually used, so runs on
+the stream engine (the default through "auto") and cache hits start quickly.
+The parallel engine parses every sheet in its own worker process.
+"""
+
+from pathlib import Path
+
+from flow_diagram.cache import file_digest
+from flow_diagram.parallel import parse_parallel
+from flow_diagram.sheets import categorize_frame, detach_sheet
+from flow_diagram.xlsx_reader import READER_VERSION, stream_workbook, workbook_sheet_names
+
+ENGINES = ("pandas", "stream", "parallel")
+ENGINE_CHOICES = ("auto",) + ENGINES
+# Formats the xlsx engines can read; .xls, .xlsb and .ods are left to pandas
+XLSX_SUFFIXES = (".xlsx", ".xlsm")
+
+
+def resolve_engine(file_path, engine="auto"):
+    """Pick the reader for engine='auto' by extension: stream for .xlsx and .xlsm, pandas for anything else"""
+    if engine not in ENGINE_CHOICES:
+        raise ValueError(f"Unknown reader engine: {engine}")
+    if engine != "auto":
+        return engine
+    return "stream" if Path(file_path).suffix.lower() in XLSX_SUFFIXES else "pandas"
+
+
+def load_workbook(file_path, sheet_names=None, engine="auto", cache=None, columns=None, low_memory=False,
+                  workers=None):
+    """Parse the workbook once and return the requested sheets as a dictionary
+
+    sheet_names limits loading to the named sheets (e.g. ['Requirment Document']);
+    when omitted every sheet in the workbook is returned. Sheets that do not
+    exist in the workbook are skipped.
+
+    engine='pandas' returns DataFrames. engine='stream' walks each sheet's XML
+    once, ignoring style-only cells, and returns the rows as MemorySheet
+    objects, since the scripts go over every sheet several times (summary,
+    graph, tables); with low_memory=True it returns XlsxSheet objects that
+    walk the XML lazily on every pass instead.
+    engine='parallel' streams each sheet in a worker process (up to workers,
+    default one per core) and returns in-memory CachedSheet objects.
+    engine='auto' streams .xlsx and .xlsm files and falls back to pandas for
+    other formats (legacy .xls, .xlsb, .ods). Every engine reads
+    date-formatted cells as dates; a CachedSheet holds them as their text,
+    e.g. '2024-03-05 14:30:00'.
+
+    When a SheetCache is given, sheets are looked up by the workbook's content
+    hash first and only the misses are parsed; every returned sheet is then a
+    memory-mapped CachedSheet.
+
+    columns maps sheet names to the columns their consumers read, e.g.
+    {'User Mapping': ['User Type', 'Screens']}; only those are materialized
+    (a sheet mapped to None, or not listed, keeps every column). With
+    low_memory=True the pandas engine stores repetitive text columns as
+    categoricals. Streamed and cached sheets already share one string object
+    per distinct label.
+    """
+    engine = resolve_engine(file_path, engine)
+    if cache is None:
+        sheets = _parse_workbook(file_path, sheet_names, engine, columns, low_memory, workers)
+        if engine == "stream" and not low_memory:
+            return {name: detach_sheet(sheet) for name, sheet in sheets.items()}
+        return sheets
+
+    content_digest = file_digest(file_path)
+    available = _sheet_names(file_path, engine)
+    if sheet_names is None:
+        wanted = available
+    else:
+        wanted = [name for name in sheet_names if name in available]
+
+    columns = {name: list(names) for name, names in (columns or {}).items() if names is not None}
+    # Both xlsx engines produce the same rows, so they share cache entries
+    options = {"engine": "stream" if engine == "parallel" else engine, "reader": READER_VERSION}
+    sheet_options = {name: {**options, "columns": columns[name]} if name in columns else options
+                     for name in wanted}
+    sheets = {name: cache.get(file_path, content_digest, name, sheet_options[name]) for name in wanted}
+    missing = [name for name, sheet in sheets.items() if sheet is None]
+    if missing:
+        parsed = _parse_workbook(file_path, missing, engine, columns, low_memory, workers)
+        for name, sheet in parsed.items():
+            sheets[name] = cache.put(file_path, content_digest, name, sheet_options[name], sheet)
+    return sheets
+
+
+def _sheet_names(file_path, engine):
+    """List the workbook's sheets without parsing them: from the zip directory for the xlsx engines, else via pandas"""
+    if engine in ("stream", "parallel"):
+        return workbook_sheet_names(file_path)
+
+    import pandas as pd
+
+    with pd.ExcelFile(file_path) as excel_file:
+        return list(excel_file.sheet_names)
+
+
+def _parse_workbook(file_path, sheet_names, engine, columns=None, low_memory=False, workers=None):
+    """Parse the requested sheets with the given reader engine, keeping only the projected columns"""
+    columns = columns or {}
+    if engine == "stream":
+        return stream_workbook(file_path, sheet_names, columns)
+    if engine == "parallel":
+        return parse_parallel(file_path, sheet_names, columns, workers)
+
+    import pandas as pd
+
+    with pd.ExcelFile(file_path) as excel_file:
+        if sheet_names is None:
+            wanted = list(excel_file.sheet_names)
+        else:
+            wanted = [name for name in sheet_names if name in excel_file.sheet_names]
+
+        # Every sheet is parsed from the same open handle, so the zip archive
+        # and shared strings are only read once for the whole workbook
+        sheets = {}
+        for name in wanted:
+            keep = columns.get(name)
+            if keep is None:
+                frame = excel_file.parse(name)
+            else:
+                frame = excel_file.parse(name, usecols=lambda column: column in keep)
+                frame = frame[[column for column in keep if column in frame.columns]]
+            sheets[name] = categorize_frame(frame) if low_memory else frame
+        return sheets
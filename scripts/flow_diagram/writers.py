@@ -0,0 +1,64 @@
+"""
+Output writers for generated diagrams
+
+Emitters yield text fragments; write_chunks streams them straight into a
+buffered temporary file next to the target and only swaps it in when the
+bytes differ from what is already on disk.
+"""
+
+import filecmp
+import os
+import tempfile
+from pathlib import Path
+
+BUFFER_SIZE = 256 * 1024
+
+
+def write_chunks(output_file, chunks):
+    """Stream text chunks to output_file, replacing it atomically only if the content changed
+
+    Returns True when the file was written.
+    """
+    path = Path(output_file)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE) as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+
+        if path.exists() and filecmp.cmp(path, temp_path, shallow=False):
+            os.unlink(temp_path)
+            return False
+
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+    return True
+
+
+def write_if_changed(output_file, content):
+    """Write a complete string to output_file unless it already holds the same text"""
+    return write_chunks(output_file, [content])
+
+
+def write_bytes_if_changed(output_file, data):
+    """Write bytes to output_file atomically unless it already holds the same bytes
+
+    Returns True when the file was written.
+    """
+    path = Path(output_file)
+    if path.exists() and path.stat().st_size == len(data) and path.read_bytes() == data:
+        return False
+
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+    return True
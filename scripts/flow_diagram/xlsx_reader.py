@@ -0,0 +1,430 @@
+"""
+Streaming reader for .xlsx workbooks
+
+Walks each worksheet's XML incrementally with iterparse instead of building a
+full cell grid. Cells that only carry formatting (no value) are skipped, rows
+are trimmed to the header's used range and trailing empty rows are dropped, so
+memory and parse time follow the real content rather than the formatted area.
+
+Numbers in cells with a date or time number format are converted to
+datetime (or time, for a fraction of a day) the way openpyxl does for
+pandas; durations formatted as elapsed time ([h]:mm) stay numbers.
+"""
+
+import datetime
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from itertools import islice
+
+from flow_diagram.sheets import rows_to_frame
+
+# Bump when the rows produced for the same workbook change, so cached parses are rebuilt
+READER_VERSION = 3
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_ROW = f"{{{MAIN_NS}}}row"
+_CELL = f"{{{MAIN_NS}}}c"
+_VALUE = f"{{{MAIN_NS}}}v"
+_INLINE = f"{{{MAIN_NS}}}is"
+_TEXT = f"{{{MAIN_NS}}}t"
+_SHARED_ITEM = f"{{{MAIN_NS}}}si"
+_SHEET = f"{{{MAIN_NS}}}sheet"
+_SHEET_DATA = f"{{{MAIN_NS}}}sheetData"
+_PHONETIC = f"{{{MAIN_NS}}}rPh"
+_WORKBOOK_PR = f"{{{MAIN_NS}}}workbookPr"
+_NUM_FMT = f"{{{MAIN_NS}}}numFmt"
+_CELL_XFS = f"{{{MAIN_NS}}}cellXfs"
+_XF = f"{{{MAIN_NS}}}xf"
+
+_CELL_REF = re.compile(r"([A-Z]+)(\d+)")
+
+# Built-in number formats that show a date or time (ECMA-376 18.8.30)
+BUILTIN_DATE_FORMATS = frozenset(range(14, 23)) | {45, 46, 47}
+# Quoted text, escaped characters and [colour]/[$-locale] sections of a format code
+_FORMAT_LITERALS = re.compile(r'"[^"]*"|\\.|_.|\*.|\[(?!h\]|hh\]|m\]|mm\]|s\]|ss\])[^\]]*\]')
+_DATE_TOKENS = re.compile(r"[dmyhs]", re.I)
+_ELAPSED = re.compile(r"\[(h|hh|m|mm|s|ss)\]", re.I)
+WINDOWS_EPOCH = datetime.datetime(1899, 12, 30)
+MAC_EPOCH = datetime.datetime(1904, 1, 1)
+
+# Text that read_excel treats as a missing cell by default
+NA_STRINGS = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+
+def column_index(letters):
+    """Convert a column reference such as 'A' or 'AB' to a zero-based index"""
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - 64)
+    return index - 1
+
+
+def _text_of(element):
+    """Concatenate the text runs of a shared or inline string, skipping phonetic hints"""
+    parts = []
+    for child in element:
+        if child.tag == _TEXT:
+            parts.append(child.text or "")
+        elif child.tag != _PHONETIC:
+            parts.extend(t.text or "" for t in child.iter(_TEXT))
+    return "".join(parts)
+
+
+def _convert(cell, shared_strings, date_styles=frozenset(), date1904=False):
+    """Return the Python value of a cell element, or None for style-only cells
+
+    date_styles holds the style indexes (the s attribute) with a date format.
+    """
+    cell_type = cell.get("t", "n")
+    if cell_type == "inlineStr":
+        inline = cell.find(_INLINE)
+        text = _text_of(inline) if inline is not None else None
+        return None if text in NA_STRINGS else text
+
+    value = cell.find(_VALUE)
+    if value is None or value.text is None:
+        return None
+    raw = value.text
+
+    if cell_type == "s":
+        text = shared_strings[int(raw)]
+        return None if text in NA_STRINGS else text
+    if cell_type in ("str", "e"):
+        return None if raw in NA_STRINGS else raw
+    if cell_type == "b":
+        return raw == "1"
+    try:
+        number = float(raw)
+    except ValueError:
+        return raw
+    if date_styles and int(cell.get("s", 0)) in date_styles:
+        return from_excel(number, date1904)
+    return int(number) if number.is_integer() and "." not in raw and "E" not in raw.upper() else number
+
+
+def is_date_format(code):
+    """True for a custom number format code that displays a date or time, e.g. 'dd/mm/yyyy' or 'h:mm AM/PM'"""
+    code = _FORMAT_LITERALS.sub("", code.split(";")[0])
+    return not _ELAPSED.search(code) and bool(_DATE_TOKENS.search(code))
+
+
+def from_excel(serial, date1904=False):
+    """Convert an Excel date serial to datetime, or to time when it is a fraction of a day
+
+    Serials below 60 in the 1900 system are shifted by a day to undo Excel's
+    phantom 29 February 1900, matching openpyxl.
+    """
+    day, fraction = divmod(serial, 1)
+    diff = datetime.timedelta(milliseconds=round(fraction * 86400 * 1000))
+    if 0 <= serial < 1 and diff.days == 0:
+        return (datetime.datetime.min + diff).time()
+    if date1904:
+        return MAC_EPOCH + datetime.timedelta(days=day) + diff
+    if 0 < serial < 60:
+        day += 1
+    return WINDOWS_EPOCH + datetime.timedelta(days=day) + diff
+
+
+def _unique_headers(values):
+    """Name header cells the way pandas does: blanks become 'Unnamed: n', repeats get '.n'"""
+    headers = []
+    counts = {}
+    for idx, value in enumerate(values):
+        name = f"Unnamed: {idx}" if value is None or str(value).strip() == "" else value
+        if name in counts:
+            counts[name] += 1
+            name = f"{name}.{counts[name]}"
+        else:
+            counts[name] = 0
+        headers.append(name)
+    return headers
+
+
+class XlsxWorkbook:
+    """An open .xlsx workbook whose sheets are streamed on demand"""
+
+    def __init__(self, file_path, sheet_members=None, shared_strings=None, date_styles=None, date1904=False):
+        """Open file_path; the other arguments skip re-reading what a parent process already read"""
+        self.file_path = file_path
+        if sheet_members is not None and shared_strings is not None and date_styles is not None:
+            self._sheet_members = dict(sheet_members)
+            self.shared_strings = shared_strings
+            self.date_styles = frozenset(date_styles)
+            self.date1904 = date1904
+            return
+        with zipfile.ZipFile(file_path) as archive:
+            self._sheet_members = self._read_sheet_members(archive)
+            self.shared_strings = self._read_shared_strings(archive)
+            self.date_styles = self._read_date_styles(archive)
+            self.date1904 = self._read_date1904(archive)
+
+    def sheet_sizes(self):
+        """Uncompressed size of every sheet's XML, a proxy for how long each takes to parse"""
+        with zipfile.ZipFile(self.file_path) as archive:
+            return {name: archive.getinfo(member).file_size for name, member in self._sheet_members.items()}
+
+    @property
+    def sheet_names(self):
+        return list(self._sheet_members)
+
+    @property
+    def sheet_members(self):
+        """{sheet name: worksheet XML path inside the archive}"""
+        return dict(self._sheet_members)
+
+    def sheet(self, name, usecols=None):
+        """Return a lazily streamed sheet by name, optionally limited to some columns"""
+        return XlsxSheet(self, name, self._sheet_members[name], usecols)
+
+    @staticmethod
+    def _read_sheet_members(archive):
+        """Map sheet names to their worksheet XML paths inside the archive"""
+        workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+        rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        targets = {}
+        for rel in rels.iter(f"{{{PKG_REL_NS}}}Relationship"):
+            target = rel.get("Target")
+            if target.startswith("/"):
+                target = target.lstrip("/")
+            else:
+                target = posixpath.normpath(posixpath.join("xl", target))
+            targets[rel.get("Id")] = target
+
+        members = {}
+        for sheet in workbook.iter(_SHEET):
+            members[sheet.get("name")] = targets[sheet.get(f"{{{REL_NS}}}id")]
+        return members
+
+    @staticmethod
+    def _read_date1904(archive):
+        """True when the workbook counts dates from 1904 (older Mac workbooks)"""
+        properties = ET.fromstring(archive.read("xl/workbook.xml")).find(_WORKBOOK_PR)
+        return properties is not None and properties.get("date1904", "false").lower() in ("1", "true")
+
+    @staticmethod
+    def _read_date_styles(archive):
+        """Return the indexes of the cell styles whose number format shows a date or time"""
+        if "xl/styles.xml" not in archive.namelist():
+            return frozenset()
+        styles = ET.fromstring(archive.read("xl/styles.xml"))
+        date_formats = set(BUILTIN_DATE_FORMATS)
+        for number_format in styles.iter(_NUM_FMT):
+            format_id = int(number_format.get("numFmtId"))
+            if is_date_format(number_format.get("formatCode", "")):
+                date_formats.add(format_id)
+            else:
+                date_formats.discard(format_id)
+        cell_formats = styles.find(_CELL_XFS)
+        if cell_formats is None:
+            return frozenset()
+        return frozenset(idx for idx, xf in enumerate(cell_formats.iter(_XF))
+                         if int(xf.get("numFmtId", 0)) in date_formats)
+
+    @staticmethod
+    def _read_shared_strings(archive):
+        """Load the shared strings table, streaming its XML"""
+        if "xl/sharedStrings.xml" not in archive.namelist():
+            return []
+        strings = []
+        with archive.open("xl/sharedStrings.xml") as handle:
+            for _, element in ET.iterparse(handle):
+                if element.tag == _SHARED_ITEM:
+                    strings.append(_text_of(element))
+                    element.clear()
+        return strings
+
+
+class XlsxSheet:
+    """A worksheet that yields its rows lazily as tuples
+
+    The first row holding a value is the header. Data rows are trimmed to the
+    header's used range and padded with None, interior blank rows are kept
+    and trailing blank rows are dropped, matching what pandas would load
+    without the empty formatted region.
+    """
+
+    def __init__(self, workbook, name, member, usecols=None):
+        self.workbook = workbook
+        self.name = name
+        self.member = member
+        self.usecols = None if usecols is None else list(usecols)
+        self._columns = None
+        self._positions = None
+        self._row_count = None
+
+    def project(self, columns):
+        """Return a view of this sheet with only the named columns (in that order)
+
+        Cells of other columns are never converted, so projected sheets cost
+        less to stream; names missing from the header are ignored.
+        """
+        return XlsxSheet(self.workbook, self.name, self.member, columns)
+
+    def _iter_raw_rows(self, keep=None):
+        """Yield (row_number, {column_index: value}) for rows that hold a value
+
+        keep, a set of column indexes, limits every row after the first
+        (the header) to those columns; it may still be filled in once the
+        header has been yielded.
+        """
+        shared_strings = self.workbook.shared_strings
+        date_styles, date1904 = self.workbook.date_styles, self.workbook.date1904
+        header_seen = False
+        with zipfile.ZipFile(self.workbook.file_path) as archive:
+            with archive.open(self.member) as handle:
+                sheet_data = None
+                next_row = 1
+                for event, element in ET.iterparse(handle, events=("start", "end")):
+                    if event == "start":
+                        if element.tag == _SHEET_DATA:
+                            sheet_data = element
+                        continue
+                    if element.tag != _ROW:
+                        continue
+
+                    row_number = int(element.get("r", next_row))
+                    next_row = row_number + 1
+                    cells = {}
+                    position = 0
+                    for cell in element.iter(_CELL):
+                        ref = cell.get("r")
+                        if ref:
+                            position = column_index(_CELL_REF.match(ref).group(1))
+                        if header_seen and keep is not None and position not in keep:
+                            position += 1
+                            continue
+                        value = _convert(cell, shared_strings, date_styles, date1904)
+                        if value is not None:
+                            cells[position] = value
+                        position += 1
+
+                    # Drop processed rows so the parsed tree never grows
+                    if sheet_data is not None:
+                        sheet_data.clear()
+                    else:
+                        element.clear()
+
+                    if cells:
+                        header_seen = True
+                        yield row_number, cells
+
+    def _read_header(self, raw_rows):
+        """Consume the header row from raw_rows and return (header_row_number, names, positions)
+
+        positions are the column indexes kept by the projection, in output order.
+        """
+        for row_number, cells in raw_rows:
+            width = max(cells) + 1
+            names = _unique_headers([cells.get(i) for i in range(width)])
+            if self.usecols is None:
+                return row_number, names, list(range(width))
+            positions = [names.index(name) for name in self.usecols if name in names]
+            return row_number, [names[i] for i in positions], positions
+        return None, [], []
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            raw_rows = self._iter_raw_rows()
+            try:
+                _, self._columns, self._positions = self._read_header(raw_rows)
+            finally:
+                raw_rows.close()
+        return self._columns
+
+    @property
+    def empty(self):
+        if self._row_count is not None:
+            return self._row_count == 0
+        for _ in self.iter_rows():
+            return False
+        return True
+
+    def iter_rows(self):
+        """Yield data rows as tuples aligned with columns
+
+        Each call walks the XML once. The header it reads and, when it runs to
+        the end, the row count are kept, so columns, empty and len() do not
+        walk it again.
+        """
+        keep = None if self.usecols is None else set()
+        raw_rows = self._iter_raw_rows(keep)
+        header_row, columns, positions = self._read_header(raw_rows)
+        self._columns, self._positions = columns, positions
+        if keep is not None:
+            keep.update(positions)  # the header decides which cells the body converts
+        width = len(columns)
+
+        count = 0
+        previous = header_row
+        for row_number, cells in raw_rows:
+            values = tuple(cells.get(i) for i in positions)
+            if not any(value is not None for value in values):
+                continue
+            # Blank rows between real rows are kept, trailing ones never emitted
+            for _ in range(row_number - previous - 1):
+                count += 1
+                yield (None,) * width
+            previous = row_number
+            count += 1
+            yield values
+        self._row_count = count
+
+    def column(self, name):
+        """Yield the values of a single column"""
+        idx = self.columns.index(name)
+        for row in self.iter_rows():
+            yield row[idx]
+
+    def head(self, n=5):
+        return list(islice(self.iter_rows(), n))
+
+    def __len__(self):
+        if self._row_count is None:
+            for _ in self.iter_rows():
+                pass
+        return self._row_count
+
+    def to_frame(self):
+        """Materialize the trimmed sheet as a pandas DataFrame"""
+        return rows_to_frame(self.iter_rows(), self.columns)
+
+
+def workbook_sheet_names(file_path):
+    """Return the sheet names of a workbook without reading any sheet data"""
+    with zipfile.ZipFile(file_path) as archive:
+        return list(XlsxWorkbook._read_sheet_members(archive))
+
+
+def sheet_fingerprints(file_path):
+    """Return (shared, {sheet name: fingerprint}) from the CRCs stored in the zip directory
+
+    Nothing is inflated. A sheet parses to the same rows as before when both
+    its own fingerprint and the shared strings fingerprint are unchanged.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        members = XlsxWorkbook._read_sheet_members(archive)
+        stored = {info.filename: (info.CRC, info.file_size) for info in archive.infolist()}
+    return stored.get("xl/sharedStrings.xml"), {name: stored.get(member) for name, member in members.items()}
+
+
+def stream_workbook(file_path, sheet_names=None, columns=None):
+    """Return the requested sheets as lazily streamed XlsxSheet objects
+
+    columns maps sheet names to the columns to keep (None keeps them all).
+    """
+    workbook = XlsxWorkbook(file_path)
+    if sheet_names is None:
+        wanted = workbook.sheet_names
+    else:
+        wanted = [name for name in sheet_names if name in workbook.sheet_names]
+    columns = columns or {}
+    return {name: workbook.sheet(name, columns.get(name)) for name in wanted}
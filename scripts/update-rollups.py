@@ -0,0 +1,48 @@
+"""
+Script to keep the purchase and product rollup tables in the SQLite database up to date
+Only rows added since the previous run are aggregated; --rebuild recomputes everything
+"""
+
+import sys
+import argparse
+
+from flow_diagram.purchases import DEFAULT_DATABASE
+from flow_diagram.rollups import export_rollups, refresh_rollups
+
+def update_rollups(db_path, args):
+    """Refresh (or rebuild) every rollup and print what each one folded in"""
+    results = refresh_rollups(db_path, rebuild=args.rebuild, source_indexes=not args.no_indexes)
+    action = "Rebuilt" if args.rebuild else "Updated"
+    for source, (added, last_id, high_id, seconds) in results.items():
+        if added:
+            print(f"{action} {source} rollup: {added:,} rows (ids {last_id + 1}-{high_id}) in {seconds:.2f}s")
+        else:
+            print(f"{source} rollup is up to date (last id {high_id})")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the incremental purchase and product rollups")
+    parser.add_argument("database", nargs="?", default=DEFAULT_DATABASE,
+                        help=f"SQLite database written by the app (default: {DEFAULT_DATABASE})")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Empty the rollups and recompute them from every row (after rows were edited or deleted)")
+    parser.add_argument("--no-indexes", action="store_true",
+                        help="Leave the date, supplier/status and category indexes off the app's own tables")
+    parser.add_argument("--export", metavar="JSON_FILE", default=None,
+                        help="Also write the daily, supplier, status and product rollups to JSON_FILE "
+                             "for the report and diagram generators")
+    args = parser.parse_args()
+
+    try:
+        update_rollups(args.database, args)
+        if args.export:
+            if export_rollups(args.database, args.export):
+                print(f"\nRollups exported: {args.export}")
+            else:
+                print(f"\nRollups export unchanged: {args.export}")
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()